@@ -2,7 +2,7 @@ from bs4 import BeautifulSoup
 
 from cpscripts.lib.contest         import Contest
 from cpscripts.utils               import colored, getHtml
-from cpscripts.atcoder.get_problem import getProblemIndexAndTitle, parseProblemFromHtml
+from cpscripts.atcoder.get_problem import getProblemIndexAndTitle, parseLimits, parseProblemFromHtml
 
 def parseContestFromHtml(html: str, link: str=None) -> Contest:
     soup = BeautifulSoup(html, 'html.parser')
@@ -15,5 +15,8 @@ def parseContestFromHtml(html: str, link: str=None) -> Contest:
 
     for index, title in enumerate(soup.find_all('span', {'class': 'h2'})):
         problems[index].index, problems[index].title = getProblemIndexAndTitle(title.text)
+        limitsNode = title.find_next('p')
+        if limitsNode is not None:
+            problems[index].timeLimit, problems[index].memoryLimit = parseLimits(limitsNode.text)
 
     return Contest(title=contestTitle, link=link, problems=problems)
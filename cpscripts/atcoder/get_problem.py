@@ -7,6 +7,12 @@ def getProblemIndexAndTitle(name: str) -> tuple[str, str]:
     pos = name.find('-')
     return (name[:pos - 1], name[pos + 2:])
 
+def parseLimits(text: str) -> tuple[float, float]:
+    timeLimit = re.search(r'([0-9]+(\.[0-9]+)?) *sec', text)
+    memoryLimit = re.search(r'([0-9]+(\.[0-9]+)?) *Mi?B', text)
+    return (None if timeLimit is None else float(timeLimit.group(1)),
+            None if memoryLimit is None else float(memoryLimit.group(1)))
+
 def parseProblemFromHtml(html: str, link: str=None) -> Problem:
     soup = BeautifulSoup(html, 'html.parser')
 
@@ -16,6 +22,11 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
     if titleNode is not None:
         index, problemTitle = getProblemIndexAndTitle(titleNode.text)
 
+    timeLimit, memoryLimit = None, None
+    limitsNode = soup.find('p', string=re.compile('Limit'))
+    if limitsNode is not None:
+        timeLimit, memoryLimit = parseLimits(limitsNode.text)
+
     inputRegex = re.compile(r'Sample Input [0-9]+')
     outputRegex = re.compile(r'Sample Output [0-9]+')
     inputs = []
@@ -28,4 +39,5 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
         elif outputRegex.match(title):
             outputs.append(rootNode.find('pre').text)
 
-    return Problem(title=problemTitle, index=index, link=link, inputs=inputs, outputs=outputs)
+    return Problem(title=problemTitle, index=index, link=link, inputs=inputs, outputs=outputs,
+                   timeLimit=timeLimit, memoryLimit=memoryLimit)
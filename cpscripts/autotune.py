@@ -0,0 +1,333 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses        import dataclass, field
+from typing             import Optional
+from .bench             import confidenceInterval
+from .compare           import OutputComparator
+from .compiler          import CompilationCache, CompilationResult, Compiler, PrecompiledHeaders
+from .discovery         import Test, TestIndex
+from .execution         import ProcessTracker, findCoreError, pinToCore, restoreAffinity, runExecutable
+from .utils             import colored, dumpError, loadSettings, loadLimits, runProcess
+
+OPTIMIZATION_REGEX = re.compile(r'O[0-9sgz]?|Ofast|march=.*|mtune=.*|funroll-loops|flto')
+DEFAULT_FLAG_SETS  = [
+    ['O2'],
+    ['O3'],
+    ['O2', 'march=native'],
+    ['O3', 'march=native'],
+    ['O3', 'march=native', 'funroll-loops'],
+    ['Ofast', 'march=native'],
+]
+
+@dataclass
+class Candidate:
+    flags:          list[str]
+    executablePath: str
+    compilation:    Optional[CompilationResult] = None
+    verdicts:       dict[str, str] = field(default_factory=dict)
+    totalTimes:     list[float] = field(default_factory=list)
+
+    def name(self) -> str:
+        return ' '.join('-' + flag for flag in self.flags)
+
+    def compiled(self) -> bool:
+        return self.compilation is not None and self.compilation.success
+
+class AutoTuner:
+    '''
+    Compiles the solution with each set of flags, checks that the verdicts on the tests are the same as with
+    the release flags and benchmarks the binaries in rounds (every round runs every binary on all tests,
+    so that a slow drift of the machine affects all of them equally).
+
+    Variables:
+    mainExecutable: str
+    extention:      str
+    compilerPath:   str
+    candidates:     list[Candidate]
+    tests:          list[Test]
+    runs:           int
+    warmupRuns:     int
+    core:           int or None
+    jobs:           int
+    timeLimit:      float or None
+    comparator:     OutputComparator
+    export:         str or None
+    directory:      str
+    tracker:        ProcessTracker
+    '''
+
+    def __init__(self, args: argparse.Namespace):
+        self.mainExecutable = args.exec[:-len(args.ext) - 1] if args.exec.endswith(f'.{args.ext}') else args.exec
+        self.extention = args.ext
+        self.compilerPath = args.compiler
+        self.runs = max(1, args.runs)
+        self.warmupRuns = args.warmup
+        self.core = args.core
+        self.jobs = max(1, args.jobs)
+        self.timeLimit = loadLimits(os.path.dirname(self.mainExecutable) or '.').get('time_limit', None)
+        self.comparator = OutputComparator()
+        self.export = args.export
+        self.tracker = ProcessTracker()
+        self.directory = tempfile.mkdtemp(prefix='autotune')
+        self.__createCandidates(args.flags, [flagSet.split() for flagSet in args.sets] if args.sets else args.flagsets)
+        self.__registerTests(args.tests)
+
+    def run(self) -> None:
+        try:
+            if not self.__compileCandidates():
+                return
+
+            print()
+            if not self.__checkVerdicts():
+                return
+
+            print()
+            self.__benchmark()
+            self.__dumpReport()
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+# Private:
+
+    def __createCandidates(self, releaseFlags: list[str], flagSets: list[list[str]]) -> None:
+        '''
+        The first candidate is the release flags themselves, the others replace its optimization flags.
+        '''
+
+        releaseFlags = [flag.lstrip('-') for flag in releaseFlags]
+        baseFlags = [flag for flag in releaseFlags if OPTIMIZATION_REGEX.fullmatch(flag) is None]
+        flagsList = [releaseFlags]
+        for flagSet in flagSets:
+            flags = baseFlags + [flag.lstrip('-') for flag in flagSet]
+            if sorted(flags) not in [sorted(otherFlags) for otherFlags in flagsList]:
+                flagsList.append(flags)
+
+        self.candidates = [Candidate(flags=flags, executablePath=os.path.join(self.directory, f'candidate{i}'))
+                           for i, flags in enumerate(flagsList)]
+
+    def __registerTests(self, testsNames: Optional[list[str]]) -> None:
+        testIndex = TestIndex()
+        if testsNames is None:
+            self.tests = testIndex.discover(os.path.dirname(self.mainExecutable) or '.')
+            return
+
+        self.tests, missing = testIndex.resolve(testsNames)
+        for testName in missing:
+            dumpError(f'No such file: {testName}')
+
+    def __compileCandidates(self) -> bool:
+        solutionPath = f'{self.mainExecutable}.{self.extention}'
+        if not os.path.isfile(solutionPath):
+            dumpError(f'No solution file: {solutionPath}')
+            return False
+
+        cache = CompilationCache()
+        precompiledHeaders = PrecompiledHeaders()
+        def compileCandidate(candidate: Candidate) -> None:
+            compiler = Compiler(self.compilerPath, ['-' + flag for flag in candidate.flags], cache, precompiledHeaders)
+            candidate.compilation = compiler.compile(solutionPath, candidate.executablePath, True)
+
+        # Compiled on the pool, but reported in the order of the candidates.
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(compileCandidate, candidate) for candidate in self.candidates]
+            for candidate, future in zip(self.candidates, futures):
+                future.result()
+                if candidate.compiled():
+                    print(colored('Compiled', 20, 255, 20), f'{candidate.name()} ({candidate.compilation.compilationTime}ms)')
+                else:
+                    dumpError(f'Did not compile with {candidate.name()}')
+
+        if not self.candidates[0].compiled():
+            print(self.candidates[0].compilation.output.decode(errors='replace'), end='')
+            return False
+        self.candidates = [candidate for candidate in self.candidates if candidate.compiled()]
+        return True
+
+    def __verdict(self, candidate: Candidate, test: Test) -> str:
+        with tempfile.TemporaryFile() as outputFile:
+            with test.openInput() as inputFile:
+                execution = runExecutable([candidate.executablePath], inputFile, self.timeLimit, outputFile, self.tracker)
+
+            if execution.timedOut:
+                return 'TL'
+            elif execution.returnCode != 0:
+                return 'RE'
+            elif test.testAnswer is None:
+                return 'Unknown'
+            with test.openAnswer() as testAnswer:
+                return 'OK' if self.comparator.compare(outputFile, testAnswer) is None else 'WA'
+
+    def __checkVerdicts(self) -> bool:
+        '''
+        Candidates with verdicts different from the release ones (e.g. -Ofast changed the precision) are dropped.
+        '''
+
+        if len(self.tests) == 0:
+            dumpError('No tests to benchmark on.')
+            return False
+
+        reference = self.candidates[0]
+        validCandidates = []
+        for candidate in self.candidates:
+            candidate.verdicts = {test.name(): self.__verdict(candidate, test) for test in self.tests}
+            changed = [name for name in candidate.verdicts if candidate.verdicts[name] != reference.verdicts[name]]
+            if len(changed) == 0:
+                validCandidates.append(candidate)
+                counts = {verdict: list(candidate.verdicts.values()).count(verdict) for verdict in set(candidate.verdicts.values())}
+                print(colored('Verdicts', 20, 255, 20), f'{candidate.name()}:',
+                      ', '.join(f'{verdict} {count}' for verdict, count in sorted(counts.items())))
+            else:
+                name = changed[0]
+                dumpError(f'Verdicts changed with {candidate.name()}: {name} ' +
+                          f'{reference.verdicts[name]} -> {candidate.verdicts[name]} (and {len(changed) - 1} more)')
+
+        self.candidates = validCandidates
+        return True
+
+    def __benchmark(self) -> None:
+        previousAffinity = pinToCore(self.core)
+        if previousAffinity is None:
+            dumpError('Pinning to a core is not supported on this platform.')
+
+        try:
+            with open(os.devnull, 'wb') as devNull:
+                rounds = self.warmupRuns + self.runs
+                for roundIndex in range(rounds):
+                    print(colored('\rRound ', 255, 255, 50), colored(f'{roundIndex + 1}/{rounds}', 0, 200, 200), sep='', end='', flush=True)
+                    # The order is rotated, so that no candidate always runs right after another one.
+                    shift = roundIndex % len(self.candidates)
+                    for candidate in self.candidates[shift:] + self.candidates[:shift]:
+                        totalTime = 0
+                        for test in self.tests:
+                            with test.openInput() as inputFile:
+                                execution = runExecutable([candidate.executablePath], inputFile, self.timeLimit, devNull, self.tracker)
+                            totalTime += execution.cpuTime
+                        if roundIndex >= self.warmupRuns:
+                            candidate.totalTimes.append(totalTime)
+            print()
+        finally:
+            restoreAffinity(previousAffinity)
+
+    def __dumpReport(self) -> None:
+        reference = self.candidates[0]
+        referenceMean, referenceError = confidenceInterval(reference.totalTimes)
+        ranked = sorted(self.candidates, key=lambda candidate: confidenceInterval(candidate.totalTimes)[0])
+
+        nameWidth = max(len(candidate.name()) for candidate in ranked)
+        print(colored(f'{"Flags":<{nameWidth}}  {"mean":>9}  {"95% ci":>9}  {"speedup":>7}', 255, 165, 0))
+        for candidate in ranked:
+            mean, error = confidenceInterval(candidate.totalTimes)
+            line = f'{candidate.name():<{nameWidth}}  {mean:>7.1f}ms  ±{error:>6.1f}ms  x{referenceMean / max(mean, 1e-9):>6.2f}'
+            print(colored(line, 255, 255, 50) if candidate is reference else line)
+
+        best = ranked[0]
+        bestMean, bestError = confidenceInterval(best.totalTimes)
+        if best is reference:
+            print(colored('The release flags are the fastest.', 20, 255, 20))
+        elif bestMean + bestError < referenceMean - referenceError:
+            print(colored(f'Fastest: {best.name()} (x{referenceMean / max(bestMean, 1e-9):.2f}), ' +
+                          'add its flags to the release section of the settings.', 20, 255, 20))
+            print(json.dumps({'flags': best.flags}))
+        else:
+            print(colored(f'Fastest: {best.name()}, but the difference is within the noise ' +
+                          '(add -runs to measure more precisely).', 120, 200, 235))
+
+        if self.export is not None:
+            self.__exportReport()
+
+    def __exportReport(self) -> None:
+        data = []
+        for candidate in self.candidates:
+            mean, error = confidenceInterval(candidate.totalTimes)
+            data.append({'flags': candidate.flags, 'mean_ms': mean, 'ci95_ms': error,
+                         'total_times_ms': candidate.totalTimes, 'verdicts': candidate.verdicts})
+        try:
+            with open(self.export, 'w') as exportFile:
+                exportFile.write(json.dumps(data, indent=4))
+        except OSError as error:
+            dumpError(f'Failed to export autotune results: {error}')
+
+def main() -> None:
+    releaseSettings = loadSettings().get('release', {})
+    autotuneSettings = loadSettings().get('autotune', {})
+
+    parser = argparse.ArgumentParser(description='Finds the fastest compilation flags on the local tests.')
+    parser.add_argument('exec',
+                        action='store',
+                        help='Path to the executable file (the solution is compiled from exec.ext).')
+
+    parser.add_argument('-ext',
+                        action='store',
+                        default='cpp',
+                        help='Extention of the solution file.')
+
+    parser.add_argument('-test',
+                        dest='tests',
+                        nargs='*',
+                        metavar='test',
+                        default=None,
+                        help='Tests to benchmark on (all tests by default).')
+
+    parser.add_argument('-compiler',
+                        action='store',
+                        default=releaseSettings.get('compiler', 'g++'),
+                        help='Compiler (the release one by default).')
+
+    parser.add_argument('-flags',
+                        nargs='*',
+                        default=releaseSettings.get('flags', []),
+                        help='Release flags, the optimization flags among them are replaced by the tuned ones.')
+
+    parser.add_argument('-set',
+                        dest='sets',
+                        action='append',
+                        metavar='flags',
+                        default=None,
+                        help='Set of flags to try, e.g. -set "O3 march=native". Can be given several times, ' +
+                             'replaces the sets of the settings.')
+
+    parser.add_argument('-runs',
+                        action='store',
+                        type=int,
+                        default=10,
+                        help='Number of measured rounds, each one runs every binary on all tests (10 by default).')
+
+    parser.add_argument('-warmup',
+                        action='store',
+                        type=int,
+                        default=1,
+                        help='Number of warmup rounds (1 by default).')
+
+    parser.add_argument('-core',
+                        action='store',
+                        type=int,
+                        default=None,
+                        help='Core to pin to (the last one by default).')
+
+    parser.add_argument('-jobs',
+                        action='store',
+                        type=int,
+                        default=os.cpu_count() or 1,
+                        help='Number of binaries to compile concurrently (number of cores by default).')
+
+    parser.add_argument('-export',
+                        action='store',
+                        metavar='path',
+                        default=None,
+                        help='Save the timings of all flag sets as json.')
+
+    args = parser.parse_args()
+    coreError = findCoreError(args.core)
+    if coreError is not None:
+        dumpError(coreError)
+        return
+
+    args.flagsets = autotuneSettings.get('flag_sets', DEFAULT_FLAG_SETS)
+    tuner = AutoTuner(args)
+    runProcess(tuner.run)
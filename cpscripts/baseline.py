@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+
+from dataclasses import dataclass
+from typing      import Optional
+
+@dataclass
+class TestTiming:
+    cpuTime:    float
+    # None if the peak did not exceed the memory of the harness and so is unknown.
+    peakMemory: Optional[int]
+
+@dataclass
+class Regression:
+    testName:     str
+    baselineTime: float
+    currentTime:  float
+
+    def ratio(self) -> float:
+        return self.currentTime / max(self.baselineTime, 1)
+
+class PerformanceBaseline:
+    '''
+    Timings of the solution on each test, stored next to the solution and keyed by the hash of the source and flags.
+    For each set of flags one of the keys is accepted as the baseline, the timings of other keys built with the same flags
+    are compared against it, so debug and release timings never mix.
+
+    Variables:
+    path: str
+    data: dict
+    '''
+
+    FILE_SUFFIX    = '.baseline.json'
+    MAX_KEYS       = 16
+    NOISE_TIME_MS  = 10
+
+    def __init__(self, executablePath: str):
+        self.path = executablePath + PerformanceBaseline.FILE_SUFFIX
+        self.data = {'accepted': {}, 'keys': []}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as baselineFile:
+                    self.data.update(json.loads(baselineFile.read()))
+            except ValueError:
+                pass
+        if not isinstance(self.data['accepted'], dict):
+            # Files written before the baselines were split by flags: the accepted key is unknown.
+            self.data['accepted'] = {}
+
+    @staticmethod
+    def computeKey(solutionPath: str, flags: list[str]) -> Optional[str]:
+        if not os.path.isfile(solutionPath):
+            return None
+
+        hasher = hashlib.sha256()
+        with open(solutionPath, 'rb') as solutionFile:
+            hasher.update(solutionFile.read())
+        hasher.update(b'\0'.join(flag.encode() for flag in flags))
+        return hasher.hexdigest()[:16]
+
+    @staticmethod
+    def computeFlagsKey(flags: list[str]) -> str:
+        return hashlib.sha256(b'\0'.join(flag.encode() for flag in flags)).hexdigest()[:16]
+
+    def acceptedKey(self, flagsKey: str) -> Optional[str]:
+        return self.data['accepted'].get(flagsKey)
+
+    def accept(self, key: str, flagsKey: str) -> None:
+        self.data['accepted'][flagsKey] = key
+
+    def record(self, key: str, flagsKey: str, timings: dict[str, TestTiming]) -> None:
+        entry = self.__findEntry(key)
+        if entry is None:
+            entry = {'key': key, 'flags': flagsKey, 'tests': {}}
+            self.data['keys'].append(entry)
+
+        for testName, timing in timings.items():
+            entry['tests'][testName] = {'cpu_ms': timing.cpuTime, 'memory_kb': timing.peakMemory}
+
+        # Keep the file small: drop the oldest keys, but never the accepted ones.
+        accepted = set(self.data['accepted'].values())
+        while len(self.data['keys']) > PerformanceBaseline.MAX_KEYS:
+            oldest = next((entry for entry in self.data['keys'] if entry['key'] not in accepted), None)
+            if oldest is None:
+                break
+            self.data['keys'].remove(oldest)
+
+    def findRegressions(self, flagsKey: str, timings: dict[str, TestTiming], threshold: float) -> list[Regression]:
+        '''
+        Compares the timings with the baseline accepted for the same flags.
+        '''
+
+        acceptedKey = self.acceptedKey(flagsKey)
+        baselineEntry = None if acceptedKey is None else self.__findEntry(acceptedKey)
+        if baselineEntry is None or baselineEntry.get('flags') != flagsKey:
+            return []
+
+        regressions = []
+        for testName, timing in timings.items():
+            if testName not in baselineEntry['tests']:
+                continue
+
+            baselineTime = baselineEntry['tests'][testName]['cpu_ms']
+            if timing.cpuTime > baselineTime * threshold and timing.cpuTime - baselineTime > PerformanceBaseline.NOISE_TIME_MS:
+                regressions.append(Regression(testName=testName, baselineTime=baselineTime, currentTime=timing.cpuTime))
+        return regressions
+
+    def save(self) -> None:
+        with open(self.path, 'w') as baselineFile:
+            baselineFile.write(json.dumps(self.data, indent=4))
+
+# Private:
+
+    def __findEntry(self, key: str) -> Optional[dict]:
+        for entry in self.data['keys']:
+            if entry['key'] == key:
+                return entry
+        return None
@@ -0,0 +1,170 @@
+import io
+import os
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses        import dataclass
+from typing             import Any, Callable, Optional
+from .compiler          import CompilationResult, Compiler
+from .diff_view         import DiffView
+from .utils             import colored, dumpError
+
+# Generators, brute force solutions, checkers and interactors live next to the solution, but are not tested.
+HELPER_REGEX = re.compile(r'(gen|generator|brute|checker|check|interactor|interact|validator)([0-9_\-].*)?')
+
+def findSolutions(directory: str, extention: str, solutionNames: list[str]) -> list[str]:
+    '''
+    Source files of the solutions: the ones named as the problem files of the settings (e.g. a.cpp) if there are any,
+    otherwise all the sources except the helpers.
+    '''
+
+    sources = [name for name in sorted(os.listdir(directory))
+               if name.endswith(f'.{extention}') and os.path.isfile(os.path.join(directory, name))]
+    solutions = [name for name in sources if name in solutionNames]
+    if len(solutions) > 0:
+        return solutions
+    return [name for name in sources if not HELPER_REGEX.fullmatch(name[:-len(extention) - 1])]
+
+def findDirectoryTargets(directory: str, extention: str, solutionNames: list[str]) -> list[str]:
+    '''
+    Solutions of the directory and of its subdirectories (problems of a contest), without the extention.
+    '''
+
+    directories = [directory] + sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                                       if os.path.isdir(os.path.join(directory, name)))
+    targets = []
+    for sourceDirectory in directories:
+        for name in findSolutions(sourceDirectory, extention, solutionNames):
+            targets.append(os.path.normpath(os.path.join(sourceDirectory, name[:-len(extention) - 1])))
+    return targets
+
+def findTargets(paths: list[str], extention: str, solutionNames: Optional[list[str]]=None) -> list[str]:
+    solutionNames = [] if solutionNames is None else solutionNames
+    targets = []
+    for path in paths:
+        if os.path.isdir(path):
+            targets += findDirectoryTargets(path, extention, solutionNames)
+        elif path.endswith(f'.{extention}'):
+            targets.append(path[:-len(extention) - 1])
+        else:
+            targets.append(path)
+    return targets
+
+@dataclass
+class ProblemBuild:
+    executable: str
+    results:    list[CompilationResult]
+    verdicts:   Optional[dict[Any, int]] = None
+
+    def success(self) -> bool:
+        return all(result.success for result in self.results)
+
+class BatchBuilder:
+    '''
+    Compiles several solutions (e.g. all problems of a contest) on a pool of workers, then tests them one by one.
+    The compilers are shared, so are the compilation cache and the precompiled headers.
+
+    Variables:
+    targets:      list[str]
+    extention:    str
+    builds:       list[tuple[Compiler, str]]
+    jobs:         int
+    compileOnly:  bool
+    createTester: Callable[[str], Any]
+    '''
+
+    ERROR_LINES = 20
+
+    def __init__(self, targets: list[str], extention: str, builds: list[tuple[Compiler, str]], jobs: int,
+                 compileOnly: bool, createTester: Callable[[str], Any]):
+        self.targets = targets
+        self.extention = extention
+        self.builds = builds
+        self.jobs = jobs
+        self.compileOnly = compileOnly
+        self.createTester = createTester
+
+    def run(self) -> None:
+        if len(self.targets) == 0:
+            dumpError('No solutions found.')
+            return
+
+        problems = [ProblemBuild(executable=target, results=[]) for target in self.targets]
+        if len(self.builds) > 0:
+            self.__compileAll(problems)
+        if self.compileOnly:
+            return
+
+        for problem in problems:
+            if not problem.success():
+                continue
+
+            print('\n' + colored(f'Problem {problem.executable}', 255, 255, 50))
+            tester = self.createTester(problem.executable)
+            tester.run()
+            problem.verdicts = tester.verdictsCounter
+
+        self.__dumpTestsSummary(problems)
+
+# Private:
+
+    def __compileProblem(self, problem: ProblemBuild) -> None:
+        solutionPath = f'{problem.executable}.{self.extention}'
+        if not os.path.isfile(solutionPath):
+            problem.results = [CompilationResult(success=False, compilationTime=0, cached=False,
+                                                 output=f'No solution file: {solutionPath}\n'.encode())]
+            return
+
+        for compiler, suffix in self.builds:
+            problem.results.append(compiler.compile(solutionPath, problem.executable + suffix, True))
+
+    def __dumpCompilationStatus(self, problem: ProblemBuild, nameWidth: int) -> None:
+        statuses = []
+        for result in problem.results:
+            if not result.success:
+                statuses.append(colored('failed', 255, 70, 0))
+            elif result.cached:
+                statuses.append(colored('cached', 20, 255, 20))
+            else:
+                statuses.append(colored(f'{result.compilationTime}ms', 20, 255, 20))
+        print(f'{problem.executable:<{nameWidth}}  ' + '  '.join(statuses))
+
+    def __compileAll(self, problems: list[ProblemBuild]) -> None:
+        # Problems are compiled on the pool, but reported strictly in the order of the targets.
+        startTime = time.time()
+        nameWidth = max(len(problem.executable) for problem in problems)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self.__compileProblem, problem) for problem in problems]
+            for problem, future in zip(problems, futures):
+                future.result()
+                self.__dumpCompilationStatus(problem, nameWidth)
+
+        for problem in problems:
+            for result in problem.results:
+                if not result.success and len(result.output) > 0:
+                    print('\n' + colored(f'{problem.executable}:', 255, 70, 0))
+                    DiffView().dumpHead(io.BytesIO(result.output), BatchBuilder.ERROR_LINES)
+                    break
+
+        compiled = sum(problem.success() for problem in problems)
+        cached = sum(all(result.cached for result in problem.results) for problem in problems)
+        summary = f'Compiled {compiled}/{len(problems)} in {time.time() - startTime:.1f}s ({cached} cached).'
+        if compiled == len(problems):
+            print(colored(summary, 20, 255, 20))
+        else:
+            dumpError(summary)
+
+    @staticmethod
+    def __dumpTestsSummary(problems: list[ProblemBuild]) -> None:
+        print('\n' + colored('Summary:', 255, 165, 0))
+        nameWidth = max(len(problem.executable) for problem in problems)
+        for problem in problems:
+            if problem.verdicts is None:
+                print(f'{problem.executable:<{nameWidth}}  ' + colored('did not compile', 255, 70, 0))
+                continue
+
+            counts = '  '.join(f'{verdict.name}: {count}' for verdict, count in problem.verdicts.items() if count > 0)
+            passed = all(verdict.name == 'OK' or count == 0 for verdict, count in problem.verdicts.items())
+            color = (20, 255, 20) if passed else (255, 70, 0)
+            print(f'{problem.executable:<{nameWidth}}  ' + colored(counts or 'no tests', *color))
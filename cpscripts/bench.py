@@ -0,0 +1,130 @@
+import csv
+import json
+import math
+
+from dataclasses import dataclass
+from typing      import Optional
+from .utils      import colored, dumpError
+
+def percentile(values: list[float], fraction: float) -> float:
+    '''
+    Percentile with linear interpolation between the closest ranks.
+    '''
+
+    if len(values) == 0:
+        return 0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# Two-sided 95% critical values of Student's t-distribution by degrees of freedom.
+T_CRITICAL_VALUES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                     2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086]
+Z_CRITICAL_VALUE  = 1.96
+
+def confidenceInterval(values: list[float]) -> tuple[float, float]:
+    '''
+    Mean and the half-width of its 95% confidence interval.
+    '''
+
+    if len(values) == 0:
+        return 0, 0
+    mean = sum(values) / len(values)
+    if len(values) == 1:
+        return mean, math.inf
+
+    deviation = math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
+    degrees = len(values) - 1
+    critical = T_CRITICAL_VALUES[degrees - 1] if degrees <= len(T_CRITICAL_VALUES) else Z_CRITICAL_VALUE
+    return mean, critical * deviation / math.sqrt(len(values))
+
+@dataclass
+class BenchmarkResult:
+    name:       str
+    verdict:    str
+    cpuTimes:   list[int]
+    wallTimes:  list[int]
+    peakMemory: int
+    # Peak memory which did not exceed the memory of the harness is only an upper bound, see getHarnessMemory.
+    memoryExact: bool = True
+
+    def minimum(self) -> float:
+        return min(self.cpuTimes, default=0)
+
+    def median(self) -> float:
+        return percentile(self.cpuTimes, 0.5)
+
+    def p95(self) -> float:
+        return percentile(self.cpuTimes, 0.95)
+
+    def peakMemoryMb(self) -> float:
+        return self.peakMemory / 1024
+
+    def addMemory(self, peakMemory: int, memoryExact: bool) -> None:
+        '''
+        Exact peaks take precedence over the upper bounds.
+        '''
+
+        if memoryExact and not self.memoryExact:
+            self.peakMemory, self.memoryExact = peakMemory, True
+        elif memoryExact == self.memoryExact:
+            self.peakMemory = max(self.peakMemory, peakMemory)
+
+    def formatMemory(self) -> str:
+        return ('' if self.memoryExact else '<') + f'{self.peakMemoryMb():.1f}MB'
+
+    def exportedMemory(self) -> Optional[float]:
+        return round(self.peakMemoryMb(), 2) if self.memoryExact else None
+
+    def toDict(self) -> dict:
+        return {'test':           self.name,
+                'verdict':        self.verdict,
+                'cpu_min_ms':     self.minimum(),
+                'cpu_median_ms':  self.median(),
+                'cpu_p95_ms':     self.p95(),
+                'peak_memory_mb': self.exportedMemory(),
+                'cpu_times_ms':   self.cpuTimes,
+                'wall_times_ms':  self.wallTimes}
+
+def formatBenchmarkResult(result: BenchmarkResult) -> str:
+    return f'min {result.minimum():.0f}ms  median {result.median():.0f}ms  ' +\
+           f'p95 {result.p95():.0f}ms  {result.formatMemory()}'
+
+def dumpBenchmarkTable(results: list[BenchmarkResult]) -> None:
+    nameWidth = max([len('Test'), len('Total')] + [len(result.name) for result in results])
+    header = f'{"Test":<{nameWidth}}  {"Verdict":<7}  {"min":>8}  {"median":>8}  {"p95":>8}  {"memory":>9}'
+    print(colored(header, 255, 165, 0))
+
+    for result in results:
+        print(f'{result.name:<{nameWidth}}  {result.verdict:<7}  {result.minimum():>6.0f}ms  {result.median():>6.0f}ms  ' +
+              f'{result.p95():>6.0f}ms  {result.formatMemory():>9}')
+
+    totalMinimum = sum(result.minimum() for result in results)
+    totalMedian = sum(result.median() for result in results)
+    totalP95 = sum(result.p95() for result in results)
+    total = BenchmarkResult(name='Total', verdict='', cpuTimes=[], wallTimes=[], peakMemory=0, memoryExact=False)
+    for result in results:
+        total.addMemory(result.peakMemory, result.memoryExact)
+    print(colored(f'{"Total":<{nameWidth}}  {"":<7}  {totalMinimum:>6.0f}ms  {totalMedian:>6.0f}ms  ' +
+                  f'{totalP95:>6.0f}ms  {total.formatMemory():>9}', 255, 255, 50))
+
+def exportBenchmark(results: list[BenchmarkResult], path: str) -> None:
+    '''
+    Saves the results as json if the path ends with .json, otherwise as csv.
+    '''
+
+    try:
+        with open(path, 'w', newline='') as exportFile:
+            if path.endswith('.json'):
+                exportFile.write(json.dumps([result.toDict() for result in results], indent=4))
+                return
+
+            writer = csv.writer(exportFile)
+            writer.writerow(['test', 'verdict', 'cpu_min_ms', 'cpu_median_ms', 'cpu_p95_ms', 'peak_memory_mb', 'runs'])
+            for result in results:
+                writer.writerow([result.name, result.verdict, result.minimum(), result.median(), result.p95(),
+                                 result.exportedMemory(), len(result.cpuTimes)])
+    except OSError as error:
+        dumpError(f'Failed to export benchmark results: {error}')
@@ -3,6 +3,14 @@ from bs4 import BeautifulSoup
 
 from cpscripts.lib.problem import Problem
 
+def parseLimit(problemNode, limitClass: str) -> float:
+    limitNode = problemNode.find('div', {'class': limitClass})
+    if limitNode is None:
+        return None
+
+    value = re.search(r'[0-9]+(\.[0-9]+)?', limitNode.text)
+    return None if value is None else float(value.group(0))
+
 def parseProblemFromHtml(html: str, link: str=None) -> Problem:
     soup = BeautifulSoup(html, 'html.parser')
     problemNode = soup.find('div', {'class' : 'problemindexholder'})
@@ -10,6 +18,8 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
     index = problemNode['problemindex']
     title = problemNode.find('div', {'class': 'problem-statement'}).find('div', {'class': 'header'}).find('div', {'class': 'title'}).text
     title = ''.join(title.split('.')[1:]).strip()
+    timeLimit = parseLimit(problemNode, 'time-limit')
+    memoryLimit = parseLimit(problemNode, 'memory-limit')
     inputs = []
     outputs = []
 
@@ -37,4 +47,5 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
         else:
             tags.append(str(node.text).strip())
 
-    return Problem(title=title, index=index, link=link, tags=tags, difficulty=difficulty, inputs=inputs, outputs=outputs)
+    return Problem(title=title, index=index, link=link, tags=tags, difficulty=difficulty, inputs=inputs, outputs=outputs,
+                   timeLimit=timeLimit, memoryLimit=memoryLimit)
@@ -0,0 +1,244 @@
+import hashlib
+import io
+import mmap
+import os
+
+from contextlib  import contextmanager
+from dataclasses import dataclass
+from enum        import Enum
+from typing      import BinaryIO, Iterator, Optional
+
+class CompareMode(Enum):
+    LINES  = 'lines'
+    TOKENS = 'tokens'
+    FLOAT  = 'float'
+
+@dataclass
+class Mismatch:
+    line:     int
+    column:   int
+    output:   Optional[str]
+    expected: Optional[str]
+    unit:     str = 'column'
+
+    SNIPPET_LENGTH = 50
+
+    @staticmethod
+    def snippet(data: Optional[bytes]) -> Optional[str]:
+        if data is None:
+            return None
+
+        text = data.decode(errors='replace')
+        if len(text) > Mismatch.SNIPPET_LENGTH:
+            text = text[:Mismatch.SNIPPET_LENGTH] + '...'
+        return text
+
+    def __str__(self):
+        output = 'end of output' if self.output is None else f'\'{self.output}\''
+        expected = 'end of output' if self.expected is None else f'\'{self.expected}\''
+        return f'line {self.line}, {self.unit} {self.column}: {output} instead of {expected}'
+
+@contextmanager
+def openMapped(path: str) -> Iterator[BinaryIO]:
+    '''
+    Opens the file as a read-only memory map (empty files can't be mapped, so they are given as an empty stream).
+    '''
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield io.BytesIO(b'')
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mappedFile:
+            yield mappedFile
+
+CHUNK_SIZE = 1 << 16
+
+def streamsIdentical(output: BinaryIO, expected: BinaryIO) -> bool:
+    '''
+    Byte-to-byte comparison of the streams from their current positions, chunk by chunk.
+    '''
+
+    while True:
+        outputChunk = output.read(CHUNK_SIZE)
+        expectedChunk = expected.read(CHUNK_SIZE)
+        if outputChunk != expectedChunk:
+            return False
+        if len(outputChunk) == 0:
+            return True
+
+def readTokenBlocks(stream: BinaryIO) -> Iterator[list[bytes]]:
+    '''
+    Whitespace-separated tokens of the stream, one list per chunk read. A token cut by the end of a chunk
+    is carried over to the next one, so only the current chunk is kept in memory.
+    '''
+
+    carry = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if len(chunk) == 0:
+            if len(carry) > 0:
+                yield [carry]
+            return
+
+        chunk = carry + chunk
+        tokens = chunk.split()
+        carry = b''
+        if len(tokens) > 0 and not chunk[-1:].isspace():
+            carry = tokens.pop()
+        if len(tokens) > 0:
+            yield tokens
+
+def hashTokens(stream: BinaryIO) -> bytes:
+    '''
+    Hash of the whitespace-separated tokens of the stream.
+    '''
+
+    digest = hashlib.blake2b(digest_size=16)
+    stream.seek(0)
+    for tokens in readTokenBlocks(stream):
+        digest.update(b' '.join(tokens) + b' ')
+    return digest.digest()
+
+def tokensMatch(output: BinaryIO, expected: BinaryIO) -> bool:
+    '''
+    Whether the streams consist of the same tokens, the byte-to-byte equality is checked first as it is cheaper.
+    '''
+
+    output.seek(0)
+    expected.seek(0)
+    if streamsIdentical(output, expected):
+        return True
+    return hashTokens(output) == hashTokens(expected)
+
+class OutputComparator:
+    '''
+    Compares outputs as streams, so memory usage doesn't depend on the size of the output.
+    Streams are any objects with read, readline and seek (files, memory maps, BytesIO).
+
+    Modes:
+    lines  - lines must be equal up to leading and trailing whitespaces (trailing empty lines are ignored),
+    tokens - whitespace-separated tokens must be equal,
+    float  - as tokens, but numbers are compared with absolute or relative epsilon.
+
+    Variables:
+    mode:        CompareMode
+    absoluteEps: float
+    relativeEps: float
+    '''
+
+    DEFAULT_EPS = 1e-6
+
+    def __init__(self, mode: CompareMode=CompareMode.LINES, absoluteEps: float=DEFAULT_EPS, relativeEps: float=DEFAULT_EPS):
+        self.mode = mode
+        self.absoluteEps = absoluteEps
+        self.relativeEps = relativeEps
+
+    def compare(self, output: BinaryIO, expected: BinaryIO) -> Optional[Mismatch]:
+        '''
+        Returns None if outputs match, otherwise the position of the first mismatch.
+        '''
+
+        output.seek(0)
+        expected.seek(0)
+        if streamsIdentical(output, expected):
+            return None
+
+        output.seek(0)
+        expected.seek(0)
+        if self.mode == CompareMode.LINES:
+            return self.__compareLines(output, expected)
+        return self.__compareTokens(output, expected)
+
+# Private:
+
+    @staticmethod
+    def __compareLines(output: BinaryIO, expected: BinaryIO) -> Optional[Mismatch]:
+        lineIndex = 0
+        while True:
+            outputLine = output.readline()
+            expectedLine = expected.readline()
+            lineIndex += 1
+            if len(outputLine) == 0 and len(expectedLine) == 0:
+                return None
+
+            outputLine = outputLine.strip()
+            expectedLine = expectedLine.strip()
+            if outputLine == expectedLine:
+                continue
+
+            column = 0
+            while column < min(len(outputLine), len(expectedLine)) and outputLine[column] == expectedLine[column]:
+                column += 1
+            return Mismatch(line=lineIndex,
+                            column=column + 1,
+                            output=Mismatch.snippet(outputLine[column:]),
+                            expected=Mismatch.snippet(expectedLine[column:]))
+
+    def __tokensEqual(self, outputToken: bytes, expectedToken: bytes) -> bool:
+        if outputToken == expectedToken:
+            return True
+        if self.mode != CompareMode.FLOAT:
+            return False
+
+        try:
+            outputValue = float(outputToken)
+            expectedValue = float(expectedToken)
+        except ValueError:
+            return False
+
+        difference = abs(outputValue - expectedValue)
+        return difference <= self.absoluteEps or difference <= self.relativeEps * abs(expectedValue)
+
+    def __compareTokens(self, output: BinaryIO, expected: BinaryIO) -> Optional[Mismatch]:
+        outputBlocks = readTokenBlocks(output)
+        expectedBlocks = readTokenBlocks(expected)
+        outputTokens = []
+        expectedTokens = []
+        tokenIndex = 0
+
+        while True:
+            if len(outputTokens) == 0:
+                outputTokens = next(outputBlocks, None)
+            if len(expectedTokens) == 0:
+                expectedTokens = next(expectedBlocks, None)
+
+            if outputTokens is None and expectedTokens is None:
+                return None
+            if outputTokens is None or expectedTokens is None:
+                outputToken = None if outputTokens is None else outputTokens[0]
+                expectedToken = None if expectedTokens is None else expectedTokens[0]
+                return self.__tokenMismatch(output, tokenIndex, outputToken, expectedToken)
+
+            length = min(len(outputTokens), len(expectedTokens))
+            if outputTokens[:length] != expectedTokens[:length]:
+                for i in range(length):
+                    if not self.__tokensEqual(outputTokens[i], expectedTokens[i]):
+                        return self.__tokenMismatch(output, tokenIndex + i, outputTokens[i], expectedTokens[i])
+
+            tokenIndex += length
+            outputTokens = outputTokens[length:]
+            expectedTokens = expectedTokens[length:]
+
+    @staticmethod
+    def __tokenMismatch(output: BinaryIO, tokenIndex: int, outputToken: Optional[bytes], expectedToken: Optional[bytes]) -> Mismatch:
+        '''
+        Finds the line and column (token index inside the line) of the token with the given index in the output.
+        '''
+
+        output.seek(0)
+        lineIndex = 0
+        tokensBefore = 0
+        while True:
+            line = output.readline()
+            lineIndex += 1
+            lineTokens = len(line.split())
+            if len(line) == 0 or tokensBefore + lineTokens > tokenIndex:
+                break
+            tokensBefore += lineTokens
+
+        return Mismatch(line=lineIndex,
+                        column=tokenIndex - tokensBefore + 1,
+                        output=Mismatch.snippet(outputToken),
+                        expected=Mismatch.snippet(expectedToken),
+                        unit='token')
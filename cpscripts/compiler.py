@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from dataclasses import dataclass
+from threading   import Lock
+from typing      import Optional
+
+@dataclass
+class CompilationResult:
+    success:         bool
+    compilationTime: int
+    cached:          bool
+    savedTime:       int = 0
+    output:          bytes = b''
+
+def getCacheRoot() -> str:
+    cacheRoot = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cacheRoot, 'cpscripts')
+
+class CompilationCache:
+    '''
+    Content-addressed storage of compiled binaries with size-bounded LRU eviction.
+    Last access time of an entry is tracked by its mtime.
+
+    Variables:
+    directory: str
+    maxSize:   int
+    '''
+
+    DEFAULT_MAX_SIZE_MB = 512
+
+    def __init__(self, maxSizeMb: int=DEFAULT_MAX_SIZE_MB, directory: Optional[str]=None):
+        self.directory = directory if directory is not None else CompilationCache.defaultDirectory()
+        self.maxSize = maxSizeMb * 1024 * 1024
+
+    @staticmethod
+    def defaultDirectory() -> str:
+        return os.path.join(getCacheRoot(), 'binaries')
+
+    def lookup(self, key: str, executablePath: str) -> bool:
+        entryPath = os.path.join(self.directory, key)
+        if not os.path.isfile(entryPath):
+            return False
+
+        try:
+            os.utime(entryPath)
+            temporaryPath = f'{executablePath}.{os.getpid()}.tmp'
+            shutil.copy2(entryPath, temporaryPath)
+            os.replace(temporaryPath, executablePath)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key: str, executablePath: str) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporaryPath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(descriptor)
+            shutil.copy2(executablePath, temporaryPath)
+            os.replace(temporaryPath, os.path.join(self.directory, key))
+            self.__evict()
+        except OSError:
+            pass
+
+# Private:
+
+    def __evict(self) -> None:
+        entries = []
+        for entryName in os.listdir(self.directory):
+            entryPath = os.path.join(self.directory, entryName)
+            try:
+                stat = os.stat(entryPath)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entryPath))
+
+        totalSize = sum(size for _, size, _ in entries)
+        for _, size, entryPath in sorted(entries):
+            if totalSize <= self.maxSize:
+                break
+            try:
+                os.remove(entryPath)
+                totalSize -= size
+            except OSError:
+                pass
+
+@dataclass
+class PrecompiledHeader:
+    headerPath: str
+    savedTime:  int
+
+class PrecompiledHeaders:
+    '''
+    Builds and reuses precompiled headers for a (compiler, flags, headers) triple.
+    The header is passed to the compiler with -include, so both gcc (.gch) and clang (.pch) pick it up.
+
+    Variables:
+    directory: str
+    '''
+
+    INCLUDE_REGEX     = re.compile(r'^\s*#\s*include\s*<([^>]+)>\s*(//.*)?$')
+    COMMENT_REGEX     = re.compile(r'^\s*(//.*)?$')
+    HEADER_NAME       = 'pch.h'
+    META_NAME         = 'meta.json'
+    # One lock per entry, so headers for different compilers and flags are built concurrently.
+    BUILD_LOCKS       = dict()
+    BUILD_LOCKS_LOCK  = Lock()
+
+    def __init__(self, directory: Optional[str]=None):
+        self.directory = directory if directory is not None else os.path.join(getCacheRoot(), 'pch')
+
+    @staticmethod
+    def collectHeaders(solutionPath: str) -> list[str]:
+        '''
+        System headers included by the first lines of the solution, before any other directive or code.
+        The header is included before the whole source, so anything above the includes (like #define _GLIBCXX_DEBUG
+        or #pragma GCC target) could change their meaning, such sources are compiled without the precompiled header.
+        '''
+
+        headers = []
+        insideComment = False
+        with open(solutionPath, 'r', errors='replace') as solutionFile:
+            for line in solutionFile:
+                if insideComment or line.lstrip().startswith('/*'):
+                    insideComment = '*/' not in line
+                    if insideComment or line.strip().endswith('*/'):
+                        continue
+                    break
+                if PrecompiledHeaders.COMMENT_REGEX.match(line):
+                    continue
+                include = PrecompiledHeaders.INCLUDE_REGEX.match(line)
+                if include is None:
+                    break
+                if include.group(1) not in headers:
+                    headers.append(include.group(1))
+        return headers
+
+    def get(self, compilerPath: str, identity: bytes, flags: list[str], headers: list[str]) -> Optional[PrecompiledHeader]:
+        headerData = ''.join(f'#include <{header}>\n' for header in headers)
+        hasher = hashlib.sha256()
+        hasher.update(identity)
+        hasher.update(b'\0'.join(flag.encode() for flag in flags) + b'\0')
+        hasher.update(headerData.encode())
+        entryDirectory = os.path.join(self.directory, hasher.hexdigest())
+
+        with PrecompiledHeaders.__buildLock(entryDirectory):
+            if not os.path.isfile(os.path.join(entryDirectory, PrecompiledHeaders.META_NAME)):
+                self.__build(compilerPath, identity, flags, headerData, entryDirectory)
+
+        try:
+            with open(os.path.join(entryDirectory, PrecompiledHeaders.META_NAME), 'r') as metaFile:
+                meta = json.loads(metaFile.read())
+        except (OSError, ValueError):
+            return None
+
+        if not meta.get('success', False):
+            return None
+        return PrecompiledHeader(headerPath=os.path.join(entryDirectory, PrecompiledHeaders.HEADER_NAME),
+                                 savedTime=meta.get('savedTime', 0))
+
+# Private:
+
+    @staticmethod
+    def __buildLock(entryDirectory: str) -> Lock:
+        with PrecompiledHeaders.BUILD_LOCKS_LOCK:
+            return PrecompiledHeaders.BUILD_LOCKS.setdefault(entryDirectory, Lock())
+
+    @staticmethod
+    def __timeCommand(command: list[str]) -> Optional[float]:
+        startTime = time.time()
+        try:
+            status = subprocess.run(command, capture_output=True)
+        except OSError:
+            return None
+        return None if status.returncode != 0 else time.time() - startTime
+
+    def __build(self, compilerPath: str, identity: bytes, flags: list[str], headerData: str, entryDirectory: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        buildDirectory = tempfile.mkdtemp(dir=self.directory, suffix='.tmp')
+        headerPath = os.path.join(buildDirectory, PrecompiledHeaders.HEADER_NAME)
+        with open(headerPath, 'w') as headerFile:
+            headerFile.write(headerData)
+
+        extention = 'pch' if b'clang' in identity else 'gch'
+        emptySourcePath = os.path.join(buildDirectory, 'empty.cpp')
+        with open(emptySourcePath, 'w'):
+            pass
+
+        parseCommand = [compilerPath, '-fsyntax-only', '-x', 'c++', headerPath] + flags
+        buildCommand = [compilerPath, '-x', 'c++-header', headerPath, '-o', f'{headerPath}.{extention}'] + flags
+        usageCommand = [compilerPath, '-fsyntax-only', emptySourcePath, '-include', headerPath] + flags
+
+        meta = {'success': False}
+        parseTime = self.__timeCommand(parseCommand)
+        if parseTime is not None and self.__timeCommand(buildCommand) is not None:
+            usageTime = self.__timeCommand(usageCommand)
+            if usageTime is not None:
+                meta = {'success': True, 'savedTime': max(0, int((parseTime - usageTime) * 1000))}
+
+        os.remove(emptySourcePath)
+        with open(os.path.join(buildDirectory, PrecompiledHeaders.META_NAME), 'w') as metaFile:
+            metaFile.write(json.dumps(meta))
+
+        shutil.rmtree(entryDirectory, ignore_errors=True)
+        try:
+            os.replace(buildDirectory, entryDirectory)
+        except OSError:
+            shutil.rmtree(buildDirectory, ignore_errors=True)
+
+class Compiler:
+    '''
+    Variables:
+    compilerPath:       str
+    flags:              list[str]
+    cache:              CompilationCache or None
+    precompiledHeaders: PrecompiledHeaders or None
+    extraArguments:     list[str], additional sources and libraries, they are not used for the precompiled header
+    '''
+
+    IDENTITIES_LOCK = Lock()
+    IDENTITIES      = dict()
+
+    def __init__(self, compilerPath: str, flags: list[str], cache: Optional[CompilationCache]=None,
+                 precompiledHeaders: Optional[PrecompiledHeaders]=None, extraArguments: Optional[list[str]]=None):
+        self.compilerPath = compilerPath
+        self.flags = flags
+        self.cache = cache
+        self.precompiledHeaders = precompiledHeaders
+        self.extraArguments = [] if extraArguments is None else list(extraArguments)
+
+    def compile(self, solutionPath: str, executablePath: str, captureOutput: bool=False) -> CompilationResult:
+        '''
+        With captureOutput the diagnostics of the compiler are returned in the result instead of being printed.
+        '''
+
+        key = None if self.cache is None else self.__computeKey(solutionPath)
+        if key is not None and self.cache.lookup(key, executablePath):
+            return CompilationResult(success=True, compilationTime=0, cached=True)
+
+        command = [self.compilerPath, solutionPath, '-o', executablePath] + self.flags + self.extraArguments
+        precompiledHeader = self.__getPrecompiledHeader(solutionPath)
+        if precompiledHeader is not None:
+            command += ['-include', precompiledHeader.headerPath]
+
+        compilationStartTime = time.time()
+        status = subprocess.run(command, stdout=subprocess.PIPE if captureOutput else None,
+                                stderr=subprocess.STDOUT if captureOutput else None)
+        compilationTime = int((time.time() - compilationStartTime) * 1000)
+
+        success = status.returncode == 0
+        if success and key is not None:
+            self.cache.store(key, executablePath)
+        return CompilationResult(success=success,
+                                 compilationTime=compilationTime,
+                                 cached=False,
+                                 savedTime=0 if precompiledHeader is None else precompiledHeader.savedTime,
+                                 output=status.stdout or b'')
+
+# Private:
+
+    def __identity(self) -> bytes:
+        with Compiler.IDENTITIES_LOCK:
+            if self.compilerPath not in Compiler.IDENTITIES:
+                resolvedPath = shutil.which(self.compilerPath) or self.compilerPath
+                resolvedPath = os.path.realpath(resolvedPath)
+                try:
+                    version = subprocess.run([resolvedPath, '--version'], capture_output=True).stdout
+                except OSError:
+                    version = b''
+                Compiler.IDENTITIES[self.compilerPath] = resolvedPath.encode() + b'\0' + version
+            return Compiler.IDENTITIES[self.compilerPath]
+
+    def __getPrecompiledHeader(self, solutionPath: str) -> Optional[PrecompiledHeader]:
+        if self.precompiledHeaders is None:
+            return None
+
+        headers = PrecompiledHeaders.collectHeaders(solutionPath)
+        if len(headers) == 0:
+            return None
+        return self.precompiledHeaders.get(self.compilerPath, self.__identity(), self.flags, headers)
+
+    def __computeKey(self, solutionPath: str) -> Optional[str]:
+        '''
+        Key of the binary: hash of the preprocessed source, the compiler and the flags.
+        Returns None if the source could not be preprocessed (the compiler will report the error itself).
+        '''
+
+        try:
+            preprocessed = subprocess.run([self.compilerPath, '-E', solutionPath] + self.flags + self.extraArguments,
+                                          capture_output=True)
+        except OSError:
+            return None
+        if preprocessed.returncode != 0:
+            return None
+
+        hasher = hashlib.sha256()
+        hasher.update(self.__identity())
+        hasher.update(b'\0'.join(flag.encode() for flag in self.flags + self.extraArguments) + b'\0')
+        hasher.update(preprocessed.stdout)
+        return hasher.hexdigest()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing      import Optional
+from .utils      import dumpError
+
+@dataclass
+class CorpusEntry:
+    name:     str
+    seeds:    list[int] = field(default_factory=list)
+    genArgs:  list[str] = field(default_factory=list)
+    verdicts: list[str] = field(default_factory=list)
+    found:    float = 0
+
+    def toDict(self) -> dict:
+        return {'seeds': self.seeds, 'gen_args': self.genArgs, 'verdicts': self.verdicts, 'found': self.found}
+
+class Corpus:
+    '''
+    Directory of the tests which have ever failed (or were the slowest ones), so that they can be checked again quickly.
+    Each test is stored once, as <hash>.in named by the hash of its content, and <hash>.json keeps the seeds
+    and the verdicts it was found with.
+
+    Variables:
+    directory: str
+    lock:      Lock
+    '''
+
+    TEST_SUFFIX = '.in'
+    META_SUFFIX = '.json'
+    HASH_LENGTH = 16
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def add(self, test: bytes, seed: int, verdict: str, genArgs: Optional[list[str]]=None) -> Optional[str]:
+        '''
+        Returns the name of the test in the corpus or None if it could not be saved.
+        '''
+
+        name = hashlib.sha256(test).hexdigest()[:Corpus.HASH_LENGTH]
+        with self.lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                entry = self.__loadEntry(name)
+                if entry is None:
+                    entry = CorpusEntry(name=name, genArgs=genArgs or [], found=time.time())
+                    with open(self.__path(name, Corpus.TEST_SUFFIX), 'wb') as testFile:
+                        testFile.write(test)
+                if seed not in entry.seeds:
+                    entry.seeds.append(seed)
+                if verdict not in entry.verdicts:
+                    entry.verdicts.append(verdict)
+                with open(self.__path(name, Corpus.META_SUFFIX), 'w') as metaFile:
+                    metaFile.write(json.dumps(entry.toDict(), indent=4))
+            except OSError as error:
+                dumpError(f'Failed to save the test into the corpus: {error}')
+                return None
+        return name
+
+    def entries(self) -> list[CorpusEntry]:
+        '''
+        Tests in the order they were found, the oldest first.
+        '''
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        entries = []
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith(Corpus.TEST_SUFFIX):
+                continue
+            name = fileName[:-len(Corpus.TEST_SUFFIX)]
+            entries.append(self.__loadEntry(name) or CorpusEntry(name=name))
+        entries.sort(key=lambda entry: (entry.found, entry.name))
+        return entries
+
+    def readTest(self, entry: CorpusEntry) -> bytes:
+        with open(self.__path(entry.name, Corpus.TEST_SUFFIX), 'rb') as testFile:
+            return testFile.read()
+
+# Private:
+
+    def __path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, name + suffix)
+
+    def __loadEntry(self, name: str) -> Optional[CorpusEntry]:
+        if not os.path.isfile(self.__path(name, Corpus.TEST_SUFFIX)):
+            return None
+        try:
+            with open(self.__path(name, Corpus.META_SUFFIX), 'r') as metaFile:
+                data = json.loads(metaFile.read())
+        except (OSError, ValueError):
+            return CorpusEntry(name=name)
+        return CorpusEntry(name=name, seeds=data.get('seeds', []), genArgs=data.get('gen_args', []),
+                           verdicts=data.get('verdicts', []), found=data.get('found', 0))
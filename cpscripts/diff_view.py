@@ -0,0 +1,164 @@
+from collections import deque
+from typing      import BinaryIO, Optional
+from .utils      import colored
+
+class DiffView:
+    '''
+    Prints only windows of lines around the first mismatches of the output and the expected output.
+    Both outputs are read line by line, so they are never loaded into memory completely.
+
+    Variables:
+    contextLines:  int
+    maxMismatches: int
+    maxLineLength: int
+    byTokens:      bool
+    '''
+
+    CONTEXT_LINES   = 2
+    MAX_MISMATCHES  = 3
+    MAX_LINE_LENGTH = 120
+    HEAD_LINES      = 20
+
+    def __init__(self, contextLines: int=CONTEXT_LINES, maxMismatches: int=MAX_MISMATCHES,
+                 maxLineLength: int=MAX_LINE_LENGTH, byTokens: bool=False):
+        self.contextLines = contextLines
+        self.maxMismatches = maxMismatches
+        self.maxLineLength = maxLineLength
+        self.byTokens = byTokens
+
+    def dumpHead(self, stream: BinaryIO, maxLines: int=HEAD_LINES) -> None:
+        '''
+        Prints the first lines of the stream, the rest is only counted.
+        '''
+
+        stream.seek(0)
+        linesCount = 0
+        for line in iter(stream.readline, b''):
+            linesCount += 1
+            if linesCount <= maxLines:
+                print(self.__truncate(self.__decode(line), 0))
+
+        if linesCount > maxLines:
+            print(colored(f'... ({linesCount - maxLines} more lines)', 120, 200, 235))
+
+    def dumpDiff(self, output: BinaryIO, expected: BinaryIO) -> None:
+        '''
+        Output lines are marked with '>' (mismatched tokens are red), expected lines with '<' (green).
+        '''
+
+        output.seek(0)
+        expected.seek(0)
+        before = deque(maxlen=self.contextLines)
+        lineIndex = 0
+        outputLines = 0
+        expectedLines = 0
+        lastPrinted = 0
+        afterLeft = 0
+        mismatches = 0
+
+        while True:
+            outputLine = output.readline()
+            expectedLine = expected.readline()
+            if len(outputLine) == 0 and len(expectedLine) == 0:
+                break
+
+            lineIndex += 1
+            outputLines += len(outputLine) > 0
+            expectedLines += len(expectedLine) > 0
+            outputText = self.__decode(outputLine)
+            expectedText = self.__decode(expectedLine)
+            if self.__linesEqual(outputText, expectedText):
+                outputText = outputText if outputText is not None else expectedText
+                if afterLeft > 0:
+                    self.__dumpLine(' ', lineIndex, outputText, None, None)
+                    lastPrinted = lineIndex
+                    afterLeft -= 1
+                else:
+                    before.append((lineIndex, outputText))
+                continue
+
+            mismatches += 1
+            if mismatches > self.maxMismatches:
+                self.__countRest(output, expected, outputLines, expectedLines)
+                return
+
+            if len(before) > 0 and before[0][0] > lastPrinted + 1 or len(before) == 0 and lineIndex > lastPrinted + 1:
+                print(colored('...', 120, 200, 235))
+            for contextIndex, contextText in before:
+                self.__dumpLine(' ', contextIndex, contextText, None, None)
+            before.clear()
+
+            self.__dumpLine('>', lineIndex, outputText, expectedText, (255, 120, 120))
+            self.__dumpLine('<', lineIndex, expectedText, outputText, (120, 255, 120))
+            lastPrinted = lineIndex
+            afterLeft = self.contextLines
+
+        if lineIndex > lastPrinted:
+            print(colored('...', 120, 200, 235))
+
+# Private:
+
+    @staticmethod
+    def __decode(line: bytes) -> Optional[str]:
+        '''
+        None stands for the end of the stream.
+        '''
+
+        return None if len(line) == 0 else line.decode(errors='replace').rstrip('\r\n')
+
+    def __linesEqual(self, outputText: Optional[str], expectedText: Optional[str]) -> bool:
+        # Missing lines are equal to empty ones, so trailing empty lines are ignored.
+        outputText = '' if outputText is None else outputText
+        expectedText = '' if expectedText is None else expectedText
+        if self.byTokens:
+            return outputText.split() == expectedText.split()
+        return outputText.strip() == expectedText.strip()
+
+    def __truncate(self, text: str, start: int) -> str:
+        end = start + self.maxLineLength
+        prefix = '...' if start > 0 else ''
+        suffix = '...' if end < len(text) else ''
+        return prefix + text[start:end] + suffix
+
+    def __dumpLine(self, marker: str, lineIndex: int, text: Optional[str], otherText: Optional[str],
+                   color: Optional[tuple[int, int, int]]) -> None:
+        if color is None:
+            print(f'{marker} {lineIndex:>6} | {self.__truncate(text, 0)}')
+            return
+        if text is None or len(text) == 0:
+            print(f'{marker} {lineIndex:>6} | ' + colored('(no line)' if text is None else '(empty line)', *color))
+            return
+        otherText = '' if otherText is None else otherText
+
+        # The window of the line starts a bit before the first differing character.
+        firstDifference = 0
+        while firstDifference < min(len(text), len(otherText)) and text[firstDifference] == otherText[firstDifference]:
+            firstDifference += 1
+        start = max(0, firstDifference - self.maxLineLength // 4) if firstDifference >= self.maxLineLength else 0
+        end = start + self.maxLineLength
+
+        parts = text.split(' ')
+        otherParts = otherText.split(' ')
+        coloredParts = []
+        position = 0
+        for i, part in enumerate(parts):
+            partStart = position
+            position += len(part) + 1
+            if position <= start or partStart >= end:
+                continue
+
+            visiblePart = part[max(0, start - partStart):end - partStart]
+            otherPart = otherParts[i] if i < len(otherParts) else ''
+            coloredParts.append(visiblePart if part == otherPart else colored(visiblePart, *color))
+
+        line = ' '.join(coloredParts)
+        prefix = '...' if start > 0 else ''
+        suffix = '...' if end < len(text) else ''
+        print(f'{marker} {lineIndex:>6} | {prefix}{line}{suffix}')
+
+    @staticmethod
+    def __countRest(output: BinaryIO, expected: BinaryIO, outputLines: int, expectedLines: int) -> None:
+        outputLines += sum(1 for _ in iter(output.readline, b''))
+        expectedLines += sum(1 for _ in iter(expected.readline, b''))
+        print(colored(f'... (more mismatches are not shown, output has {outputLines} lines, ' +
+                      f'expected output has {expectedLines} lines)', 120, 200, 235))
@@ -0,0 +1,201 @@
+import os
+import re
+import tarfile
+import zipfile
+
+from contextlib  import contextmanager
+from dataclasses import dataclass
+from typing      import BinaryIO, Iterator, Optional
+from .compare    import openMapped
+
+# Input name pattern and the possible names of its answer ({} is replaced with the index).
+TEST_PATTERNS = [
+    (re.compile(r'in([0-9]+)'),     ['out{}']),
+    (re.compile(r'([0-9]+)'),       ['{}.a']),
+    (re.compile(r'([0-9]+)\.in'),   ['{}.out', '{}.ans']),
+]
+ANSWER_REGEX     = re.compile(r'out[0-9]+|[0-9]+\.(a|out|ans)')
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz')
+TESTS_DIRECTORY  = 'tests'
+
+def isArchive(path: str) -> bool:
+    return path.endswith(ARCHIVE_SUFFIXES)
+
+def isTestFileName(fileName: str) -> bool:
+    if ANSWER_REGEX.fullmatch(fileName) is not None or isArchive(fileName):
+        return True
+    return any(regex.fullmatch(fileName) is not None for regex, _ in TEST_PATTERNS)
+
+@contextmanager
+def openArchiveMember(archivePath: str, member: str) -> Iterator[BinaryIO]:
+    '''
+    Opens a member of zip or tar archive as a stream, nothing is extracted to disk.
+    '''
+
+    if archivePath.endswith('.zip'):
+        with zipfile.ZipFile(archivePath) as archive, archive.open(member) as memberFile:
+            yield memberFile
+    else:
+        with tarfile.open(archivePath, 'r:*') as archive, archive.extractfile(member) as memberFile:
+            yield memberFile
+
+def listArchive(archivePath: str) -> list[str]:
+    try:
+        if archivePath.endswith('.zip'):
+            with zipfile.ZipFile(archivePath) as archive:
+                return [info.filename for info in archive.infolist() if not info.is_dir()]
+        with tarfile.open(archivePath, 'r:*') as archive:
+            return [member.name for member in archive.getmembers() if member.isfile()]
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return []
+
+@dataclass
+class Test:
+    testPath:   str
+    testAnswer: Optional[str]
+    archive:    Optional[str] = None
+    index:      int = -1
+
+    def name(self) -> str:
+        return self.testPath if self.archive is None else f'{self.archive}:{self.testPath}'
+
+    def getTestIndex(self) -> int:
+        return self.index
+
+    def files(self) -> set[str]:
+        '''
+        Paths of files on disk the test consists of.
+        '''
+
+        if self.archive is not None:
+            return {os.path.normpath(self.archive)}
+        if self.testAnswer is None:
+            return {os.path.normpath(self.testPath)}
+        return {os.path.normpath(self.testPath), os.path.normpath(self.testAnswer)}
+
+    @contextmanager
+    def openInput(self) -> Iterator[BinaryIO]:
+        if self.archive is None:
+            with open(self.testPath, 'rb') as inputFile:
+                yield inputFile
+        else:
+            with openArchiveMember(self.archive, self.testPath) as inputFile:
+                yield inputFile
+
+    @contextmanager
+    def openAnswer(self) -> Iterator[BinaryIO]:
+        if self.archive is None:
+            with openMapped(self.testAnswer) as answerFile:
+                yield answerFile
+        else:
+            with openArchiveMember(self.archive, self.testAnswer) as answerFile:
+                yield answerFile
+
+def pairTests(names: list[str], archive: Optional[str]=None) -> list[Test]:
+    '''
+    Matches inputs with their answers in one pass over the names (answers are looked up in a set).
+    '''
+
+    present = set(names)
+    tests = []
+    for name in names:
+        directory, baseName = os.path.split(name)
+        for regex, answerTemplates in TEST_PATTERNS:
+            match = regex.fullmatch(baseName)
+            if match is None:
+                continue
+
+            answer = None
+            for answerTemplate in answerTemplates:
+                candidate = os.path.join(directory, answerTemplate.format(match.group(1)))
+                if candidate in present:
+                    answer = candidate
+                    break
+
+            tests.append(Test(testPath=name, testAnswer=answer, archive=archive, index=int(match.group(1))))
+            break
+
+    tests.sort(key=lambda test: (os.path.dirname(test.testPath), test.index, test.testPath))
+    return tests
+
+class TestIndex:
+    '''
+    Tests of the directories and archives, each of them is scanned only once.
+
+    Variables:
+    directories: dict[str, list[Test]]
+    archives:    dict[str, list[Test]]
+    '''
+
+    def __init__(self):
+        self.directories = dict()
+        self.archives = dict()
+
+    def directoryTests(self, directory: str, recursive: bool=False) -> list[Test]:
+        key = (os.path.normpath(directory), recursive)
+        if key not in self.directories:
+            self.directories[key] = self.__scanDirectory(directory, recursive)
+        return self.directories[key]
+
+    def archiveTests(self, archivePath: str) -> list[Test]:
+        if archivePath not in self.archives:
+            self.archives[archivePath] = pairTests(listArchive(archivePath), archivePath)
+        return self.archives[archivePath]
+
+    def findTest(self, testPath: str) -> Optional[Test]:
+        for test in self.directoryTests(os.path.dirname(testPath)):
+            if os.path.normpath(test.testPath) == os.path.normpath(testPath):
+                return test
+        return None
+
+    def discover(self, directory: str='.') -> list[Test]:
+        '''
+        Tests of the directory, of its tests/ subdirectory (recursively) and of the archives inside them.
+        '''
+
+        tests = self.directoryTests(directory)
+        testsDirectory = os.path.join(directory, TESTS_DIRECTORY) if directory != '.' else TESTS_DIRECTORY
+        if os.path.isdir(testsDirectory):
+            tests = tests + self.directoryTests(testsDirectory, recursive=True)
+        return tests
+
+    def resolve(self, testsNames: list[str]) -> tuple[list[Test], list[str]]:
+        '''
+        Tests given by names: files (answer is looked up in the index), directories or archives.
+        Also returns the names which could not be resolved.
+        '''
+
+        tests = []
+        missing = []
+        for testName in testsNames:
+            if os.path.isdir(testName):
+                tests += self.directoryTests(testName, recursive=True)
+            elif os.path.isfile(testName) and isArchive(testName):
+                tests += self.archiveTests(testName)
+            elif os.path.isfile(testName):
+                test = self.findTest(testName)
+                tests.append(test if test is not None else Test(testPath=testName, testAnswer=None))
+            else:
+                missing.append(testName)
+        return tests, missing
+
+# Private:
+
+    def __scanDirectory(self, directory: str, recursive: bool) -> list[Test]:
+        names = []
+        archives = []
+        for root, subdirectories, fileNames in os.walk(directory or '.'):
+            subdirectories.sort()
+            for fileName in fileNames:
+                path = os.path.normpath(os.path.join(root, fileName))
+                if isArchive(fileName):
+                    archives.append(path)
+                else:
+                    names.append(path)
+            if not recursive:
+                break
+
+        tests = pairTests(names)
+        for archivePath in sorted(archives):
+            tests += self.archiveTests(archivePath)
+        return tests
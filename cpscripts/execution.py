@@ -0,0 +1,245 @@
+import io
+import math
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from contextlib  import ExitStack
+from dataclasses import dataclass
+from typing      import BinaryIO, Optional, Union
+
+@dataclass
+class ExecutionResult:
+    returnCode:  int
+    wallTime:    int
+    cpuTime:     Optional[int] # None if not measured (persistent processes)
+    peakMemory:  Optional[int]
+    timedOut:    bool
+    stdout:      Optional[bytes]
+    stderr:      bytes
+    memoryExact: bool = True
+
+    def peakMemoryMb(self) -> float:
+        return self.peakMemory / 1024
+
+    def formatMemory(self) -> str:
+        '''
+        Peak memory which did not exceed the memory of the harness is only known to be below it.
+        '''
+
+        return ('' if self.memoryExact else '<') + f'{self.peakMemoryMb():.1f}MB'
+
+    def exceedsMemory(self, memoryLimit: float) -> bool:
+        return self.memoryExact and self.peakMemoryMb() > memoryLimit
+
+# Wall clock is only a safety net for solutions which are sleeping or blocked,
+# the real limit is the cpu time. Concurrent runs stretch wall time, hence the factor.
+WALL_TIME_LIMIT_FACTOR = 2
+
+def getPeakMemory(rusage: resource.struct_rusage) -> int:
+    '''
+    Peak resident set size in kilobytes (macOS reports it in bytes).
+    The kernel keeps the maximum across exec, so the peak of a child is the maximum of its own peak and of the size
+    of the forked harness. See getHarnessMemory.
+    '''
+
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+def getHarnessMemory() -> int:
+    '''
+    Peak memory of the harness in kilobytes, an upper bound on the memory a child inherits from the fork.
+    A child peak above it is the peak of the program itself, a peak not above it only means that the program used less.
+    '''
+
+    return getPeakMemory(resource.getrusage(resource.RUSAGE_SELF))
+
+def killProcessGroup(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def limitCpuTime(process: subprocess.Popen, timeLimit: float) -> None:
+    '''
+    Makes the kernel kill the process once it exceeds the cpu time limit (only where prlimit is available).
+    '''
+
+    if not hasattr(resource, 'prlimit'):
+        return
+
+    seconds = math.ceil(timeLimit)
+    try:
+        resource.prlimit(process.pid, resource.RLIMIT_CPU, (seconds, seconds + 1))
+    except OSError:
+        pass
+
+class ProcessTracker:
+    '''
+    Keeps track of running processes, so that all of them can be killed at once (for example, when a run is cancelled).
+
+    Variables:
+    lock:      Lock
+    processes: set[subprocess.Popen]
+    cancelled: Event
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processes = set()
+        self.cancelled = threading.Event()
+
+    def register(self, process: subprocess.Popen) -> None:
+        with self.lock:
+            self.processes.add(process)
+        if self.cancelled.is_set():
+            killProcessGroup(process)
+
+    def unregister(self, process: subprocess.Popen) -> None:
+        with self.lock:
+            self.processes.discard(process)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        with self.lock:
+            for process in self.processes:
+                killProcessGroup(process)
+
+    def isCancelled(self) -> bool:
+        return self.cancelled.is_set()
+
+def pinToCore(core: Optional[int]=None) -> Optional[set[int]]:
+    '''
+    Pins the current process (and so every process started by it) to a single core, the last available one by default.
+    Returns the previous affinity or None if pinning is not supported by the platform.
+    '''
+
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+
+    previousAffinity = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, {max(previousAffinity) if core is None else core})
+    return previousAffinity
+
+def findCoreError(core: Optional[int]) -> Optional[str]:
+    '''
+    Message if the process can not be pinned to the core (it does not exist or is not allowed), None if it can.
+    '''
+
+    if core is None or not hasattr(os, 'sched_getaffinity'):
+        return None
+
+    allowedCores = os.sched_getaffinity(0)
+    if core in allowedCores:
+        return None
+    return f'Can not pin to core {core}, the allowed cores are: {", ".join(map(str, sorted(allowedCores)))}.'
+
+def restoreAffinity(previousAffinity: Optional[set[int]]) -> None:
+    if previousAffinity is not None:
+        os.sched_setaffinity(0, previousAffinity)
+
+def createMemoryFile() -> BinaryIO:
+    '''
+    Anonymous file in memory (memfd on Linux), a temporary file on other platforms.
+    '''
+
+    if hasattr(os, 'memfd_create'):
+        return os.fdopen(os.memfd_create('cpscripts', os.MFD_CLOEXEC), 'w+b')
+    return tempfile.TemporaryFile()
+
+def hasFileDescriptor(stream: BinaryIO) -> bool:
+    try:
+        stream.fileno()
+        return True
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+def pumpStream(source: BinaryIO, destination: BinaryIO) -> None:
+    try:
+        shutil.copyfileobj(source, destination)
+    except (BrokenPipeError, ValueError):
+        pass
+    finally:
+        try:
+            destination.close()
+        except BrokenPipeError:
+            pass
+
+def runExecutable(command: list[str], stdinSource: Union[str, BinaryIO], timeLimit: Optional[float]=None,
+                  outputFile: Optional[BinaryIO]=None, tracker: Optional[ProcessTracker]=None,
+                  environment: Optional[dict[str, str]]=None) -> ExecutionResult:
+    '''
+    Runs the command with stdin redirected from the given file (a path or an opened stream).
+    Streams without a file descriptor (like archive members) are written into stdin through a pipe.
+    If output file is given, stdout is written straight into it (and is not read into memory), otherwise it is returned.
+    Times are in milliseconds, cpu time (user + sys) and peak memory are taken from the rusage of the process,
+    so they stay accurate even if several processes are running concurrently.
+    If time limit (in seconds) is given, then the process group is killed once the limit is exceeded.
+    Environment variables are added to the ones of the current process.
+    '''
+
+    with ExitStack() as stack:
+        stdoutFile = stack.enter_context(createMemoryFile())
+        stderrFile = stack.enter_context(createMemoryFile())
+        stdinFile = stdinSource
+        if isinstance(stdinSource, str):
+            stdinFile = stack.enter_context(open(stdinSource, 'rb'))
+        elif not hasFileDescriptor(stdinSource):
+            stdinFile = subprocess.PIPE
+
+        startTime = time.perf_counter()
+        process = subprocess.Popen(command, stdin=stdinFile, stdout=stdoutFile if outputFile is None else outputFile, stderr=stderrFile,
+                                   env=None if environment is None else {**os.environ, **environment}, start_new_session=True)
+        harnessMemory = getHarnessMemory()
+
+        pump = None
+        if stdinFile == subprocess.PIPE:
+            pump = threading.Thread(target=pumpStream, args=(stdinSource, process.stdin))
+            pump.start()
+
+        timedOut = threading.Event()
+        def onTimeout() -> None:
+            timedOut.set()
+            killProcessGroup(process)
+
+        if tracker is not None:
+            tracker.register(process)
+
+        watchdog = None
+        if timeLimit is not None:
+            limitCpuTime(process, timeLimit)
+            watchdog = threading.Timer(timeLimit * WALL_TIME_LIMIT_FACTOR, onTimeout)
+            watchdog.start()
+
+        _, status, rusage = os.wait4(process.pid, 0)
+        wallTime = int((time.perf_counter() - startTime) * 1000)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if watchdog is not None:
+            watchdog.cancel()
+        if tracker is not None:
+            tracker.unregister(process)
+        if pump is not None:
+            pump.join()
+
+        cpuTime = int((rusage.ru_utime + rusage.ru_stime) * 1000)
+        if timeLimit is not None and (cpuTime > timeLimit * 1000 or process.returncode == -signal.SIGXCPU):
+            timedOut.set()
+
+        stdoutFile.seek(0)
+        stderrFile.seek(0)
+        peakMemory = getPeakMemory(rusage)
+        return ExecutionResult(returnCode=process.returncode,
+                               wallTime=wallTime,
+                               cpuTime=cpuTime,
+                               peakMemory=peakMemory,
+                               timedOut=timedOut.is_set(),
+                               stdout=stdoutFile.read() if outputFile is None else None,
+                               stderr=stderrFile.read(),
+                               memoryExact=peakMemory > harnessMemory)
@@ -0,0 +1,221 @@
+import argparse
+import io
+import json
+import os
+import random
+import shlex
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses        import dataclass
+from typing             import Optional
+from .corpus            import Corpus
+from .execution         import ExecutionResult, ProcessTracker, runExecutable
+from .shrink            import SIZE_ARGUMENT_REGEX
+from .utils             import colored, dumpError
+
+MAX_SEED = 10 ** 9
+
+@dataclass
+class HuntCandidate:
+    seed:      int
+    genArgs:   list[str]
+    test:      bytes
+    execution: ExecutionResult
+    score:     tuple[float, int]
+
+    def key(self) -> tuple:
+        return self.seed, tuple(self.genArgs)
+
+    def describe(self) -> str:
+        return f'seed {self.seed}' + (f', args {" ".join(self.genArgs)}' if len(self.genArgs) > 0 else '')
+
+class Hunter:
+    '''
+    Searches for the tests on which the solution is the slowest (by cpu time) or uses the most memory.
+    The first half of the runs checks the seeds with the given generator arguments, the second half climbs
+    from the worst test found: the neighbours are the same arguments with another seed and the arguments ending
+    with a number changed by up to 30% (never above the given values, they are the constraints).
+    The worst tests are kept in the directory, together with worst.json describing them, and are added to the corpus.
+
+    Variables:
+    solutionExecutable: str
+    genExecutable:      str
+    genArgs:            list[str]
+    metric:             str, cpu or memory
+    runs:               int
+    jobs:               int
+    timeLimit:          float or None
+    topCount:           int
+    directory:          str
+    corpus:             Corpus
+    tracker:            ProcessTracker
+    random:             Random
+    top:                list[HuntCandidate]
+    evaluated:          int
+    lastProgress:       float
+    executor:           ThreadPoolExecutor
+    '''
+
+    METRICS = ['cpu', 'memory']
+    TEST_PREFIX = 'worst'
+    INDEX_NAME = 'worst.json'
+    CLIMB_STEP = 0.3
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, args: argparse.Namespace):
+        self.solutionExecutable = args.sol
+        self.genExecutable = args.gen
+        self.genArgs = shlex.split(args.genargs)
+        self.metric = args.hunt
+        self.runs = max(1, args.tests)
+        self.jobs = max(1, args.jobs)
+        self.timeLimit = args.tl
+        self.topCount = max(1, args.top)
+        self.directory = args.huntdir
+        self.corpus = Corpus(args.corpus)
+        for executableFile in [self.solutionExecutable, self.genExecutable]:
+            if not os.path.isfile(executableFile):
+                dumpError(f'No such file: {executableFile}')
+                sys.exit(0)
+        self.tracker = ProcessTracker()
+        self.random = random.Random()
+        self.top = []
+        self.evaluated = 0
+
+    def run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.lastProgress = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                self.executor = executor
+                self.__randomSearch()
+                self.__climb()
+        except KeyboardInterrupt:
+            self.tracker.cancel()
+            raise
+        finally:
+            self.__save()
+
+        self.__dumpProgress(force=True)
+        self.__dumpTop()
+
+# Private:
+
+    def __score(self, execution: ExecutionResult) -> tuple[float, int]:
+        '''
+        Peak memory which did not exceed the memory of the harness is unknown, such tests are ranked by cpu time
+        below all the tests with the exact peak.
+        '''
+
+        if self.metric == 'cpu':
+            return execution.cpuTime, 0
+        return execution.peakMemoryMb() if execution.memoryExact else 0, execution.cpuTime
+
+    def __evaluate(self, point: tuple[int, list[str]]) -> Optional[HuntCandidate]:
+        seed, genArgs = point
+        with open(os.devnull, 'rb') as devNull:
+            generator = runExecutable([os.path.join('.', self.genExecutable), str(seed)] + genArgs, devNull, None, None, self.tracker)
+        if generator.returnCode != 0:
+            return None
+
+        with open(os.devnull, 'wb') as devNull:
+            execution = runExecutable([os.path.join('.', self.solutionExecutable)], io.BytesIO(generator.stdout), self.timeLimit,
+                                      devNull, self.tracker)
+        return HuntCandidate(seed=seed, genArgs=genArgs, test=generator.stdout, execution=execution, score=self.__score(execution))
+
+    def __evaluateAll(self, points: list[tuple[int, list[str]]]) -> list[HuntCandidate]:
+        points = points[:self.runs - self.evaluated]
+        candidates = [candidate for candidate in self.executor.map(self.__evaluate, points) if candidate is not None]
+        self.evaluated += len(points)
+        for candidate in candidates:
+            self.__addToTop(candidate)
+        self.__dumpProgress()
+        return candidates
+
+    def __addToTop(self, candidate: HuntCandidate) -> None:
+        if any(other.key() == candidate.key() for other in self.top):
+            return
+        self.top.append(candidate)
+        self.top.sort(key=lambda other: other.score, reverse=True)
+        del self.top[self.topCount:]
+
+    def __randomSearch(self) -> None:
+        seeds = [self.random.randint(1, MAX_SEED) for _ in range(max(1, self.runs // 2))]
+        for start in range(0, len(seeds), self.jobs):
+            self.__evaluateAll([(seed, self.genArgs) for seed in seeds[start:start + self.jobs]])
+
+    def __neighbour(self, candidate: HuntCandidate) -> tuple[int, list[str]]:
+        sizes = [index for index, argument in enumerate(candidate.genArgs) if SIZE_ARGUMENT_REGEX.fullmatch(argument)]
+        if len(sizes) == 0 or self.random.random() < 0.5:
+            return self.random.randint(1, MAX_SEED), candidate.genArgs
+
+        index = self.random.choice(sizes)
+        prefix, value = SIZE_ARGUMENT_REGEX.fullmatch(candidate.genArgs[index]).groups()
+        limit = int(SIZE_ARGUMENT_REGEX.fullmatch(self.genArgs[index]).group(2))
+        value = int(int(value) * self.random.uniform(1 - Hunter.CLIMB_STEP, 1 + Hunter.CLIMB_STEP))
+        value = max(1, min(limit, value))
+        return candidate.seed, candidate.genArgs[:index] + [prefix + str(value)] + candidate.genArgs[index + 1:]
+
+    def __climb(self) -> None:
+        '''
+        Hill climbing: each round checks one neighbour of the current test per worker and moves to the worst of them,
+        if it is worse than the current one.
+        '''
+
+        if len(self.top) == 0:
+            return
+
+        current = self.top[0]
+        while self.evaluated < self.runs:
+            neighbours = self.__evaluateAll([self.__neighbour(current) for _ in range(self.jobs)])
+            for neighbour in neighbours:
+                if neighbour.score > current.score:
+                    current = neighbour
+
+    def __dumpProgress(self, force: bool=False) -> None:
+        if not force and time.perf_counter() - self.lastProgress < Hunter.PROGRESS_INTERVAL:
+            return
+        self.lastProgress = time.perf_counter()
+
+        line = colored('\rHunting ', 255, 255, 50) + colored(f'{self.evaluated}/{self.runs}', 0, 200, 200)
+        if len(self.top) > 0:
+            line += f' | worst {self.__formatScore(self.top[0])} ({self.top[0].describe()})'
+        print(line + '\033[K', end='', flush=True)
+
+    def __formatScore(self, candidate: HuntCandidate) -> str:
+        if self.metric == 'cpu':
+            return f'{candidate.execution.cpuTime}ms' + (' TL' if candidate.execution.timedOut else '')
+        return candidate.execution.formatMemory()
+
+    def __save(self) -> None:
+        index = []
+        try:
+            for rank, candidate in enumerate(self.top, start=1):
+                name = f'{Hunter.TEST_PREFIX}{rank}'
+                with open(os.path.join(self.directory, name), 'wb') as testFile:
+                    testFile.write(candidate.test)
+                index.append({'file': name, 'seed': candidate.seed, 'gen_args': candidate.genArgs,
+                              'cpu_ms': candidate.execution.cpuTime, 'wall_ms': candidate.execution.wallTime,
+                              'memory_mb': candidate.execution.peakMemoryMb() if candidate.execution.memoryExact else None,
+                              'tl': candidate.execution.timedOut,
+                              're': candidate.execution.returnCode != 0 and not candidate.execution.timedOut})
+                self.corpus.add(candidate.test, candidate.seed,
+                                'TL' if candidate.execution.timedOut else f'WORST_{self.metric.upper()}', candidate.genArgs)
+            with open(os.path.join(self.directory, Hunter.INDEX_NAME), 'w') as indexFile:
+                indexFile.write(json.dumps({'metric': self.metric, 'tests': index}, indent=4))
+        except OSError as error:
+            dumpError(f'Failed to save the worst tests: {error}')
+
+    def __dumpTop(self) -> None:
+        print(colored(f'\n\nWorst tests by {self.metric} (saved into {self.directory}):', 255, 165, 0))
+        print(colored(f'{"#":>3}  {"cpu":>8}  {"wall":>8}  {"memory":>9}  {"size":>10}  test', 255, 165, 0))
+        for rank, candidate in enumerate(self.top, start=1):
+            execution = candidate.execution
+            verdict = ' TL' if execution.timedOut else (' RE' if execution.returnCode != 0 else '')
+            print(f'{rank:>3}  {execution.cpuTime:>6}ms  {execution.wallTime:>6}ms  {execution.formatMemory():>9}  ' +
+                  f'{len(candidate.test):>10}  {Hunter.TEST_PREFIX}{rank}: {candidate.describe()}{verdict}')
+        if self.metric == 'memory' and any(not candidate.execution.memoryExact for candidate in self.top):
+            print(colored('Peak memory marked with < did not exceed the memory of the harness, ' +
+                          'such tests are ranked by cpu time.', 120, 200, 235))
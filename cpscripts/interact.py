@@ -1,96 +1,157 @@
 import os
-import sys
+import selectors
+import signal
 import subprocess
+import sys
 import time
 
-from argparse  import ArgumentParser
-from queue     import Queue
-from threading import Thread
-from typing    import Optional
-from .utils    import colored, dumpError, runProcess
+from argparse    import ArgumentParser
+from collections import deque
+from typing      import Optional
+from .utils      import colored, dumpError, runProcess
 
-class ExecutingPopen:
+class InteractiveProcess:
     '''
+    Process with non-blocking pipes. Its exit is watched through a pidfd where the platform supports it,
+    otherwise the loop checks it periodically.
+
     Variables:
-    runningPopen:   subprocess.Popen
-    poll:           int or None
-    readingThreads: dict[str, Thread]
-    readingQueues:  dict[str, Queue]
+    popen:      subprocess.Popen
+    pidfd:      int or None
+    pending:    bytearray, data waiting to be written into stdin
+    closeInput: bool, stdin is closed once the pending data is written
+    returnCode: int or None
     '''
 
-    def __init__(self, executableFile: str):
-        self.runningPopen = subprocess.Popen([f'./{executableFile}'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        self.poll = None
-        self.readingThreads = dict()
-        self.readingQueues = dict()
-
-        for streamType, stream in zip(['stdout', 'stderr'], [self.runningPopen.stdout, self.runningPopen.stderr]):
-            self.readingQueues[streamType] = Queue()
-            self.readingThreads[streamType] = Thread(target=ExecutingPopen.__readLoop, args=(stream, self.readingQueues[streamType]))
-            self.readingThreads[streamType].start()
-
-    def isRunning(self) -> bool:
-        self.poll = self.runningPopen.poll()
-        return self.poll is None
-
-    def getLine(self, stream: str) -> Optional[str]:
-        if self.readingQueues[stream].empty():
-            return None
+    def __init__(self, executableFile: str, stdin=subprocess.PIPE, stdout=subprocess.PIPE):
+        '''
+        stdin and stdout may be file descriptors, then the process is connected to them directly.
+        '''
 
-        return self.readingQueues[stream].get()
+        self.popen = subprocess.Popen([f'./{executableFile}'], stdin=stdin, stdout=stdout, stderr=subprocess.PIPE,
+                                      start_new_session=True)
+        for stream in self.__streams():
+            os.set_blocking(stream.fileno(), False)
 
-    def communicate(self, newLine: str) -> None:
-        if self.isRunning():
-            self.runningPopen.stdin.write(newLine.encode())
-            self.runningPopen.stdin.flush()
+        self.pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                self.pidfd = os.pidfd_open(self.popen.pid)
+            except OSError:
+                pass
 
-    def anyThreadAlive(self) -> bool:
-        for streamType, thread in self.readingThreads.items():
-            if thread.is_alive():
-                return True
+        self.pending = bytearray()
+        self.closeInput = False
+        self.returnCode = None
 
-        return False
-
-    def terminate(self) -> None:
-        self.runningPopen.terminate()
+    def isRunning(self) -> bool:
+        return self.returnCode is None
+
+    def checkExit(self) -> bool:
+        '''
+        Returns True if the process has just exited.
+        '''
+
+        if self.returnCode is not None:
+            return False
+        self.returnCode = self.popen.poll()
+        return self.returnCode is not None
+
+    def canWrite(self) -> bool:
+        return self.popen.stdin is not None and not self.popen.stdin.closed
+
+    def send(self, data: bytes) -> None:
+        if self.canWrite():
+            self.pending += data
+
+    def flush(self) -> None:
+        '''
+        Writes as much of the pending data as the pipe takes without blocking.
+        '''
+
+        try:
+            while len(self.pending) > 0:
+                written = os.write(self.popen.stdin.fileno(), self.pending)
+                del self.pending[:written]
+        except BlockingIOError:
+            return
+        except OSError:
+            # The process does not read anymore (it has exited or closed stdin).
+            self.pending.clear()
+            self.closeInput = True
+
+        if self.closeInput and self.canWrite():
+            self.popen.stdin.close()
+
+    def kill(self) -> None:
+        if self.returnCode is None:
+            try:
+                os.killpg(self.popen.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self.kill()
+        self.popen.wait()
+        for stream in self.__streams():
+            try:
+                stream.close()
+            except OSError:
+                pass
+        if self.pidfd is not None:
+            os.close(self.pidfd)
 
 # Private:
 
-    @staticmethod
-    def __readLoop(stream, queue: Queue) -> None:
-        for line in iter(stream.readline, b''):
-            queue.put(line.decode())
-
-        stream.close()
+    def __streams(self) -> list:
+        return [stream for stream in [self.popen.stdin, self.popen.stdout, self.popen.stderr] if stream is not None]
 
 class Interactor:
     '''
+    Solution and interactor are connected by one loop waiting for their output or exit (selectors, epoll on Linux),
+    so nothing is spent while the programs think. Everything read from one of them is passed to the other at once.
+    In the quiet mode nothing is printed line by line: without a tail the programs are connected by pipes directly
+    and the loop only watches stderr and the exits, with a tail the raw chunks are forwarded and the last lines are kept.
+
     Variables:
     solutionExecutable:   str
     interactorExecutable: str
     timeout:              float
     inputFile:            str or None
+    quiet:                bool
+    tailLines:            int, lines of the interaction kept in the quiet mode, 0 to connect the programs directly
+    lineBuffers:          dict[tuple[int, str], bytearray], incomplete lines of the output streams
+    transcript:           deque[tuple[int, bytes, int]], the last chunks of the interaction with their numbers of lines
+    transcriptLines:      int
+    stderrTails:          list[bytearray], the last bytes of stderr of the solution and the interactor
     '''
 
     INTERACTION_HEADER = '+-------------------------------------------+\n' +\
                          '|      Solution        |     Interactor     |\n' +\
                          '+-------------------------------------------+'
     PADDING        = len('........................')
+    READ_SIZE      = 1 << 16
+    EXIT_CHECK     = 0.05 # seconds, how often the exit is checked without pidfd
+    DRAIN_TIMEOUT  = 1    # seconds, for the output left after the processes are killed
+    STDERR_LIMIT   = 1 << 16
+    EXIT_ERRORS    = ['Solution got RE.', 'Interactor got RE.']
 
     def __init__(self, args):
         self.solutionExecutable = args.sol
         self.interactorExecutable = args.int
         self.timeout = args.timeout
+        self.inputFile = args.input
+        self.tailLines = max(0, args.tail)
+        self.quiet = args.quiet or self.tailLines > 0
 
-        if self.__checkFile(args.input):
-            self.inputFile = args.input
-
-        if not self.__checkFile(self.solutionExecutable) or\
+        if not self.__checkFile(self.inputFile) or\
+           not self.__checkFile(self.solutionExecutable) or\
            not self.__checkFile(self.interactorExecutable):
             sys.exit(0)
 
     def run(self) -> None:
-        print(Interactor.INTERACTION_HEADER.replace('Interactor', colored('Interactor', 255, 255, 0)))
+        if not self.quiet:
+            print(Interactor.INTERACTION_HEADER.replace('Interactor', colored('Interactor', 255, 255, 0)))
         self.__communicatingLoop()
 
 # Private:
@@ -110,69 +171,268 @@ class Interactor:
         else:
             print(' ' * padding, colored(line, r, g, b), sep='', end='', flush=True)
 
-    def __openInputFile(self, interactorPopen: ExecutingPopen) -> None:
+    def __display(self, index: int, kind: str, data: bytes) -> None:
+        '''
+        Prints the complete lines of the data, the rest is kept until the end of the line is read.
+        Empty data means the end of the stream.
+        '''
+
+        buffer = self.lineBuffers.setdefault((index, kind), bytearray())
+        buffer += data
+        end = len(buffer) if len(data) == 0 else buffer.rfind(b'\n') + 1
+        if end == 0:
+            return
+
+        for line in bytes(buffer[:end]).decode(errors='replace').splitlines(keepends=True):
+            if not line.endswith('\n'):
+                line += '\n'
+            if index == 1:
+                self.__printWithSeparator(line, Interactor.PADDING, 255, 255, 0)
+            else:
+                self.__printWithSeparator(line, 0, None, None, None)
+        del buffer[:end]
+
+    def __readInputFile(self) -> bytes:
         if self.inputFile is None:
+            return b''
+
+        with open(self.inputFile, 'rb') as inputFile:
+            return inputFile.read()
+
+    def __openInputFile(self, interactor: InteractiveProcess) -> None:
+        interactor.send(self.__readInputFile())
+        interactor.flush()
+
+    def __feedInputFile(self, fd: int, deadline: float) -> bool:
+        '''
+        Writes the input file into the pipe before the solution is started, so it can not be mixed with the solution output.
+        Returns False if the interactor did not read it before the deadline.
+        '''
+
+        data = memoryview(self.__readInputFile())
+        os.set_blocking(fd, False)
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_WRITE)
+                while len(data) > 0:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or len(selector.select(remaining)) == 0:
+                        return False
+                    try:
+                        data = data[os.write(fd, data):]
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        # The interactor has closed its input, its exit is checked by the loop.
+                        break
+        finally:
+            # The pipe is the stdout of the solution, which expects blocking writes.
+            os.set_blocking(fd, True)
+        return True
+
+    def __startConnected(self, deadline: float) -> tuple[InteractiveProcess, InteractiveProcess, bool]:
+        '''
+        Output of each program is the input of the other one, the data never passes through the loop.
+        '''
+
+        toInteractorRead, toInteractorWrite = os.pipe()
+        toSolutionRead, toSolutionWrite = os.pipe()
+        try:
+            interactor = InteractiveProcess(self.interactorExecutable, stdin=toInteractorRead, stdout=toSolutionWrite)
+            fed = self.__feedInputFile(toInteractorWrite, deadline)
+            solution = InteractiveProcess(self.solutionExecutable, stdin=toSolutionRead, stdout=toInteractorWrite)
+        finally:
+            for fd in [toInteractorRead, toInteractorWrite, toSolutionRead, toSolutionWrite]:
+                os.close(fd)
+        return solution, interactor, fed
+
+    def __record(self, index: int, kind: str, data: bytes) -> None:
+        if not self.quiet:
+            self.__display(index, kind, data)
+        elif kind == 'stderr':
+            tail = self.stderrTails[index]
+            tail += data
+            del tail[:-Interactor.STDERR_LIMIT]
+        elif len(data) > 0:
+            lines = max(1, data.count(b'\n'))
+            self.transcript.append((index, data, lines))
+            self.transcriptLines += lines
+            while self.transcriptLines - self.transcript[0][2] >= self.tailLines:
+                self.transcriptLines -= self.transcript.popleft()[2]
+
+    def __dumpTranscript(self) -> None:
+        '''
+        Prints the last lines of the interaction, consecutive chunks of one program are joined to restore the split lines.
+        '''
+
+        if len(self.transcript) == 0:
             return
-        
-        with open(self.inputFile, 'r') as inputFile:
-            for line in inputFile:
-                interactorPopen.communicate(line)
-
-    def __processSingleStderr(self, popen: ExecutingPopen, padding, r: Optional[int], g: Optional[int], b: Optional[int]) -> None:
-        while True:
-            newLine = popen.getLine('stderr')
-            if newLine is None:
-                break
 
-            self.__printWithSeparator(newLine, padding, r, g, b)
+        parts = []
+        for index, data, _ in self.transcript:
+            if len(parts) > 0 and parts[-1][0] == index:
+                parts[-1][1].append(data)
+            else:
+                parts.append((index, [data]))
+
+        lines = []
+        for index, chunks in parts:
+            lines += [(index, line) for line in b''.join(chunks).decode(errors='replace').splitlines(keepends=True)]
+        print(colored(f'Last {min(self.tailLines, len(lines))} lines of the interaction:', 255, 165, 0))
+        for index, line in lines[-self.tailLines:]:
+            if not line.endswith('\n'):
+                line += '\n'
+            if index == 1:
+                self.__printWithSeparator(line, Interactor.PADDING, 255, 255, 0)
+            else:
+                self.__printWithSeparator(line, 0, None, None, None)
+
+    def __dumpQuietResult(self, exitError: Optional[str], elapsed: float) -> None:
+        if exitError is not None:
+            self.__dumpTranscript()
+        for index, tail in enumerate(self.stderrTails):
+            if len(tail) > 0:
+                print(colored(f'stderr of the {["solution", "interactor"][index]}:', 255, 165, 0))
+                self.__display(index, 'stderr', bytes(tail))
+                self.__display(index, 'stderr', b'')
+        if exitError is None:
+            print(colored(f'Interaction finished in {elapsed:.2f} seconds.', 20, 255, 20))
+
+    @staticmethod
+    def __isRegistered(selector: selectors.BaseSelector, fileObject) -> bool:
+        return any(key.fileobj is fileObject for key in selector.get_map().values())
 
-    def __processStderr(self, solutionPopen: ExecutingPopen, interactorPopen: ExecutingPopen) -> None:
-        self.__processSingleStderr(solutionPopen, 0, None, None, None)
-        self.__processSingleStderr(interactorPopen, Interactor.PADDING, 255, 255, 0)
+    @staticmethod
+    def __updateWriting(selector: selectors.BaseSelector, index: int, process: InteractiveProcess) -> None:
+        '''
+        Stdin is watched only while there is something to write into it.
+        '''
+
+        stdin = process.popen.stdin
+        registered = Interactor.__isRegistered(selector, stdin)
+        needed = process.canWrite() and len(process.pending) > 0
+        if needed and not registered:
+            selector.register(stdin, selectors.EVENT_WRITE, (index, 'stdin'))
+        elif registered and not needed:
+            selector.unregister(stdin)
+
+    def __read(self, selector: selectors.BaseSelector, index: int, kind: str, stream,
+               peer: Optional[InteractiveProcess]) -> None:
+        try:
+            data = os.read(stream.fileno(), Interactor.READ_SIZE)
+        except BlockingIOError:
+            return
 
-    def __finish(self, solutionPopen: ExecutingPopen, interactorPopen: ExecutingPopen, exitError: Optional[str]) -> None:
-        solutionPopen.terminate()
-        interactorPopen.terminate()
-        while solutionPopen.anyThreadAlive() or interactorPopen.anyThreadAlive():
-            self.__processStderr(solutionPopen, interactorPopen)
+        self.__record(index, kind, data)
+        if len(data) == 0:
+            selector.unregister(stream)
+            if peer is not None:
+                # The end of the output is passed on as the end of the input.
+                peer.closeInput = True
+                peer.flush()
+            return
 
+        if peer is not None:
+            peer.send(data)
+            peer.flush()
+
+    def __finish(self, selector: selectors.BaseSelector, processes: list[InteractiveProcess], exitError: Optional[str],
+                 elapsed: float) -> None:
+        '''
+        Kills the processes which are still running and prints the rest of their output.
+        '''
+
+        for process in processes:
+            process.kill()
+            if self.__isRegistered(selector, process.popen.stdin):
+                selector.unregister(process.popen.stdin)
+
+        deadline = time.perf_counter() + Interactor.DRAIN_TIMEOUT
+        while self.__hasOutputs(selector) and time.perf_counter() < deadline:
+            for key, _ in selector.select(deadline - time.perf_counter()):
+                index, kind = key.data
+                if kind == 'exit':
+                    selector.unregister(key.fileobj)
+                else:
+                    self.__read(selector, index, kind, key.fileobj, None)
+
+        for index, kind in list(self.lineBuffers):
+            self.__display(index, kind, b'')
+        selector.close()
+        for process in processes:
+            process.close()
+
+        solutionCode = processes[0].popen.returncode
+        if exitError == Interactor.EXIT_ERRORS[1] and solutionCode != 0 and solutionCode != -signal.SIGKILL:
+            # The interactor may see the end of the solution output and exit before the exit of the solution is noticed.
+            exitError = Interactor.EXIT_ERRORS[0]
+        if self.quiet:
+            self.__dumpQuietResult(exitError, elapsed)
         if exitError is not None:
             dumpError(exitError)
 
+    @staticmethod
+    def __hasOutputs(selector: selectors.BaseSelector) -> bool:
+        return any(key.data[1] in ['stdout', 'stderr'] for key in selector.get_map().values())
+
     def __communicatingLoop(self) -> None:
-        solutionPopen = ExecutingPopen(self.solutionExecutable)
-        interactorPopen = ExecutingPopen(self.interactorExecutable)
-        self.__openInputFile(interactorPopen)
+        self.lineBuffers = dict()
+        self.transcript = deque()
+        self.transcriptLines = 0
+        self.stderrTails = [bytearray(), bytearray()]
+        timeoutError = f'Terminating interaction due to the timeout ({self.timeout} seconds).'
 
         exitError = None
-        startTime = time.time()
-
-        while solutionPopen.isRunning() or interactorPopen.isRunning():
-            self.__processStderr(solutionPopen, interactorPopen)
-
-            if time.time() - startTime > self.timeout:
-                exitError = f'Termiating interaction due to the timeout ({self.timeout} seconds).'
-                break
-
-            if not solutionPopen.isRunning() and solutionPopen.poll != 0:
-                exitError = 'Solution got RE.'
+        startTime = time.perf_counter()
+        deadline = startTime + self.timeout
+        if self.quiet and self.tailLines == 0:
+            solution, interactor, fed = self.__startConnected(deadline)
+            if not fed:
+                exitError = timeoutError
+        else:
+            solution = InteractiveProcess(self.solutionExecutable)
+            interactor = InteractiveProcess(self.interactorExecutable)
+        processes = [solution, interactor]
+
+        selector = selectors.DefaultSelector()
+        for index, process in enumerate(processes):
+            if process.popen.stdout is not None:
+                selector.register(process.popen.stdout, selectors.EVENT_READ, (index, 'stdout'))
+            selector.register(process.popen.stderr, selectors.EVENT_READ, (index, 'stderr'))
+            if process.pidfd is not None:
+                selector.register(process.pidfd, selectors.EVENT_READ, (index, 'exit'))
+        if interactor.canWrite():
+            self.__openInputFile(interactor)
+
+        while exitError is None:
+            for index, process in enumerate(processes):
+                self.__updateWriting(selector, index, process)
+            if not self.__hasOutputs(selector) and not solution.isRunning() and not interactor.isRunning():
                 break
 
-            if not interactorPopen.isRunning() and interactorPopen.poll != 0:
-                exitError = 'Interactor got RE.'
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                exitError = timeoutError
                 break
-
-            solutionUnprocessedOutput = solutionPopen.getLine('stdout')
-            if solutionUnprocessedOutput is not None:
-                self.__printWithSeparator(solutionUnprocessedOutput, 0, None, None, None)
-                interactorPopen.communicate(solutionUnprocessedOutput)
-
-            interactorUnprocessedOutput = interactorPopen.getLine('stdout')
-            if interactorUnprocessedOutput is not None:
-                self.__printWithSeparator(interactorUnprocessedOutput, Interactor.PADDING, 255, 255, 0)
-                solutionPopen.communicate(interactorUnprocessedOutput)
-
-        self.__finish(solutionPopen, interactorPopen, exitError)
+            if any(process.pidfd is None for process in processes):
+                remaining = min(remaining, Interactor.EXIT_CHECK)
+
+            for key, _ in selector.select(remaining):
+                index, kind = key.data
+                if kind == 'stdin':
+                    processes[index].flush()
+                elif kind == 'exit':
+                    selector.unregister(key.fileobj)
+                elif kind == 'stdout':
+                    self.__read(selector, index, kind, key.fileobj, processes[1 - index])
+                else:
+                    self.__read(selector, index, kind, key.fileobj, None)
+
+            for process, error in zip(processes, Interactor.EXIT_ERRORS):
+                if process.checkExit() and process.returnCode != 0 and exitError is None:
+                    exitError = error
+
+        self.__finish(selector, processes, exitError, time.perf_counter() - startTime)
 
 def main():
     parser = ArgumentParser()
@@ -198,6 +458,18 @@ def main():
                         required=False,
                         help='Path to the input file for interactor.')
 
+    parser.add_argument('-quiet',
+                        action='store_true',
+                        help='Do not print the interaction, the programs are connected by pipes directly. ' +
+                             'Stderr of both programs is printed at the end.')
+
+    parser.add_argument('-tail',
+                        action='store',
+                        type=int,
+                        required=False,
+                        default=0,
+                        help='Keep the last lines of the interaction and print them if it fails (implies -quiet).')
+
     args = parser.parse_args()
     interactor = Interactor(args)
     runProcess(interactor.run)
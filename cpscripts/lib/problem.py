@@ -1,11 +1,14 @@
 class Problem:
     def __init__(self, title: str=None, index: str=None, link: str=None, tags: str=None,\
-                 difficulty: int=None, inputs: list[str]=None, outputs: list[str]=None):
+                 difficulty: int=None, inputs: list[str]=None, outputs: list[str]=None,\
+                 timeLimit: float=None, memoryLimit: float=None):
         self.title = title
         self.index = index
         self.link = link
         self.difficulty = difficulty
         self.tags = tags
+        self.timeLimit = timeLimit
+        self.memoryLimit = memoryLimit
         self.inputs = None if inputs is None else [x.strip('\n') + '\n' for x in inputs]
         self.outputs = None if outputs is None else [x.strip('\n') + '\n' for x in outputs]
 
@@ -14,7 +17,9 @@ class Problem:
         result += f'Index: {self.index}\n'
         result += f'Link: {self.link}\n'
         result += f'Tags: {self.tags}\n'
-        result += f'Difficulty: {self.difficulty}'
+        result += f'Difficulty: {self.difficulty}\n'
+        result += f'Time limit: {self.timeLimit}\n'
+        result += f'Memory limit: {self.memoryLimit}'
         if self.inputs is None:
             result += '\nTests: None'
         else:
@@ -0,0 +1,157 @@
+import fcntl
+import os
+import selectors
+import subprocess
+import time
+
+from typing     import Optional
+from .execution import ExecutionResult, ProcessTracker, createMemoryFile, killProcessGroup
+
+class PersistentProcess:
+    '''
+    Process which stays alive and handles many tests: it reads them one after another from stdin
+    and prints a delimiter line (and flushes stdout) after the answer to each of them.
+    A crashed process is started again on the next exchange.
+
+    Variables:
+    command:    list[str]
+    marker:     bytes
+    tracker:    ProcessTracker or None
+    process:    subprocess.Popen or None
+    stderrFile: BinaryIO or None
+    '''
+
+    READ_SIZE = 1 << 16
+
+    def __init__(self, command: list[str], delimiter: str, tracker: Optional[ProcessTracker]=None):
+        self.command = command
+        self.marker = delimiter.encode() + b'\n'
+        self.tracker = tracker
+        self.process = None
+        self.stderrFile = None
+
+    def start(self) -> None:
+        self.stderrFile = createMemoryFile()
+        # The process appends to stderr, so it can be truncated before each exchange.
+        fcntl.fcntl(self.stderrFile.fileno(), fcntl.F_SETFL, fcntl.fcntl(self.stderrFile.fileno(), fcntl.F_GETFL) | os.O_APPEND)
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.stderrFile,
+                                        start_new_session=True)
+        os.set_blocking(self.process.stdin.fileno(), False)
+        os.set_blocking(self.process.stdout.fileno(), False)
+        if self.tracker is not None:
+            self.tracker.register(self.process)
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+
+        killProcessGroup(self.process)
+        self.process.wait()
+        for stream in [self.process.stdin, self.process.stdout, self.stderrFile]:
+            try:
+                stream.close()
+            except OSError:
+                pass
+        if self.tracker is not None:
+            self.tracker.unregister(self.process)
+        self.process = None
+
+    def readStderr(self) -> bytes:
+        self.stderrFile.seek(0)
+        return self.stderrFile.read()
+
+    def isComplete(self, output: bytearray) -> bool:
+        if not output.endswith(self.marker):
+            return False
+        return len(output) == len(self.marker) or output[-len(self.marker) - 1] == ord('\n')
+
+def exchange(processes: list[PersistentProcess], data: bytes, timeouts: list[Optional[float]]) -> list[ExecutionResult]:
+    '''
+    Writes the test into all processes at once and reads their answers up to the delimiter, everything is multiplexed
+    in one loop, so large tests and answers never block on full pipes. A process which exits or does not answer
+    within its timeout (in seconds, one per process) is stopped and has a non-zero return code.
+    Only the wall time of the exchange is measured, the cpu time and the memory of the results are None:
+    the processes live across many tests, so their counters are not per test.
+    '''
+
+    results = [None] * len(processes)
+    outputs = [bytearray() for _ in processes]
+    written = [0] * len(processes)
+    selector = selectors.DefaultSelector()
+    startTime = time.perf_counter()
+    for index, process in enumerate(processes):
+        if process.process is None:
+            process.start()
+        process.stderrFile.truncate(0)
+        selector.register(process.process.stdout, selectors.EVENT_READ, index)
+        selector.register(process.process.stdin, selectors.EVENT_WRITE, index)
+
+    def finish(index: int, crashed: bool, timedOut: bool=False) -> None:
+        process = processes[index]
+        for stream in [process.process.stdin, process.process.stdout]:
+            try:
+                selector.unregister(stream)
+            except (KeyError, ValueError):
+                pass
+
+        returnCode = 0
+        stderr = process.readStderr()
+        output = bytes(outputs[index][:-len(process.marker)])
+        if crashed:
+            killProcessGroup(process.process)
+            returnCode = process.process.wait() or 1
+            output = bytes(outputs[index])
+        if crashed or written[index] < len(data):
+            # The process answered without reading the whole test, the rest would be taken for the next test.
+            process.stop()
+
+        results[index] = ExecutionResult(returnCode=returnCode,
+                                         wallTime=int((time.perf_counter() - startTime) * 1000),
+                                         cpuTime=None,
+                                         peakMemory=None,
+                                         timedOut=timedOut,
+                                         stdout=output,
+                                         stderr=stderr)
+
+    while any(result is None for result in results):
+        elapsed = time.perf_counter() - startTime
+        for index, timeout in enumerate(timeouts):
+            if results[index] is None and timeout is not None and elapsed >= timeout:
+                finish(index, True, True)
+
+        pending = [timeouts[index] for index, result in enumerate(results) if result is None]
+        if len(pending) == 0:
+            break
+        remaining = None if None in pending else min(pending) - elapsed
+
+        for key, _ in selector.select(remaining):
+            index = key.data
+            process = processes[index]
+            if results[index] is not None:
+                continue
+
+            if key.fileobj is process.process.stdin:
+                try:
+                    written[index] += os.write(process.process.stdin.fileno(), data[written[index]:written[index] + PersistentProcess.READ_SIZE])
+                except BlockingIOError:
+                    continue
+                except (BrokenPipeError, OSError):
+                    selector.unregister(process.process.stdin)
+                    continue
+                if written[index] == len(data):
+                    selector.unregister(process.process.stdin)
+                continue
+
+            try:
+                chunk = os.read(process.process.stdout.fileno(), PersistentProcess.READ_SIZE)
+            except BlockingIOError:
+                continue
+            if len(chunk) == 0:
+                finish(index, True)
+                continue
+            outputs[index] += chunk
+            if process.isComplete(outputs[index]):
+                finish(index, False)
+
+    selector.close()
+    return results
@@ -0,0 +1,209 @@
+import bisect
+import json
+import os
+import subprocess
+import tempfile
+
+from dataclasses import dataclass
+from typing      import Optional
+from .compiler   import CompilationCache, CompilationResult, Compiler, PrecompiledHeaders
+from .discovery  import Test
+from .execution  import ExecutionResult, ProcessTracker, runExecutable
+from .utils      import colored, dumpError
+
+RUNTIME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime', 'profiler.cpp')
+# Linked into the instrumented binary, but kept out of the precompiled header build.
+RUNTIME_ARGUMENTS = [RUNTIME_PATH, '-ldl']
+
+@dataclass
+class FunctionProfile:
+    name:      str
+    calls:     int
+    selfTime:  int
+    totalTime: int
+
+    def add(self, other: 'FunctionProfile') -> None:
+        self.calls += other.calls
+        self.selfTime += other.selfTime
+        self.totalTime += other.totalTime
+
+    def toDict(self) -> dict:
+        return {'calls': self.calls, 'self_ns': self.selfTime, 'total_ns': self.totalTime}
+
+def isGccCompiler(compilerPath: str) -> bool:
+    try:
+        version = subprocess.run([compilerPath, '--version'], capture_output=True).stdout
+    except OSError:
+        return False
+    return b'clang' not in version.lower()
+
+def instrumentationFlags(compilerPath: str) -> list[str]:
+    '''
+    Flags instrumenting the functions of the solution, but not the inlined code of the standard library.
+    '''
+
+    if isGccCompiler(compilerPath):
+        flags = ['-finstrument-functions', '-finstrument-functions-exclude-file-list=/usr/include,/usr/lib,/Library/Developer']
+    else:
+        flags = ['-finstrument-functions-after-inlining']
+    return flags + ['-fno-omit-frame-pointer']
+
+def readSymbols(executablePath: str) -> tuple[list[int], list[str]]:
+    '''
+    Sorted addresses of the functions of the executable with their demangled names.
+    '''
+
+    try:
+        symbols = subprocess.run(['nm', '-C', '--defined-only', executablePath], capture_output=True).stdout
+    except OSError:
+        return [], []
+
+    functions = []
+    for line in symbols.decode(errors='replace').split('\n'):
+        parts = line.split(' ', 2)
+        if len(parts) == 3 and parts[1] in 'tTwW':
+            functions.append((int(parts[0], 16), parts[2]))
+    functions.sort()
+    return [address for address, _ in functions], [name for _, name in functions]
+
+def isPositionIndependent(executablePath: str) -> bool:
+    try:
+        with open(executablePath, 'rb') as executableFile:
+            header = executableFile.read(18)
+    except OSError:
+        return True
+    # ELF e_type: 2 is a fixed-address executable, 3 is a position independent one.
+    return not (header[:4] == b'\x7fELF' and int.from_bytes(header[16:18], 'little') == 2)
+
+def readProfile(profilePath: str, executablePath: str) -> dict[str, FunctionProfile]:
+    try:
+        with open(profilePath, 'r') as profileFile:
+            lines = profileFile.read().split('\n')
+    except OSError:
+        return dict()
+    if len(lines) == 0 or not lines[0].startswith('base '):
+        return dict()
+
+    base = int(lines[0].split()[1], 16) if isPositionIndependent(executablePath) else 0
+    addresses, names = readSymbols(executablePath)
+    profile = dict()
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) != 4:
+            continue
+
+        address = int(parts[0], 16) - base
+        index = bisect.bisect_right(addresses, address) - 1
+        name = names[index] if index >= 0 and addresses[index] == address else f'0x{address:x}'
+        function = FunctionProfile(name=name, calls=int(parts[1]), selfTime=int(parts[2]), totalTime=int(parts[3]))
+        if name in profile:
+            profile[name].add(function)
+        else:
+            profile[name] = function
+    return profile
+
+def mergeProfiles(profiles: list[dict[str, FunctionProfile]]) -> dict[str, FunctionProfile]:
+    merged = dict()
+    for profile in profiles:
+        for name, function in profile.items():
+            if name not in merged:
+                merged[name] = FunctionProfile(name=name, calls=0, selfTime=0, totalTime=0)
+            merged[name].add(function)
+    return merged
+
+class Profiler:
+    '''
+    Builds an instrumented copy of the solution next to it and collects the profiles of its runs.
+    The raw profiles of the tests are saved into <executable>.profile.json, so that the next run can be compared with it.
+
+    Variables:
+    executablePath: str
+    profilePath:    str
+    compiler:       Compiler
+    tests:          dict[str, dict[str, FunctionProfile]]
+    '''
+
+    EXECUTABLE_SUFFIX = '_profile'
+    FILE_SUFFIX       = '.profile.json'
+    ENVIRONMENT_NAME  = 'CPSCRIPTS_PROFILE'
+    NAME_WIDTH        = 60
+
+    def __init__(self, compilerPath: str, flags: list[str], executablePath: str, cache: Optional[CompilationCache]=None,
+                 precompiledHeaders: Optional[PrecompiledHeaders]=None):
+        self.executablePath = executablePath + Profiler.EXECUTABLE_SUFFIX
+        self.profilePath = executablePath + Profiler.FILE_SUFFIX
+        self.compiler = Compiler(compilerPath, flags + instrumentationFlags(compilerPath), cache, precompiledHeaders,
+                                 RUNTIME_ARGUMENTS)
+        self.tests = dict()
+
+    def compile(self, solutionPath: str) -> CompilationResult:
+        return self.compiler.compile(solutionPath, self.executablePath)
+
+    def profileTest(self, test: Test, timeLimit: Optional[float]=None,
+                    tracker: Optional[ProcessTracker]=None) -> tuple[ExecutionResult, dict[str, FunctionProfile]]:
+        descriptor, profilePath = tempfile.mkstemp(suffix='.profile')
+        os.close(descriptor)
+        try:
+            with open(os.devnull, 'wb') as devNull, test.openInput() as inputFile:
+                execution = runExecutable([f'./{self.executablePath}'], inputFile, timeLimit, devNull, tracker,
+                                          {Profiler.ENVIRONMENT_NAME: profilePath})
+            profile = readProfile(profilePath, self.executablePath)
+        finally:
+            os.remove(profilePath)
+
+        self.tests[test.name()] = profile
+        return execution, profile
+
+    def dumpTable(self, limit: int) -> None:
+        '''
+        Functions ranked by their self time summed over the profiled tests.
+        If the previous profile is saved, the change of the self time is shown as well.
+        '''
+
+        merged = mergeProfiles(list(self.tests.values()))
+        previous = mergeProfiles(self.__loadPrevious())
+        totalTime = max(1, sum(function.selfTime for function in merged.values()))
+        functions = sorted(merged.values(), key=lambda function: function.selfTime, reverse=True)[:limit]
+
+        header = f'{"#":>3}  {"self":>10}  {"self %":>6}  {"cumulative":>10}  {"calls":>10}  '
+        if len(previous) > 0:
+            header += f'{"was":>10}  '
+        print(colored(header + 'function', 255, 165, 0))
+
+        for rank, function in enumerate(functions, start=1):
+            line = f'{rank:>3}  {function.selfTime / 1e6:>8.1f}ms  {100 * function.selfTime / totalTime:>5.1f}%  ' +\
+                   f'{function.totalTime / 1e6:>8.1f}ms  {function.calls:>10}  '
+            if len(previous) > 0:
+                was = previous.get(function.name)
+                line += f'{was.selfTime / 1e6:>8.1f}ms  ' if was is not None else f'{"-":>10}  '
+            name = function.name
+            if len(name) > Profiler.NAME_WIDTH:
+                name = name[:Profiler.NAME_WIDTH - 3] + '...'
+            print(line + name)
+
+    def save(self) -> None:
+        data = {name: {function.name: function.toDict() for function in profile.values()}
+                for name, profile in self.tests.items()}
+        try:
+            with open(self.profilePath, 'w') as profileFile:
+                profileFile.write(json.dumps({'tests': data}, indent=4))
+        except OSError as error:
+            dumpError(f'Failed to save the profile: {error}')
+
+# Private:
+
+    def __loadPrevious(self) -> list[dict[str, FunctionProfile]]:
+        try:
+            with open(self.profilePath, 'r') as profileFile:
+                data = json.loads(profileFile.read())
+        except (OSError, ValueError):
+            return []
+
+        profiles = []
+        for testName, profile in data.get('tests', {}).items():
+            if testName not in self.tests:
+                continue
+            profiles.append({name: FunctionProfile(name=name, calls=function['calls'], selfTime=function['self_ns'],
+                                                   totalTime=function['total_ns'])
+                             for name, function in profile.items()})
+        return profiles
@@ -0,0 +1,131 @@
+import math
+
+from dataclasses import dataclass
+from typing      import Optional
+from .bench      import confidenceInterval, percentile
+from .execution  import ExecutionResult
+from .utils      import colored
+
+# Tests on which both solutions run faster than this are not used for the speedup distribution,
+# their cpu times (in milliseconds) are mostly the startup.
+MIN_RACE_TIME = 2
+PERCENTILES   = [0, 10, 25, 50, 75, 90, 100]
+
+@dataclass
+class RaceSample:
+    seed:          int
+    firstCpu:      int
+    secondCpu:     int
+    # Peak memory in megabytes or None if it did not exceed the memory of the harness, see getHarnessMemory.
+    firstMemory:   Optional[float]
+    secondMemory:  Optional[float]
+    harnessMemory: float
+
+    def speedup(self) -> float:
+        '''
+        How many times the second solution is faster than the first one.
+        '''
+
+        return max(self.firstCpu, 1) / max(self.secondCpu, 1)
+
+    def isComparable(self) -> bool:
+        return max(self.firstCpu, self.secondCpu) >= MIN_RACE_TIME
+
+class RaceStats:
+    '''
+    Paired samples of two solutions run on the same tests.
+
+    Variables:
+    firstName:  str
+    secondName: str
+    samples:    list[RaceSample]
+    '''
+
+    LOSSES_SHOWN = 10
+
+    def __init__(self, firstName: str, secondName: str):
+        self.firstName = firstName
+        self.secondName = secondName
+        self.samples = []
+
+    def add(self, seed: int, first: ExecutionResult, second: ExecutionResult) -> None:
+        memory = lambda execution: execution.peakMemoryMb() if execution.memoryExact else None
+        bounds = [execution.peakMemoryMb() for execution in [first, second] if not execution.memoryExact]
+        self.samples.append(RaceSample(seed=seed, firstCpu=first.cpuTime, secondCpu=second.cpuTime,
+                                       firstMemory=memory(first), secondMemory=memory(second),
+                                       harnessMemory=max(bounds, default=0)))
+
+    def faster(self) -> tuple[str, list[RaceSample]]:
+        '''
+        Name of the solution with the smaller total cpu time and the tests on which it is slower, the worst first.
+        '''
+
+        firstTotal = sum(sample.firstCpu for sample in self.samples)
+        secondTotal = sum(sample.secondCpu for sample in self.samples)
+        if secondTotal <= firstTotal:
+            losses = [sample for sample in self.samples if sample.isComparable() and sample.secondCpu > sample.firstCpu]
+            return self.secondName, sorted(losses, key=lambda sample: sample.speedup())
+        losses = [sample for sample in self.samples if sample.isComparable() and sample.firstCpu > sample.secondCpu]
+        return self.firstName, sorted(losses, key=lambda sample: sample.speedup(), reverse=True)
+
+    def dumpReport(self) -> None:
+        if len(self.samples) == 0:
+            return
+
+        print(colored(f'\nRace: {self.firstName} vs {self.secondName} on {len(self.samples)} tests', 255, 165, 0))
+        print(colored(f'{"":<10}  {self.firstName:>12}  {self.secondName:>12}', 255, 165, 0))
+        for title, first, second in [('total cpu', sum(sample.firstCpu for sample in self.samples),
+                                      sum(sample.secondCpu for sample in self.samples)),
+                                     ('max cpu', max(sample.firstCpu for sample in self.samples),
+                                      max(sample.secondCpu for sample in self.samples))]:
+            print(f'{title:<10}  {first:>10}ms  {second:>10}ms')
+        for title, function in [('avg memory', lambda values: sum(values) / len(values)), ('max memory', max)]:
+            print(f'{title:<10}  {self.__formatMemory([sample.firstMemory for sample in self.samples], function):>12}  ' +
+                  f'{self.__formatMemory([sample.secondMemory for sample in self.samples], function):>12}')
+
+        difference, error = confidenceInterval([sample.firstCpu - sample.secondCpu for sample in self.samples])
+        print(f'{self.secondName} saves {difference:.2f} ± {error:.2f}ms per test (95% confidence)')
+
+        comparable = [sample for sample in self.samples if sample.isComparable()]
+        if len(comparable) == 0:
+            print(colored(f'All tests run faster than {MIN_RACE_TIME}ms, the speedup can not be measured.', 120, 200, 235))
+            return
+
+        speedups = [sample.speedup() for sample in comparable]
+        geometricMean = math.exp(sum(math.log(speedup) for speedup in speedups) / len(speedups))
+        wins = sum(1 for sample in comparable if sample.secondCpu < sample.firstCpu)
+        losses = sum(1 for sample in comparable if sample.secondCpu > sample.firstCpu)
+        print(f'Speedup of {self.secondName} on {len(comparable)} tests taking at least {MIN_RACE_TIME}ms: ' +
+              f'geometric mean x{geometricMean:.2f}, faster on {wins}, slower on {losses}, ' +
+              f'equal on {len(comparable) - wins - losses}')
+        print('Percentiles: ' + ', '.join(f'p{rank} x{percentile(speedups, rank / 100):.2f}' for rank in PERCENTILES))
+
+        name, lost = self.faster()
+        if len(lost) == 0:
+            print(colored(f'{name} is never slower.', 20, 255, 20))
+            return
+        print(colored(f'{name} is faster in total, but slower on {len(lost)} tests, the worst of them:', 255, 165, 0))
+        for sample in lost[:RaceStats.LOSSES_SHOWN]:
+            print(f'seed {sample.seed}: {self.firstName} {sample.firstCpu}ms, {self.secondName} {sample.secondCpu}ms')
+
+    def toDict(self) -> dict:
+        name, lost = self.faster()
+        return {'first': self.firstName,
+                'second': self.secondName,
+                'faster': name,
+                'losing_seeds': [sample.seed for sample in lost],
+                'samples': [{'seed': sample.seed, 'first_cpu_ms': sample.firstCpu, 'second_cpu_ms': sample.secondCpu,
+                             'first_memory_mb': sample.firstMemory, 'second_memory_mb': sample.secondMemory}
+                            for sample in self.samples]}
+
+# Private:
+
+    def __formatMemory(self, values: list[Optional[float]], function) -> str:
+        '''
+        Only the exact peaks are aggregated, if there are none the peaks are only known to be below the harness memory.
+        '''
+
+        exact = [value for value in values if value is not None]
+        if len(exact) == 0:
+            return f'<{max(sample.harnessMemory for sample in self.samples):.1f}MB'
+        return f'{function(exact):.1f}MB'
@@ -0,0 +1,113 @@
+// Runtime of the profile mode: linked with the solution compiled with -finstrument-functions.
+// Self and cumulative times of every called function are dumped at exit into the file
+// given by the CPSCRIPTS_PROFILE environment variable, one function per line:
+//     <address> <calls> <self ns> <cumulative ns>
+// The first line is "base <address>", the address the executable is loaded at.
+// Only single-threaded solutions are supported.
+
+#include <dlfcn.h>
+#include <time.h>
+
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+
+#define NO_INSTRUMENT __attribute__((no_instrument_function))
+
+namespace {
+
+struct Entry {
+    void*    function;
+    uint64_t calls;
+    uint64_t selfTime;
+    uint64_t totalTime;
+    uint32_t active; // number of activations on the stack, recursion is counted in the cumulative time once
+};
+
+struct Frame {
+    Entry*   entry;
+    uint64_t start;
+    uint64_t childrenTime;
+};
+
+const size_t TABLE_SIZE = 1 << 16;
+const size_t MAX_DEPTH  = 1 << 16;
+
+Entry  table[TABLE_SIZE];
+Frame  frames[MAX_DEPTH];
+size_t depth = 0; // frames deeper than MAX_DEPTH are not timed
+
+NO_INSTRUMENT uint64_t now() {
+    timespec time;
+    clock_gettime(CLOCK_MONOTONIC, &time);
+    return uint64_t(time.tv_sec) * 1000000000ull + uint64_t(time.tv_nsec);
+}
+
+NO_INSTRUMENT Entry* findEntry(void* function) {
+    size_t index = (reinterpret_cast<uintptr_t>(function) >> 4) & (TABLE_SIZE - 1);
+    while (table[index].function != nullptr && table[index].function != function) {
+        index = (index + 1) & (TABLE_SIZE - 1);
+    }
+    table[index].function = function;
+    return &table[index];
+}
+
+} // namespace
+
+extern "C" NO_INSTRUMENT void __cyg_profile_func_enter(void* function, void*) {
+    uint64_t start = now();
+    if (depth < MAX_DEPTH) {
+        Entry* entry = findEntry(function);
+        entry->calls++;
+        entry->active++;
+        frames[depth] = Frame{entry, start, 0};
+    }
+    depth++;
+}
+
+extern "C" NO_INSTRUMENT void __cyg_profile_func_exit(void*, void*) {
+    if (depth == 0) {
+        return;
+    }
+    depth--;
+    if (depth >= MAX_DEPTH) {
+        return;
+    }
+
+    Frame& frame = frames[depth];
+    uint64_t elapsed = now() - frame.start;
+    frame.entry->selfTime += elapsed - frame.childrenTime;
+    if (--frame.entry->active == 0) {
+        frame.entry->totalTime += elapsed;
+    }
+    if (depth > 0) {
+        frames[depth - 1].childrenTime += elapsed;
+    }
+}
+
+__attribute__((destructor)) NO_INSTRUMENT static void dumpProfile() {
+    // Functions still on the stack (e.g. exit() was called) are closed at the moment of the dump.
+    while (depth > 0) {
+        __cyg_profile_func_exit(nullptr, nullptr);
+    }
+
+    const char* path = getenv("CPSCRIPTS_PROFILE");
+    if (path == nullptr) {
+        return;
+    }
+    FILE* profileFile = fopen(path, "w");
+    if (profileFile == nullptr) {
+        return;
+    }
+
+    Dl_info info;
+    uintptr_t base = dladdr(reinterpret_cast<void*>(&dumpProfile), &info) ? reinterpret_cast<uintptr_t>(info.dli_fbase) : 0;
+    fprintf(profileFile, "base %zx\n", size_t(base));
+    for (const Entry& entry : table) {
+        if (entry.function != nullptr) {
+            fprintf(profileFile, "%zx %llu %llu %llu\n", size_t(reinterpret_cast<uintptr_t>(entry.function)),
+                    (unsigned long long)entry.calls, (unsigned long long)entry.selfTime, (unsigned long long)entry.totalTime);
+        }
+    }
+    fclose(profileFile);
+}
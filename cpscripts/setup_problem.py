@@ -1,4 +1,5 @@
 import argparse
+import json
 import os
 import subprocess
 import sys
@@ -6,7 +7,7 @@ import sys
 from dataclasses                 import dataclass
 from typing                      import Optional
 from .lib.problem                import Problem
-from .utils                      import colored, JudgeSystem, dumpError, getHtml, loadSettings, runProcess
+from .utils                      import colored, JudgeSystem, dumpError, getHtml, loadSettings, runProcess, LIMITS_FILE_NAME
 from .codeforces.get_problem     import parseProblemFromHtml as cfParseProblemFromHtml
 from .atcoder.get_problem        import parseProblemFromHtml as atcoderParseProblemFromHtml
 from .yandex_contest.get_problem import parseProblemFromHtml as yandexParseProblemFromHtml
@@ -29,6 +30,10 @@ def createProblemFiles(problem: Problem, problemFiles: list[File], directory: st
             createSingleFile(f'{directory}/in{testIndex + 1}', problem.inputs[testIndex])
             createSingleFile(f'{directory}/out{testIndex + 1}', problem.outputs[testIndex])
 
+    if problem.timeLimit is not None or problem.memoryLimit is not None:
+        limits = {'time_limit': problem.timeLimit, 'memory_limit': problem.memoryLimit}
+        createSingleFile(f'{directory}/{LIMITS_FILE_NAME}', json.dumps(limits))
+
     for problemFile in problemFiles:
         subprocess.run(['cp', '-r', problemFile.templatePath, f'{directory}/{problemFile.fileName}'])
 
@@ -0,0 +1,270 @@
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses        import dataclass, field
+from typing             import Callable, Optional
+from .utils             import colored
+
+SIZE_ARGUMENT_REGEX = re.compile(r'(.*?)(\d+)')
+
+def countTokens(test: bytes) -> int:
+    return len(test.split())
+
+def splitLines(test: bytes) -> list[bytes]:
+    lines = test.split(b'\n')
+    if len(lines) > 0 and len(lines[-1]) == 0:
+        lines.pop()
+    return lines
+
+def joinLines(lines: list[bytes]) -> bytes:
+    return b''.join(line + b'\n' for line in lines)
+
+def parseTest(test: bytes) -> list[list[bytes]]:
+    return [line.split() for line in splitLines(test)]
+
+def buildTest(lines: list[list[bytes]]) -> bytes:
+    return joinLines([b' '.join(tokens) for tokens in lines])
+
+def findCounts(lines: list[list[bytes]], before: int, value: int) -> list[tuple[int, int]]:
+    '''
+    Positions (line, token) of the tokens equal to the value in the lines before the given one, the nearest first.
+    '''
+
+    token = str(value).encode()
+    return [(lineIndex, tokenIndex) for lineIndex in reversed(range(before))
+            for tokenIndex in reversed(range(len(lines[lineIndex]))) if lines[lineIndex][tokenIndex] == token]
+
+def replaceCount(lines: list[list[bytes]], position: tuple[int, int], value: int) -> list[list[bytes]]:
+    lineIndex, tokenIndex = position
+    line = list(lines[lineIndex])
+    line[tokenIndex] = str(value).encode()
+    return lines[:lineIndex] + [line] + lines[lineIndex + 1:]
+
+def smallerSizes(value: int) -> list[int]:
+    return sorted({value // 2, value * 3 // 4, value * 7 // 8} - {value})
+
+def formatSize(test: bytes) -> str:
+    return f'{len(test)} bytes, {len(splitLines(test))} lines, {countTokens(test)} tokens'
+
+@dataclass
+class ShrinkStats:
+    originalTest:   bytes
+    originalArgs:   list[str]
+    finalArgs:      list[str] = field(default_factory=list)
+    candidates:     int = 0
+    reductions:     int = 0
+    elapsed:        float = 0
+    limitReached:   bool = False
+
+class Shrinker:
+    '''
+    Makes the failing test as small as possible. First the generator is run again with smaller size arguments
+    (every argument ending with a number, like 200000 or n=200000), then the lines and the tokens of the test
+    are removed by delta debugging. To keep the input format, lines and tokens are removed only together with
+    their count: a run of lines of the same shape or a single line of tokens is shrunk only if an earlier token
+    is equal to its length, and that token is decreased with it. Candidates are checked on several workers at once.
+
+    Variables:
+    check:         Callable[[bytes], bool], tells whether the test still fails
+    generate:      Callable[[list[str]], Optional[bytes]], runs the generator with the given arguments
+    jobs:          int
+    maxCandidates: int
+    stats:         ShrinkStats or None
+    executor:      ThreadPoolExecutor
+    '''
+
+    MAX_COUNT_CHOICES = 3
+    MAX_HEADER_LINES  = 2
+
+    def __init__(self, check: Callable[[bytes], bool], generate: Callable[[list[str]], Optional[bytes]],
+                 jobs: int, maxCandidates: int):
+        self.check = check
+        self.generate = generate
+        self.jobs = max(1, jobs)
+        self.maxCandidates = maxCandidates
+        self.stats = None
+
+    def shrink(self, test: bytes, generatorArgs: list[str]) -> bytes:
+        self.stats = ShrinkStats(originalTest=test, originalArgs=generatorArgs)
+        startTime = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            self.executor = executor
+            generatorArgs, test = self.__shrinkGeneratorArgs(generatorArgs, test)
+            lines = self.__shrinkLineRuns(parseTest(test))
+            test = buildTest(self.__shrinkTokenLines(lines))
+        self.stats.finalArgs = generatorArgs
+        self.stats.elapsed = time.perf_counter() - startTime
+        return test
+
+    def dumpStats(self, test: bytes) -> None:
+        stats = self.stats
+        print(colored('Shrunk the test:', 255, 165, 0), f'{formatSize(stats.originalTest)} -> {formatSize(test)}')
+        if stats.finalArgs != stats.originalArgs:
+            print(colored('Generator arguments:', 255, 165, 0), f'{" ".join(stats.originalArgs)} -> {" ".join(stats.finalArgs)}')
+        print(colored('Candidates:', 255, 165, 0),
+              f'{stats.candidates} checked, {stats.reductions} accepted in {stats.elapsed:.1f}s' +
+              (' (limit reached)' if stats.limitReached else ''))
+
+# Private:
+
+    def __canCheck(self) -> bool:
+        if self.stats.candidates >= self.maxCandidates:
+            self.stats.limitReached = True
+            return False
+        return True
+
+    def __evaluate(self, candidates: list, evaluate: Callable) -> list:
+        candidates = candidates[:self.maxCandidates - self.stats.candidates]
+        self.stats.candidates += len(candidates)
+        return list(self.executor.map(evaluate, candidates))
+
+    def __shrinkGeneratorArgs(self, generatorArgs: list[str], test: bytes) -> tuple[list[str], bytes]:
+        '''
+        In each round all the arguments are tried to be decreased, the variant with the smallest failing test is taken.
+        '''
+
+        def evaluate(candidateArgs: list[str]) -> Optional[bytes]:
+            candidateTest = self.generate(candidateArgs)
+            if candidateTest is None or not self.check(candidateTest):
+                return None
+            return candidateTest
+
+        while self.__canCheck():
+            candidates = []
+            for index, argument in enumerate(generatorArgs):
+                match = SIZE_ARGUMENT_REGEX.fullmatch(argument)
+                if match is None:
+                    continue
+                for size in smallerSizes(int(match.group(2))):
+                    candidates.append(generatorArgs[:index] + [match.group(1) + str(size)] + generatorArgs[index + 1:])
+            if len(candidates) == 0:
+                break
+
+            best = None
+            for candidateArgs, candidateTest in zip(candidates, self.__evaluate(candidates, evaluate)):
+                if candidateTest is not None and len(candidateTest) < len(test) and (best is None or len(candidateTest) < len(best[1])):
+                    best = (candidateArgs, candidateTest)
+            if best is None:
+                break
+            generatorArgs, test = best
+            self.stats.reductions += 1
+
+        for index in range(len(generatorArgs)):
+            generatorArgs, test = self.__refineArgument(generatorArgs, index, test, evaluate)
+        return generatorArgs, test
+
+    def __refineArgument(self, generatorArgs: list[str], index: int, test: bytes,
+                         evaluate: Callable[[list[str]], Optional[bytes]]) -> tuple[list[str], bytes]:
+        '''
+        Smaller sizes of the argument failed to reproduce, so the smallest failing size is searched between
+        the 7/8 of it and it. Each step checks one point per worker, so the interval shrinks jobs + 1 times.
+        '''
+
+        match = SIZE_ARGUMENT_REGEX.fullmatch(generatorArgs[index])
+        if match is None:
+            return generatorArgs, test
+
+        prefix = match.group(1)
+        low, high = int(match.group(2)) * 7 // 8, int(match.group(2))
+        while high - low > 1 and self.__canCheck():
+            step = max(1, (high - low) // (self.jobs + 1))
+            sizes = list(range(low + step, high, step))[:self.jobs]
+            candidates = [generatorArgs[:index] + [prefix + str(size)] + generatorArgs[index + 1:] for size in sizes]
+            for size, candidateArgs, candidateTest in zip(sizes, candidates, self.__evaluate(candidates, evaluate)):
+                if candidateTest is not None:
+                    high = size
+                    generatorArgs, test = candidateArgs, candidateTest
+                    self.stats.reductions += 1
+                    break
+                low = size
+        return generatorArgs, test
+
+    def __shrinkLineRuns(self, lines: list[list[bytes]]) -> list[list[bytes]]:
+        '''
+        Runs of consecutive lines with the same number of tokens are processed from the last one. A run may start
+        with a few header lines of the same shape (like the n before n numbers, one per line), so they are skipped.
+        '''
+
+        end = len(lines)
+        while end > 0 and self.__canCheck():
+            start = end - 1
+            while start > 0 and len(lines[start - 1]) == len(lines[end - 1]):
+                start -= 1
+
+            if len(lines[end - 1]) > 0:
+                for blockStart in range(start, min(end - 1, start + Shrinker.MAX_HEADER_LINES + 1)):
+                    shrunk = self.__shrinkCounted(lines[:blockStart], lines[blockStart:end], lines[end:])
+                    if shrunk is not None:
+                        lines = shrunk
+                        break
+            end = start
+        return lines
+
+    def __shrinkTokenLines(self, lines: list[list[bytes]]) -> list[list[bytes]]:
+        '''
+        Only the lines that differ in shape from their neighbours are shrunk, the tokens of the lines
+        of a run (like the edges of a graph) are not counted by a single token.
+        '''
+
+        for index in reversed(range(len(lines))):
+            if not self.__canCheck():
+                break
+            sameShape = lambda other: 0 <= other < len(lines) and len(lines[other]) == len(lines[index])
+            if len(lines[index]) < 2 or sameShape(index - 1) or sameShape(index + 1):
+                continue
+
+            shrunk = self.__shrinkCounted(lines[:index], lines[index], lines[index + 1:],
+                                          lambda prefix, kept, suffix: prefix + [kept] + suffix)
+            if shrunk is not None:
+                lines = shrunk
+        return lines
+
+    def __shrinkCounted(self, prefix: list[list[bytes]], units: list, suffix: list[list[bytes]],
+                        assemble: Callable=lambda prefix, kept, suffix: prefix + kept + suffix) -> Optional[list[list[bytes]]]:
+        '''
+        Removes the units while decreasing a token of the prefix equal to their number. If several tokens match,
+        they are tried from the nearest one until one of them allows a removal. Returns None if nothing is removed.
+        '''
+
+        for position in findCounts(prefix, len(prefix), len(units))[:Shrinker.MAX_COUNT_CHOICES]:
+            build = lambda kept: buildTest(assemble(replaceCount(prefix, position, len(kept)), kept, suffix))
+            kept = self.__ddmin(units, build)
+            if len(kept) < len(units):
+                return assemble(replaceCount(prefix, position, len(kept)), kept, suffix)
+        return None
+
+    def __firstFailing(self, count: int, candidate: Callable[[int], bytes]) -> Optional[int]:
+        '''
+        Candidates are built batch by batch, a test with many lines has too many candidates to keep all of them in memory.
+        '''
+
+        for start in range(0, count, self.jobs):
+            if not self.__canCheck():
+                return None
+            results = self.__evaluate([candidate(index) for index in range(start, min(count, start + self.jobs))], self.check)
+            for index, failed in enumerate(results):
+                if failed:
+                    return start + index
+        return None
+
+    def __ddmin(self, units: list, build: Callable[[list], bytes]) -> list:
+        '''
+        Delta debugging: the units are split into chunks and the test without one of the chunks is checked.
+        If no chunk can be removed, the chunks are made twice smaller, until they consist of single units.
+        '''
+
+        granularity = 2
+        while len(units) >= 2 and self.__canCheck():
+            chunkSize = (len(units) + granularity - 1) // granularity
+            starts = range(0, len(units), chunkSize)
+            found = self.__firstFailing(len(starts), lambda index: build(units[:starts[index]] + units[starts[index] + chunkSize:]))
+            if found is not None:
+                units = units[:starts[found]] + units[starts[found] + chunkSize:]
+                granularity = max(granularity - 1, 2)
+                self.stats.reductions += 1
+            elif granularity >= len(units):
+                break
+            else:
+                granularity = min(2 * granularity, len(units))
+        return units
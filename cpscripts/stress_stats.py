@@ -0,0 +1,127 @@
+import json
+import shutil
+import time
+
+from typing     import Optional
+from .execution import ExecutionResult
+from .utils     import colored, dumpError
+
+def formatDuration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f'{seconds // 3600}h{seconds % 3600 // 60:02}m'
+    if seconds >= 60:
+        return f'{seconds // 60}m{seconds % 60:02}s'
+    return f'{seconds}s'
+
+class TimeStats:
+    '''
+    Wall times of one of the programs (in milliseconds) and the seed of the slowest run.
+
+    Variables:
+    count:   int
+    total:   int
+    maximum: int
+    maxSeed: int or None
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self.maxSeed = None
+
+    def add(self, seed: int, execution: Optional[ExecutionResult]) -> None:
+        if execution is None:
+            return
+        self.count += 1
+        self.total += execution.wallTime
+        if self.maxSeed is None or execution.wallTime > self.maximum:
+            self.maximum = execution.wallTime
+            self.maxSeed = seed
+
+    def average(self) -> float:
+        return self.total / max(1, self.count)
+
+    def toDict(self) -> dict:
+        return {'runs': self.count, 'avg_ms': self.average(), 'max_ms': self.maximum, 'max_seed': self.maxSeed}
+
+class StressStats:
+    '''
+    Throughput of the stress test and the time spent in each of the programs, the status line is refreshed by the caller
+    at a fixed rate, so the cost of it does not depend on the speed of the tests.
+
+    Variables:
+    testsNumber: int
+    startTime:   float
+    tested:      int
+    programs:    dict[str, TimeStats]
+    '''
+
+    def __init__(self, testsNumber: int, programs: list[str]):
+        self.testsNumber = testsNumber
+        self.startTime = time.perf_counter()
+        self.tested = 0
+        self.programs = {name: TimeStats() for name in programs}
+
+    def add(self, seed: int, generator: Optional[ExecutionResult], solution: Optional[ExecutionResult],
+            brute: Optional[ExecutionResult]) -> None:
+        self.tested += 1
+        for stats, execution in zip(self.programs.values(), [generator, solution, brute]):
+            stats.add(seed, execution)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.startTime
+
+    def testsPerSecond(self) -> float:
+        return self.tested / max(self.elapsed(), 1e-9)
+
+    def statusLine(self) -> str:
+        '''
+        Parts which do not fit into the terminal are dropped, a wrapped line could not be overwritten.
+        '''
+
+        rate = self.testsPerSecond()
+        eta = formatDuration((self.testsNumber - self.tested) / rate) if self.tested > 0 else '?'
+        tested = f'{self.tested}/{self.testsNumber}'
+        parts = [f'{rate:.1f} tests/s', f'ETA {eta}']
+        for name, stats in self.programs.items():
+            if stats.count > 0:
+                parts.append(f'{name} {stats.average():.1f}/{stats.maximum}ms')
+        solution = list(self.programs.values())[1]
+        if solution.maxSeed is not None:
+            parts.append(f'slowest seed {solution.maxSeed}')
+
+        width = shutil.get_terminal_size().columns - 1
+        length = len('Tested ') + len(tested)
+        line = colored('\rTested ', 255, 255, 50) + colored(tested, 0, 200, 200)
+        for part in parts:
+            length += len(part) + 3
+            if length > width:
+                break
+            line += f' | {part}'
+        return line + '\033[K'
+
+    def dumpSummary(self) -> None:
+        print(colored(f'\n{self.tested} tests in {self.elapsed():.1f}s ({self.testsPerSecond():.1f} tests/s)', 255, 165, 0))
+        print(colored(f'{"program":<8}  {"avg":>10}  {"max":>8}  {"total":>9}  {"share":>6}  slowest seed', 255, 165, 0))
+        totalTime = max(1, sum(stats.total for stats in self.programs.values()))
+        for name, stats in self.programs.items():
+            if stats.count == 0:
+                continue
+            print(f'{name:<8}  {stats.average():>8.2f}ms  {stats.maximum:>6}ms  {stats.total / 1000:>8.1f}s  ' +
+                  f'{100 * stats.total / totalTime:>5.1f}%  {stats.maxSeed}')
+
+    def export(self, path: str, failure: Optional[dict], race: Optional[dict]=None) -> None:
+        data = {'tests': self.tested,
+                'elapsed_s': self.elapsed(),
+                'tests_per_second': self.testsPerSecond(),
+                'programs': {name: stats.toDict() for name, stats in self.programs.items() if stats.count > 0},
+                'failure': failure}
+        if race is not None:
+            data['race'] = race
+        try:
+            with open(path, 'w') as exportFile:
+                exportFile.write(json.dumps(data, indent=4))
+        except OSError as error:
+            dumpError(f'Failed to export stress test stats: {error}')
@@ -1,39 +1,175 @@
 import argparse
+import io
 import os
-import re
-import subprocess
+import shlex
 import sys
+import threading
+import time
 
-from .utils import colored, dumpError, compareOutput, addEmptyLine, coloredLinesPrint, runProcess
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses        import dataclass
+from enum               import Enum
+from typing             import BinaryIO, Optional
+from .compare           import CompareMode, Mismatch, OutputComparator, tokensMatch
+from .corpus            import Corpus
+from .diff_view         import DiffView
+from .execution         import ExecutionResult, ProcessTracker, createMemoryFile, runExecutable, WALL_TIME_LIMIT_FACTOR
+from .hunt              import Hunter
+from .persistent        import PersistentProcess, exchange
+from .race              import RaceStats
+from .shrink            import Shrinker
+from .stress_stats      import StressStats
+from .utils             import colored, dumpError, addEmptyLine, loadLimits, runProcess, LIMITS_FILE_NAME
+
+class StressVerdict(Enum):
+    OK           = 0
+    WA           = 1
+    RE           = 2
+    GENERATOR_RE = 3
+    BRUTE_RE     = 4
+    TL           = 5
+    BRUTE_TL     = 6
+
+@dataclass
+class StressRun:
+    seed:           int
+    verdict:        StressVerdict
+    test:           bytes
+    generator:      Optional[ExecutionResult] = None
+    solution:       Optional[ExecutionResult] = None
+    brute:          Optional[ExecutionResult] = None
+    mismatch:       Optional[Mismatch] = None
+    confirmed:      bool = True
+    corpusName:     Optional[str] = None
+    # The test was taken from the corpus by -replay, not generated by the seed.
+    replayed:       bool = False
+    # Outputs of the solution and the brute, kept only if the run has failed.
+    solutionOutput: Optional[BinaryIO] = None
+    bruteOutput:    Optional[BinaryIO] = None
+
+def parseShard(value: str) -> tuple[int, int]:
+    '''
+    Shard i/n (1 <= i <= n) covers the seeds i, i + n, i + 2n, ...
+    '''
+
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'shard must look like i/n, not {value}')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f'shard index must be between 1 and {count}')
+    return index, count
 
 class StressTester:
     '''
+    Seeds of the shard are handed out to the workers in increasing order. Once a failure is found,
+    no larger seeds are handed out and the runs on them are killed, while the runs on smaller seeds are finished,
+    so the reported failure is always the one with the smallest seed.
+
     Variables:
     testsNumber:        int
     solutionExecutable: str
     genExecutable:      str
     bruteExecutable:    str
+    jobs:               int
+    seeds:              range
+    lock:               Lock
+    position:           int
+    stats:              StressStats
+    failure:            StressRun or None
+    stopped:            bool
+    workerSeeds:        list[int or None]
+    trackers:           list[ProcessTracker]
+    persistent:         bool
+    delimiter:          str
+    genArgs:            list[str]
+    shrink:             bool
+    shrinkLimit:        int
+    export:             str or None
+    timeLimit:          float or None
+    corpus:             Corpus
+    replay:             bool
+    raceExecutable:     str or None
+    raceStats:          RaceStats or None
     '''
 
     TEST_NAME = 'in_stress'
+    CORPUS_VERDICTS = [StressVerdict.WA, StressVerdict.RE, StressVerdict.TL]
     TEST = colored('Test:', 255, 255, 50)
-    SOLVE_OUTPUT = colored('Solve output:', 255, 165, 0)
-    CORRECT_OUTPUT = colored('Correct output:', 255, 165, 0)
+    OUTPUTS = colored('Solve output (>) and correct output (<):', 255, 165, 0)
+    RACE_OUTPUTS = colored('Solve output (>) and output of the second solution (<):', 255, 165, 0)
     ERR = colored('Err', 255, 165, 0)
+    PROGRESS_INTERVAL = 0.1
+    PERSISTENT_TIMEOUT = 10 # seconds to wait for the delimiter, a forgotten flush must not hang the run
 
     def __init__(self, args: argparse.Namespace):
         self.testsNumber = args.tests
         self.solutionExecutable = args.sol
         self.genExecutable = args.gen
-        self.bruteExecutable = args.brute
+        self.raceExecutable = args.race
+        # In the race mode the second solution takes the place of the brute: the outputs are compared with it.
+        self.bruteExecutable = args.brute if self.raceExecutable is None else self.raceExecutable
+        self.jobs = max(1, args.jobs)
+        shardIndex, shardCount = args.shard
+        self.seeds = range(shardIndex, self.testsNumber + 1, shardCount)
+        self.persistent = args.persistent
+        self.delimiter = args.delimiter
+        self.genArgs = shlex.split(args.genargs)
+        self.shrink = args.shrink
+        self.shrinkLimit = args.shrinklimit
+        self.export = args.export
+        self.timeLimit = args.tl
+        self.corpus = Corpus(args.corpus)
+        self.replay = args.replay
         self.__checkExecutableFiles()
 
     def run(self) -> None:
+        self.lock = threading.Lock()
+        self.position = 0
+        self.stats = StressStats(len(self.seeds), ['gen', 'sol', 'brute' if self.raceExecutable is None else 'sol2'])
+        self.raceStats = None if self.raceExecutable is None else RaceStats(self.solutionExecutable, self.raceExecutable)
+        self.failure = None
+        self.stopped = False
+        self.workerSeeds = [None] * self.jobs
+        self.trackers = [ProcessTracker() for _ in range(self.jobs)]
+
         print("\033[?25l", end='') # hide the cursor
-        for testIndex in range(1, self.testsNumber + 1):
-            print(colored('\rTesting on test #', 255, 255, 50), colored(str(testIndex), 0, 200, 200), sep='', end='')
-            self.__runOneTest(testIndex)
+        if self.replay:
+            failure = self.__replayCorpus()
+            if failure is not None:
+                self.__dumpFailure(failure)
+                return
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self.__worker, workerIndex) for workerIndex in range(self.jobs)]
+            try:
+                while len(wait(futures, timeout=StressTester.PROGRESS_INTERVAL).not_done) > 0:
+                    self.__dumpProgress()
+            except KeyboardInterrupt:
+                self.__stop()
+                raise
+            for future in futures:
+                future.result()
+
+        self.__dumpProgress()
+        self.stats.dumpSummary()
+        if self.persistent:
+            print(colored('The times are the wall times of the exchanges, cpu time and memory are not measured in the persistent mode.',
+                          120, 200, 235))
+        if self.raceStats is not None:
+            self.raceStats.dumpReport()
+        if self.export is not None:
+            failure = None
+            if self.failure is not None:
+                failure = {'seed': self.failure.seed, 'verdict': self.failure.verdict.name, 'confirmed': self.failure.confirmed}
+            self.stats.export(self.export, failure, None if self.raceStats is None else self.raceStats.toDict())
 
+        if self.failure is not None:
+            if self.shrink:
+                self.__shrinkFailure()
+            self.__dumpFailure(self.failure)
+            self.__dumpCorpusName(self.failure)
+            return
         print(colored('\nLooks like everything is working fine!', 20, 255, 20))
 
 # Private:
@@ -44,75 +180,379 @@ class StressTester:
                 dumpError(f'No such file: {executableFile}')
                 sys.exit(0)
 
-    def __generateTest(self, testIndex: int) -> None:
-        with open(StressTester.TEST_NAME, 'w') as testFile:
-            runResult = subprocess.run([f'./{self.genExecutable}', str(testIndex)], stdout=testFile)
+    @staticmethod
+    def __command(executable: str) -> str:
+        return os.path.join('.', executable)
 
-        if runResult.returncode != 0:
-            dumpError('\nGenerator got RE.')
-            sys.exit(0)
+    def __dumpProgress(self) -> None:
+        with self.lock:
+            statusLine = self.stats.statusLine()
+        print(statusLine, end='', flush=True)
+
+    def __stop(self) -> None:
+        with self.lock:
+            self.stopped = True
+        for tracker in self.trackers:
+            tracker.cancel()
+
+    def __nextSeed(self, workerIndex: int) -> Optional[int]:
+        with self.lock:
+            if self.stopped or self.position >= len(self.seeds):
+                return None
+
+            seed = self.seeds[self.position]
+            if self.failure is not None and seed > self.failure.seed:
+                return None
+            self.position += 1
+            self.workerSeeds[workerIndex] = seed
+            return seed
+
+    def __reportRun(self, run: StressRun) -> None:
+        with self.lock:
+            self.stats.add(run.seed, run.generator, run.solution, run.brute)
+            if self.raceStats is not None and run.verdict == StressVerdict.OK:
+                self.raceStats.add(run.seed, run.solution, run.brute)
+            if run.verdict == StressVerdict.OK or (self.failure is not None and self.failure.seed < run.seed):
+                return
+
+            self.failure = run
+            # Runs on larger seeds can not be reported anymore, so they are killed.
+            for workerIndex, seed in enumerate(self.workerSeeds):
+                if seed is not None and seed > run.seed:
+                    self.trackers[workerIndex].cancel()
+
+    def __worker(self, workerIndex: int) -> None:
+        tracker = self.trackers[workerIndex]
+        if self.persistent:
+            self.__persistentWorker(workerIndex, tracker)
+            return
+
+        while True:
+            seed = self.__nextSeed(workerIndex)
+            if seed is None:
+                return
+            self.__reportRun(self.__saveToCorpus(self.__runOneTest(seed, tracker), tracker))
+
+    def __persistentWorker(self, workerIndex: int, tracker: ProcessTracker) -> None:
+        processes = self.__startPersistent(tracker)
+        try:
+            while True:
+                seed = self.__nextSeed(workerIndex)
+                if seed is None:
+                    return
+
+                run = self.__runPersistentTest(seed, processes)
+                if run.verdict != StressVerdict.OK and not tracker.isCancelled():
+                    run = self.__confirmPersistent(run, tracker)
+                self.__reportRun(self.__saveToCorpus(run, tracker))
+        finally:
+            for process in processes:
+                if process is not None:
+                    process.stop()
+
+    def __saveToCorpus(self, run: StressRun, tracker: ProcessTracker, genArgs: Optional[list[str]]=None) -> StressRun:
+        '''
+        Failures of the solution are saved into the corpus, except the runs killed because a smaller seed has failed.
+        '''
+
+        if run.verdict in StressTester.CORPUS_VERDICTS and run.confirmed and not tracker.isCancelled():
+            run.corpusName = self.corpus.add(run.test, run.seed, run.verdict.name, self.genArgs if genArgs is None else genArgs)
+        return run
+
+    def __replayCorpus(self) -> Optional[StressRun]:
+        '''
+        Runs the saved failures before the new seeds. Returns the first of them (the oldest one) which still fails.
+        '''
+
+        entries = self.corpus.entries()
+        if len(entries) == 0:
+            print(colored(f'Corpus {self.corpus.directory} is empty, nothing to replay.', 120, 200, 235))
+            return None
+
+        tracker = ProcessTracker()
+        def replay(entry) -> StressRun:
+            run = self.__runOnTest(entry.seeds[0] if len(entry.seeds) > 0 else 0, self.corpus.readTest(entry), tracker)
+            run.corpusName = entry.name
+            run.replayed = True
+            return run
+
+        startTime = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                runs = list(executor.map(replay, entries))
+        except KeyboardInterrupt:
+            tracker.cancel()
+            raise
+
+        failures = [run for run in runs if run.verdict != StressVerdict.OK]
+        message = f'Replayed {len(runs)} corpus tests in {(time.perf_counter() - startTime) * 1000:.0f}ms: '
+        if len(failures) > 0:
+            dumpError(message + f'{len(failures)} still fail.')
+            return failures[0]
+        print(colored(message + 'all passed.', 20, 255, 20))
+        return None
+
+    def __startPersistent(self, tracker: ProcessTracker) -> list[Optional[PersistentProcess]]:
+        executables = [self.genExecutable, self.solutionExecutable, self.bruteExecutable]
+        return [PersistentProcess([self.__command(executable)], self.delimiter, tracker) if executable is not None else None
+                for executable in executables]
+
+    def __runPersistentTest(self, seed: int, processes: list[Optional[PersistentProcess]]) -> StressRun:
+        '''
+        The generator gets the seed as a line of its stdin, the solution and the brute get the test
+        and answer it in one loop, so none of them is started again between the tests.
+        '''
+
+        generatorProcess, solutionProcess, bruteProcess = processes
+        generator = exchange([generatorProcess], self.__seedLine(seed, self.genArgs), [StressTester.PERSISTENT_TIMEOUT])[0]
+        test = generator.stdout
+        if generator.returnCode != 0:
+            return StressRun(seed=seed, verdict=StressVerdict.GENERATOR_RE, test=test, generator=generator)
+
+        # Cpu time is not measured in this mode, so the solution is limited by the wall time of the exchange.
+        # The brute is not limited, it only has to print the delimiter.
+        solutionTimeout = StressTester.PERSISTENT_TIMEOUT
+        bruteTimeout = StressTester.PERSISTENT_TIMEOUT
+        if self.timeLimit is not None:
+            solutionTimeout = self.timeLimit * WALL_TIME_LIMIT_FACTOR
+            bruteTimeout = max(bruteTimeout, solutionTimeout)
+        if bruteProcess is None:
+            results = exchange([solutionProcess], test, [solutionTimeout])
+        else:
+            results = exchange([solutionProcess, bruteProcess], test, [solutionTimeout, bruteTimeout])
+        if self.timeLimit is not None and results[0].wallTime > self.timeLimit * 1000:
+            results[0].timedOut = True
+        outputs = [io.BytesIO(result.stdout) for result in results]
+        run = self.__judge(seed, test, results[0], results[1] if bruteProcess is not None else None,
+                           outputs[0], outputs[1] if bruteProcess is not None else None)
+        run.generator = generator
+        return run
+
+    def __confirmPersistent(self, run: StressRun, tracker: ProcessTracker) -> StressRun:
+        '''
+        The failed seed is run again by fresh processes. If they pass it, the failure depends on the previous tests,
+        most likely some state is not reset between them, so the original run is reported as not confirmed.
+        '''
+
+        processes = self.__startPersistent(tracker)
+        try:
+            confirmation = self.__runPersistentTest(run.seed, processes)
+        finally:
+            for process in processes:
+                if process is not None:
+                    process.stop()
+
+        if confirmation.verdict != StressVerdict.OK or tracker.isCancelled():
+            return confirmation
+        run.confirmed = False
+        return run
+
+    def __runOneTest(self, seed: int, tracker: ProcessTracker) -> StressRun:
+        '''
+        The test is kept in memory and piped into the solution and the brute, which run at the same time.
+        Nothing is written to disk unless the test fails.
+        '''
+
+        generator = self.__runGenerator(seed, self.genArgs, tracker)
+        test = generator.stdout
+        if generator.returnCode != 0:
+            return StressRun(seed=seed, verdict=StressVerdict.GENERATOR_RE, test=test, generator=generator)
+        run = self.__runOnTest(seed, test, tracker)
+        run.generator = generator
+        return run
+
+    def __runGenerator(self, seed: int, genArgs: list[str], tracker: ProcessTracker) -> ExecutionResult:
+        '''
+        Single run of the generator. In the persistent mode it gets the seed and the arguments as a line of stdin.
+        '''
+
+        if not self.persistent:
+            with open(os.devnull, 'rb') as devNull:
+                return runExecutable([self.__command(self.genExecutable), str(seed)] + genArgs, devNull, None, None, tracker)
+
+        generator = runExecutable([self.__command(self.genExecutable)], io.BytesIO(self.__seedLine(seed, genArgs)),
+                                  None, None, tracker)
+        return self.__stripDelimiter(generator)
+
+    def __stripDelimiter(self, execution: ExecutionResult) -> ExecutionResult:
+        marker = (self.delimiter + '\n').encode()
+        if self.persistent and execution.stdout.endswith(marker):
+            execution.stdout = execution.stdout[:-len(marker)]
+        return execution
+
+    def __runProgram(self, executable: str, test: bytes, timeLimit: Optional[float],
+                     tracker: ProcessTracker) -> tuple[ExecutionResult, BinaryIO]:
+        '''
+        Stdout is written into an anonymous file and is never read into memory as a whole, unless the run fails.
+        '''
+
+        output = createMemoryFile()
+        execution = runExecutable([self.__command(executable)], io.BytesIO(test), timeLimit, output, tracker)
+        marker = (self.delimiter + '\n').encode()
+        size = output.seek(0, os.SEEK_END)
+        if self.persistent and size >= len(marker):
+            output.seek(size - len(marker))
+            if output.read() == marker:
+                output.truncate(size - len(marker))
+        return execution, output
 
     @staticmethod
-    def __dumpTest() -> None:
-        with open(StressTester.TEST_NAME, 'r') as testFile:
-            lines = testFile.read().split('\n')
+    def __seedLine(seed: int, genArgs: list[str]) -> bytes:
+        return (' '.join([str(seed)] + genArgs) + '\n').encode()
+
+    def __runOnTest(self, seed: int, test: bytes, tracker: ProcessTracker) -> StressRun:
+        if self.raceExecutable is not None:
+            return self.__runRace(seed, test, tracker)
+
+        bruteResult = [None, None]
+        bruteThread = None
+        if self.bruteExecutable is not None:
+            def runBrute() -> None:
+                bruteResult[:] = self.__runProgram(self.bruteExecutable, test, None, tracker)
+            bruteThread = threading.Thread(target=runBrute)
+            bruteThread.start()
+
+        solution, solutionOutput = self.__runProgram(self.solutionExecutable, test, self.timeLimit, tracker)
+        if bruteThread is not None:
+            bruteThread.join()
+        return self.__judge(seed, test, solution, bruteResult[0], solutionOutput, bruteResult[1])
+
+    def __runRace(self, seed: int, test: bytes, tracker: ProcessTracker) -> StressRun:
+        '''
+        The solutions are run one after another, so that they do not compete for the cache and the memory bandwidth.
+        Which of them goes first alternates with the seed.
+        '''
+
+        executables = [self.solutionExecutable, self.raceExecutable]
+        order = [0, 1] if seed % 2 == 0 else [1, 0]
+        results = [None, None]
+        for index in order:
+            results[index] = self.__runProgram(executables[index], test, self.timeLimit, tracker)
+        return self.__judge(seed, test, results[0][0], results[1][0], results[0][1], results[1][1])
+
+    def __judge(self, seed: int, test: bytes, solution: ExecutionResult, brute: Optional[ExecutionResult],
+                solutionOutput: BinaryIO, bruteOutput: Optional[BinaryIO]) -> StressRun:
+        '''
+        Outputs are compared by the hashes of their tokens first, so a matching run does not read them into memory.
+        '''
+
+        run = StressRun(seed=seed, verdict=StressVerdict.OK, test=test, solution=solution, brute=brute)
+        if self.timeLimit is not None and solution.timedOut:
+            run.verdict = StressVerdict.TL
+        elif solution.returnCode != 0:
+            run.verdict = StressVerdict.RE
+        elif self.raceExecutable is not None and brute.timedOut:
+            # Only the second solution of the race runs with the time limit, the brute force one is never limited.
+            run.verdict = StressVerdict.BRUTE_TL
+        elif brute is not None and brute.returnCode != 0:
+            run.verdict = StressVerdict.BRUTE_RE
+        elif brute is not None and not tokensMatch(solutionOutput, bruteOutput):
+            run.mismatch = OutputComparator(CompareMode.TOKENS).compare(solutionOutput, bruteOutput)
+            if run.mismatch is not None:
+                run.verdict = StressVerdict.WA
+
+        if run.verdict == StressVerdict.OK:
+            for output in [solutionOutput, bruteOutput]:
+                if output is not None:
+                    output.close()
+        else:
+            run.solutionOutput = solutionOutput
+            run.bruteOutput = bruteOutput
+        return run
+
+    def __shrinkFailure(self) -> None:
+        failure = self.failure
+        if failure.verdict not in [StressVerdict.WA, StressVerdict.RE, StressVerdict.TL] or not failure.confirmed:
+            return
+        if failure.verdict == StressVerdict.RE and failure.solution.timedOut:
+            return
+
+        tracker = ProcessTracker()
+        check = lambda test: self.__runOnTest(failure.seed, test, tracker).verdict == failure.verdict
+        print(colored('\nShrinking the test...', 255, 255, 50))
+        if not check(failure.test):
+            dumpError('The failure does not reproduce in a single run, nothing to shrink.')
+            return
+
+        def generate(genArgs: list[str]) -> Optional[bytes]:
+            generator = self.__runGenerator(failure.seed, genArgs, tracker)
+            return generator.stdout if generator.returnCode == 0 else None
+
+        shrinker = Shrinker(check, generate, self.jobs, self.shrinkLimit)
+        try:
+            test = shrinker.shrink(failure.test, self.genArgs)
+        except KeyboardInterrupt:
+            tracker.cancel()
+            raise
+        shrinker.dumpStats(test)
+        self.failure = self.__saveToCorpus(self.__runOnTest(failure.seed, test, tracker), tracker, shrinker.stats.finalArgs)
+
+    @staticmethod
+    def __dumpTest(test: bytes) -> None:
+        with open(StressTester.TEST_NAME, 'wb') as testFile:
+            testFile.write(test)
 
         print(StressTester.TEST)
-        print('\n'.join(addEmptyLine(lines)))
+        print('\n'.join(addEmptyLine(test.decode(errors='replace').split('\n'))))
 
     @staticmethod
-    def __dumpErr(solutionRunResult: subprocess.CompletedProcess) -> None:
-        errOutput = solutionRunResult.stderr.decode()
+    def __dumpErr(execution: ExecutionResult) -> None:
+        errOutput = execution.stderr.decode(errors='replace')
         print(StressTester.ERR)
         print(errOutput)
         if len(errOutput) == 0 or errOutput[-1] != '\n':
             print()
 
-    @staticmethod
-    def __dumpSolutionsOutput(solutionOutputLines: list[str], bruteOutputLines: list[str]) -> None:
-        print(StressTester.SOLVE_OUTPUT)
-        coloredLinesPrint(addEmptyLine(solutionOutputLines), bruteOutputLines, 255, 120, 120)
-
-        print(StressTester.CORRECT_OUTPUT)
-        coloredLinesPrint(addEmptyLine(bruteOutputLines), solutionOutputLines, 120, 255, 120)
-
-    def __validateOutput(self, solutionRunResult: subprocess.CompletedProcess) -> None:
-        with open(StressTester.TEST_NAME, 'r') as testFile:
-            bruteRunResult = subprocess.run([f'./{self.bruteExecutable}'],
-                                             stdin=testFile,
-                                             stdout=subprocess.PIPE,
-                                             stderr=subprocess.PIPE)
-
-        if bruteRunResult.returncode != 0:
-            dumpError('\nBrute force solution got RE.')
-            self.__dumpTest()
-            sys.exit(0)
-
-        solutionOutputLines = solutionRunResult.stdout.decode().split('\n')
-        bruteOutputLines = bruteRunResult.stdout.decode().split('\n')
-        if not compareOutput(solutionOutputLines, bruteOutputLines):
-            dumpError('\nWrong answer')
-            self.__dumpTest()
-            self.__dumpSolutionsOutput(solutionOutputLines, bruteOutputLines)
-            sys.exit(0)
+    def __dumpSolutionsOutput(self, solutionOutput: BinaryIO, bruteOutput: BinaryIO) -> None:
+        print(StressTester.OUTPUTS if self.raceExecutable is None else StressTester.RACE_OUTPUTS)
+        DiffView().dumpDiff(solutionOutput, bruteOutput)
 
-    def __runOneTest(self, testIndex: int) -> None:
-        self.__generateTest(testIndex)
+    @staticmethod
+    def __describe(run: StressRun) -> str:
+        if run.replayed:
+            return f'corpus test {run.corpusName} (seed {run.seed})'
+        return f'seed {run.seed}'
 
-        with open(StressTester.TEST_NAME, 'r') as testFile:
-            solutionRunResult = subprocess.run([f'./{self.solutionExecutable}'],
-                                               stdin=testFile,
-                                               stdout=subprocess.PIPE,
-                                               stderr=subprocess.PIPE)
+    def __dumpCorpusName(self, failure: StressRun) -> None:
+        if failure.corpusName is not None:
+            print(colored(f'The test is saved into the corpus: {os.path.join(self.corpus.directory, failure.corpusName)}' +
+                          Corpus.TEST_SUFFIX, 120, 200, 235))
 
-        if solutionRunResult.returncode != 0:
-            dumpError('\nSolution got RE.')
-            self.__dumpTest()
-            self.__dumpErr(solutionRunResult)
-            sys.exit(0)
+    def __dumpFailure(self, failure: StressRun) -> None:
+        if failure.verdict == StressVerdict.GENERATOR_RE:
+            dumpError(f'\nGenerator got RE on {self.__describe(failure)}.')
+        elif failure.verdict == StressVerdict.TL and failure.solution.cpuTime is None:
+            dumpError(f'\nSolution got TL on {self.__describe(failure)} ' +
+                      f'(wall {failure.solution.wallTime}ms, limit {self.timeLimit}s, cpu time is not measured in the persistent mode).')
+            self.__dumpTest(failure.test)
+        elif failure.verdict == StressVerdict.TL:
+            dumpError(f'\nSolution got TL on {self.__describe(failure)} ' +
+                      f'(cpu {failure.solution.cpuTime}ms, wall {failure.solution.wallTime}ms, limit {self.timeLimit}s).')
+            self.__dumpTest(failure.test)
+        elif failure.verdict == StressVerdict.RE and failure.solution.timedOut:
+            dumpError(f'\nSolution did not print the delimiter on {self.__describe(failure)} ' +
+                      f'in {StressTester.PERSISTENT_TIMEOUT} seconds.')
+            self.__dumpTest(failure.test)
+        elif failure.verdict == StressVerdict.RE:
+            dumpError(f'\nSolution got RE on {self.__describe(failure)}.')
+            self.__dumpTest(failure.test)
+            self.__dumpErr(failure.solution)
+        elif failure.verdict == StressVerdict.BRUTE_TL:
+            dumpError(f'\nSecond solution got TL on {self.__describe(failure)} ' +
+                      f'(cpu {failure.brute.cpuTime}ms, wall {failure.brute.wallTime}ms, limit {self.timeLimit}s).')
+            self.__dumpTest(failure.test)
+        elif failure.verdict == StressVerdict.BRUTE_RE:
+            name = 'Brute force solution' if self.raceExecutable is None else 'Second solution'
+            dumpError(f'\n{name} got RE on {self.__describe(failure)}.')
+            self.__dumpTest(failure.test)
+        else:
+            dumpError(f'\nWrong answer on {self.__describe(failure)} ({failure.mismatch})')
+            self.__dumpTest(failure.test)
+            self.__dumpSolutionsOutput(failure.solutionOutput, failure.bruteOutput)
 
-        if self.bruteExecutable is not None:
-            self.__validateOutput(solutionRunResult)
+        if not failure.confirmed:
+            dumpError(f'Seed {failure.seed} fails only after the previous tests in the same process, ' +
+                      'check that everything is reset between the tests.')
 
 def main():
     parser = argparse.ArgumentParser()
@@ -138,6 +578,114 @@ def main():
                         default=1000,
                         help='Number of tests (1000 by default).')
 
+    parser.add_argument('-jobs',
+                        action='store',
+                        type=int,
+                        default=os.cpu_count() or 1,
+                        help='Number of tests to run concurrently (number of cores by default).')
+
+    parser.add_argument('-shard',
+                        action='store',
+                        type=parseShard,
+                        metavar='i/n',
+                        default=(1, 1),
+                        help='Test only the seeds i, i + n, i + 2n, ..., so that several runs cover disjoint seeds.')
+
+    parser.add_argument('-genargs',
+                        action='store',
+                        default='',
+                        help='Arguments passed to the generator after the seed, for example "200000 1000000000". ' +
+                             'Shrinking tries to decrease the ones ending with a number.')
+
+    parser.add_argument('-shrink',
+                        action='store_true',
+                        help='Make the failing test as small as possible: run the generator with smaller size arguments, ' +
+                             'then remove lines and tokens of the test while it still fails.')
+
+    parser.add_argument('-shrinklimit',
+                        action='store',
+                        type=int,
+                        default=2000,
+                        help='Maximum number of candidate tests checked while shrinking (2000 by default).')
+
+    parser.add_argument('-persistent',
+                        action='store_true',
+                        help='Keep the generator, the solution and the brute running between the tests. ' +
+                             'The generator reads the seeds line by line, all of them print the delimiter line ' +
+                             'after each test or answer and flush the output. Only the wall time of each test is measured, ' +
+                             'so -tl limits it.')
+
+    parser.add_argument('-delimiter',
+                        action='store',
+                        default='---',
+                        help='Line printed after each test or answer in the persistent mode (--- by default).')
+
+    parser.add_argument('-export',
+                        action='store',
+                        metavar='path',
+                        default=None,
+                        help='Save the throughput and the timings of the programs as json.')
+
+    parser.add_argument('-tl',
+                        action='store',
+                        type=float,
+                        metavar='seconds',
+                        default=None,
+                        help='Time limit of the solution in seconds, the solution is killed once it is exceeded. ' +
+                             f'By default it is taken from {LIMITS_FILE_NAME} created by setup_problem (no limit without it).')
+
+    parser.add_argument('-hunt',
+                        action='store',
+                        choices=Hunter.METRICS,
+                        default=None,
+                        help='Instead of looking for failures, search for the tests maximizing the cpu time or the memory ' +
+                             'of the solution: first random seeds, then hill climbing over the seed and the -genargs sizes. ' +
+                             'The brute is not run.')
+
+    parser.add_argument('-top',
+                        action='store',
+                        type=int,
+                        metavar='K',
+                        default=5,
+                        help='Number of the worst tests kept by -hunt (5 by default).')
+
+    parser.add_argument('-huntdir',
+                        action='store',
+                        default='stress_worst',
+                        help='Directory for the worst tests found by -hunt (stress_worst by default).')
+
+    parser.add_argument('-corpus',
+                        action='store',
+                        default='stress_corpus',
+                        help='Directory where the failing tests (and the worst ones found by -hunt) are saved ' +
+                             '(stress_corpus by default).')
+
+    parser.add_argument('-replay',
+                        action='store_true',
+                        help='Run the tests of the corpus before the new seeds, stop if any of them still fails.')
+
+    parser.add_argument('-race',
+                        action='store',
+                        metavar='sol2',
+                        default=None,
+                        help='Path to another executable solution: both solutions are run on each test one after another, ' +
+                             'their outputs must agree (-brute is not used) and their cpu times and memory are compared.')
+
     args = parser.parse_args()
+    if args.tl is None:
+        args.tl = loadLimits(os.path.dirname(args.sol) or '.').get('time_limit', None)
+
+    if args.race is not None and (args.persistent or args.hunt is not None):
+        dumpError('Race can not be combined with the persistent mode or hunting.')
+        sys.exit(0)
+
+    if args.hunt is not None:
+        if args.persistent:
+            dumpError('Hunting is not supported in the persistent mode: cpu time and memory are not measured there.')
+            sys.exit(0)
+        hunter = Hunter(args)
+        runProcess(hunter.run)
+        return
+
     stressTester = StressTester(args)
     runProcess(stressTester.run)
@@ -1,31 +1,62 @@
+import io
 import os
 import re
-import subprocess
 import sys
-import time
+import tempfile
 import argparse
 
-from dataclasses import dataclass
-from enum        import Enum
-from typing      import Any
-from .utils      import colored, dumpError, compareOutput, addEmptyLine, coloredLinesPrint, loadSettings, runProcess
-
-@dataclass
-class Test:
-    testPath:   str
-    testAnswer: str
-
-    def getTestIndex(self) -> int:
-        indexStart = self.testPath.find('in')
-        if indexStart == -1:
-            return -1
-        return int(self.testPath[indexStart + 2:])
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses        import dataclass
+from enum               import Enum
+from threading          import Thread
+from typing             import Any, BinaryIO, Optional
+from .batch             import BatchBuilder, findTargets
+from .baseline          import PerformanceBaseline, TestTiming
+from .bench             import BenchmarkResult, dumpBenchmarkTable, exportBenchmark, formatBenchmarkResult
+from .compare           import CompareMode, Mismatch, OutputComparator
+from .compiler          import CompilationCache, CompilationResult, Compiler, PrecompiledHeaders
+from .diff_view         import DiffView
+from .discovery         import Test, TestIndex, isTestFileName
+from .execution         import ExecutionResult, ProcessTracker, findCoreError, pinToCore, restoreAffinity, runExecutable
+from .profiler          import Profiler
+from .watch             import collectLocalIncludes, createWatcher
+from .utils             import colored, dumpError, loadSettings, loadLimits, runProcess, LIMITS_FILE_NAME
 
 class TestResult(Enum):
     OK      = 0
     WA      = 1
     RE      = 2
     UNKNOWN = 3
+    TL      = 4
+    ML      = 5
+
+SANITIZER_REGEX = re.compile(r'runtime error:|ERROR: \w+Sanitizer|Error: attempt to|Assertion .* failed')
+
+def findSanitizerReports(stderr: bytes) -> list[str]:
+    '''
+    Lines of the stderr of the debug build reported by sanitizers, _GLIBCXX_DEBUG or assert.
+    '''
+
+    lines = stderr.decode(errors='replace').split('\n')
+    return [line.strip() for line in lines if SANITIZER_REGEX.search(line) is not None]
+
+@dataclass
+class TestRun:
+    test:       Test
+    verdict:    TestResult
+    execution:  ExecutionResult
+    outputFile: Optional[BinaryIO]
+    mismatch:   Optional[Mismatch]
+    debug:      Optional[ExecutionResult] = None
+
+    def debugFailed(self) -> bool:
+        '''
+        Whether the debug build crashed or reported something, a timeout of the slow build is not a failure.
+        '''
+
+        if self.debug is None or self.debug.timedOut:
+            return False
+        return self.debug.returnCode != 0 or len(findSanitizerReports(self.debug.stderr)) > 0
 
 class Tester:
     '''
@@ -33,25 +64,55 @@ class Tester:
     mainExecutable:   str
     extention:        str
     tests:            list[Test]
+    testsNames:       list[str] or None
     compileOnly:      bool
     compilerPath:     str or None
     compilationFlags: list[str] or NOne
+    compiler:         Compiler or None
+    debugExecutable:  str or None
+    debugCompiler:    Compiler or None
+    profiler:         Profiler or None
+    profileTop:       int
     noErr:            bool
+    jobs:             int
+    timeLimit:        float or None
+    memoryLimit:      float or None
+    comparator:       OutputComparator
+    diffView:         DiffView
+    inputLines:       int
+    benchRuns:        int
+    warmupRuns:       int
+    benchCore:        int or None
+    benchExport:      str or None
+    noBaseline:       bool
+    acceptBaseline:   bool
+    regression:       float
+    watchMode:        bool
+    tracker:          ProcessTracker
+    precompiled:      bool
+    testsDirectory:   str
+    verdictsCounter:  dict[TestResult, int] or None
     '''
 
-    TEST_NAME_REGEX = re.compile('in[0-9]+')
     SEPARATOR = '==========================================='
 
+    DEBUG_SUFFIX            = '_debug'
+    DEBUG_TIME_LIMIT_FACTOR = 10
+    DEBUG_REPORT_LINES      = 30
+
     OK = colored('OK', 20, 255, 20)
     WA = colored('WA', 255, 70, 0)
     RE = colored('RE', 255, 70, 0)
     UNKNOWN = colored('Unknown', 120, 200, 235)
+    TL = colored('TL', 255, 70, 0)
+    ML = colored('ML', 255, 70, 0)
 
     OUTPUT = colored('Output', 255, 165, 0)
-    EXPECTED_OUTPUT = colored('Expected output', 255, 165, 0)
     ERR = colored('Err', 255, 165, 0)
+    MISMATCH = colored('First mismatch', 255, 165, 0)
+    DEBUG_BUILD = colored('Debug build', 255, 165, 0)
 
-    def __init__(self, args: argparse.Namespace):
+    def __init__(self, args: argparse.Namespace, precompiled: bool=False, testsDirectory: str='.'):
         self.mainExecutable = args.exec
         self.extention = args.ext
 
@@ -61,169 +122,517 @@ class Tester:
 
         self.__parseCompiler(args)
         self.compileOnly = args.cmplonly
+        self.testsNames = args.tests
+        self.tests = []
+        self.testsDirectory = testsDirectory
         if not self.compileOnly:
-            self.__registerTests(args.tests)
+            self.__registerTests(self.testsNames)
 
         self.noErr = args.noerr
+        self.jobs = max(1, args.jobs)
+        self.__parseLimits(args)
+        self.comparator = OutputComparator(CompareMode(args.cmp), args.abseps, args.releps)
+        self.diffView = DiffView(args.context, args.mismatches, args.width, self.comparator.mode != CompareMode.LINES)
+        self.inputLines = args.inputlines
+        self.benchRuns = args.bench
+        self.warmupRuns = args.warmup
+        self.benchCore = args.core
+        self.benchExport = args.export
+        self.noBaseline = args.nobaseline
+        self.acceptBaseline = args.accept
+        self.regression = args.regression
+        self.watchMode = args.watch
+        self.tracker = ProcessTracker()
+        self.precompiled = precompiled
+        self.verdictsCounter = None
 
     def run(self) -> None:
-        if self.compilerPath is not None:
-            self.__compile()
-            if not self.compileOnly:
-                print()
-
-        if not self.compileOnly:
-            self.__runTests()
+        if self.watchMode:
+            self.__watch()
+        elif not self.__runCycle(not self.precompiled, self.tests):
+            sys.exit(0)
 
 # Private:
 
     def __parseCompiler(self, args: argparse.Namespace) -> None:
         self.compilerPath = args.compiler
         self.compilationFlags = ['-' + flag for flag in args.flags]
-
-    def __registerSingleTest(self, testPath: str) -> None:
-        if not os.path.isfile(testPath):
-            dumpError(f'No such file: {testPath}')
-            return
-
-        answerFileName = os.path.basename(testPath).replace('in', 'out')
-        directory = os.path.dirname(testPath)
-        testAnswer = None
-        if answerFileName in os.listdir('./' if len(directory) == 0 else directory):
-            testAnswer = os.path.join(directory, answerFileName)
-
-        self.tests.append(Test(testPath=testPath, testAnswer=testAnswer))
+        builds = createBuilds(args)
+        self.compiler = builds[0][0] if len(builds) > 0 else None
+        self.debugExecutable = self.mainExecutable + builds[1][1] if len(builds) > 1 else None
+        self.debugCompiler = builds[1][0] if len(builds) > 1 else None
+        self.profiler = None
+        self.profileTop = args.top
+        if args.profile:
+            if self.compilerPath is None:
+                dumpError('Profiling requires compilation, use bld or fbld.')
+                sys.exit(0)
+            cache = None if args.nocache else CompilationCache(args.cachesize)
+            precompiledHeaders = None if args.nopch else PrecompiledHeaders()
+            self.profiler = Profiler(self.compilerPath, self.compilationFlags, self.mainExecutable, cache, precompiledHeaders)
+
+    def __parseLimits(self, args: argparse.Namespace) -> None:
+        limits = loadLimits(os.path.dirname(self.mainExecutable) or '.')
+        self.timeLimit = args.tl if args.tl is not None else limits.get('time_limit', None)
+        self.memoryLimit = args.ml if args.ml is not None else limits.get('memory_limit', None)
 
     def __registerTests(self, testsNames: list[str] or None) -> None:
-        self.tests = []
-        if testsNames is not None:
-            for test in testsNames:
-                self.__registerSingleTest(test)
+        testIndex = TestIndex()
+        if testsNames is None:
+            self.tests = testIndex.discover(self.testsDirectory)
             return
 
-        for testCandidate in os.listdir():
-            if Tester.TEST_NAME_REGEX.match(testCandidate) and os.path.isfile(testCandidate):
-                self.__registerSingleTest(testCandidate)
-        self.tests.sort(key=lambda test: test.getTestIndex())
+        self.tests, missing = testIndex.resolve(testsNames)
+        for testName in missing:
+            dumpError(f'No such file: {testName}')
 
-    def __compile(self) -> None:
-        solutionPath = f'{self.mainExecutable}.{self.extention}'
+    def __solutionPath(self) -> str:
+        return f'{self.mainExecutable}.{self.extention}'
+
+    @staticmethod
+    def __describeCompilation(result: CompilationResult) -> str:
+        if result.cached:
+            return 'cached (0ms)'
+        elif result.savedTime > 0:
+            return f'({result.compilationTime}ms, pch saved ~{result.savedTime}ms)'
+        return f'({result.compilationTime}ms)'
+
+    def __compile(self) -> bool:
+        solutionPath = self.__solutionPath()
         if not os.path.isfile(solutionPath):
             dumpError(f'No solution file: {solutionPath}')
-            sys.exit(0)
-
-        command = [self.compilerPath, solutionPath, '-o', self.mainExecutable] + self.compilationFlags
-        compilationStartTime = time.time()
-        status = subprocess.run(command)
-        compilationTime = int((time.time() - compilationStartTime) * 1000)
-
-        if status.returncode != 0:
-            dumpError(f'\nDid not compile. ({compilationTime}ms)')
-            sys.exit(0)
+            return False
+
+        if self.debugCompiler is not None:
+            return self.__compileBoth(solutionPath)
+
+        result = self.compiler.compile(solutionPath, self.mainExecutable)
+        if not result.success:
+            dumpError(f'\nDid not compile. ({result.compilationTime}ms)')
+            return False
+
+        print(colored('Compiled successfully.', 20, 255, 20), self.__describeCompilation(result))
+        return True
+
+    def __compileBoth(self, solutionPath: str) -> bool:
+        '''
+        Compiles the release and the debug builds concurrently.
+        Diagnostics are captured, so that the outputs of the two compilers are not mixed.
+        '''
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            releaseFuture = executor.submit(self.compiler.compile, solutionPath, self.mainExecutable, True)
+            debugFuture = executor.submit(self.debugCompiler.compile, solutionPath, self.debugExecutable, True)
+            releaseResult = releaseFuture.result()
+            debugResult = debugFuture.result()
+
+        success = True
+        for name, result in [('Release', releaseResult), ('Debug', debugResult)]:
+            if len(result.output) > 0 and (success or result.output != releaseResult.output):
+                print(result.output.decode(errors='replace'), end='')
+            if result.success:
+                print(colored(f'{name} build compiled successfully.', 20, 255, 20), self.__describeCompilation(result))
+            else:
+                dumpError(f'{name} build did not compile. ({result.compilationTime}ms)')
+                success = False
+        return success
+
+    def __runCycle(self, recompile: bool, tests: list[Test]) -> bool:
+        if self.profiler is not None:
+            return self.__runProfile(recompile, tests)
+
+        if recompile and self.compilerPath is not None:
+            if not self.__compile():
+                return False
+            if not self.compileOnly:
+                print()
 
-        print(colored('Compiled successfully.', 20, 255, 20), f'({compilationTime}ms)')
+        if not self.compileOnly:
+            if self.benchRuns > 0:
+                self.__runBenchmark(tests)
+            else:
+                self.__runTests(tests)
+        return True
 
-    def __dumpSingleTestOutput(self, test: Test, outputLines: list[str], errOutput: str, correctOutputLines: list[str]) -> None:
-        with open(test.testPath, 'r') as testFile:
-            print(testFile.read())
+    def __dumpSingleTestOutput(self, testRun: TestRun) -> None:
+        with testRun.test.openInput() as testFile:
+            self.diffView.dumpHead(testFile, self.inputLines)
+        print()
 
-        outputLines = addEmptyLine(outputLines)
         print(f'{Tester.OUTPUT}:')
-        coloredLinesPrint(outputLines, correctOutputLines, 255, 120, 120)
+        if testRun.test.testAnswer is None:
+            self.diffView.dumpHead(testRun.outputFile)
+        else:
+            with testRun.test.openAnswer() as testAnswer:
+                self.diffView.dumpDiff(testRun.outputFile, testAnswer)
+            print(f'({colored(">", 255, 120, 120)} output, {colored("<", 120, 255, 120)} expected output)')
 
+        errOutput = testRun.execution.stderr.decode(errors='replace').rstrip('\n')
         if not self.noErr and len(errOutput.strip()) > 0:
             print(f'{Tester.ERR}:')
             print(errOutput)
-            if len(errOutput) == 0 or errOutput[-1] != '\n':
-                print()
-
-        if correctOutputLines is not None:
-            print(f'{Tester.EXPECTED_OUTPUT}:')
-            correctOutputLines = addEmptyLine(correctOutputLines)
-            coloredLinesPrint(correctOutputLines, outputLines, 120, 255, 120)
+        print()
 
     @staticmethod
-    def __dumpSingleTestVerdict(verdict: TestResult, executionTime: int) -> None:
+    def __dumpSingleTestVerdict(verdict: TestResult, execution: ExecutionResult, debug: Optional[ExecutionResult]) -> None:
         if verdict == TestResult.OK:
             print(Tester.OK, end='')
         elif verdict == TestResult.WA:
             print(Tester.WA, end='')
         elif verdict == TestResult.RE:
             print(Tester.RE, end='')
+        elif verdict == TestResult.TL:
+            print(Tester.TL, end='')
+        elif verdict == TestResult.ML:
+            print(Tester.ML, end='')
         else:
             print(Tester.UNKNOWN, end='')
 
-        print(f' ({executionTime}ms)')
-
-    def __runSingleTest(self, test: Test) -> TestResult:
-        print('Test ', colored(test.testPath, 255, 255, 50), ': ', sep='', end='', flush=True)
-
-        with open(test.testPath, 'r') as testFile:
-            processStartTime = time.time()
-            processData = subprocess.run([f'./{self.mainExecutable}'],
-                                         stdin=testFile,
-                                         stdout=subprocess.PIPE,
-                                         stderr=subprocess.PIPE)
-            executionTime = int((time.time() - processStartTime) * 1000)
-
-        outputLines = processData.stdout.decode().rstrip('\n').split('\n')
-        errOutput = processData.stderr.decode().rstrip('\n')
-
-        correctOutputLines = None
-        if test.testAnswer is not None:
-            with open(test.testAnswer, 'r') as testAnswer:
-                correctOutputLines = testAnswer.read().rstrip('\n').split('\n')
-
-        if processData.returncode != 0:
+        print(f' ({execution.wallTime}ms, cpu {execution.cpuTime}ms, {execution.formatMemory()})', end='')
+        if debug is not None:
+            print(f', debug build {debug.wallTime}ms', end='')
+        print()
+
+    def __executeSingleTest(self, test: Test) -> TestRun:
+        outputFile = tempfile.TemporaryFile()
+        with test.openInput() as inputFile:
+            execution = runExecutable([f'./{self.mainExecutable}'], inputFile, self.timeLimit, outputFile, self.tracker)
+
+        mismatch = None
+        if execution.timedOut:
+            verdict = TestResult.TL
+        elif self.memoryLimit is not None and execution.exceedsMemory(self.memoryLimit):
+            verdict = TestResult.ML
+        elif execution.returnCode != 0:
             verdict = TestResult.RE
         elif test.testAnswer is None:
             verdict = TestResult.UNKNOWN
-        elif compareOutput(outputLines, correctOutputLines):
-            verdict = TestResult.OK
         else:
-            verdict = TestResult.WA
+            with test.openAnswer() as testAnswer:
+                mismatch = self.comparator.compare(outputFile, testAnswer)
+            verdict = TestResult.OK if mismatch is None else TestResult.WA
 
-        self.__dumpSingleTestVerdict(verdict, executionTime)
-        if verdict != TestResult.OK:
-            self.__dumpSingleTestOutput(test, outputLines, errOutput, correctOutputLines)
+        if verdict == TestResult.OK:
+            outputFile.close()
+            outputFile = None
+
+        return TestRun(test=test,
+                       verdict=verdict,
+                       execution=execution,
+                       outputFile=outputFile,
+                       mismatch=mismatch)
+
+    def __executeDebugTest(self, test: Test) -> ExecutionResult:
+        '''
+        Runs the debug build only for its diagnostics, the output is dropped.
+        '''
+
+        timeLimit = None if self.timeLimit is None else self.timeLimit * Tester.DEBUG_TIME_LIMIT_FACTOR
+        with open(os.devnull, 'wb') as devNull, test.openInput() as inputFile:
+            return runExecutable([f'./{self.debugExecutable}'], inputFile, timeLimit, devNull, self.tracker)
+
+    def __dumpDebugRun(self, testRun: TestRun) -> None:
+        debug = testRun.debug
+        if debug.timedOut:
+            print(f'{Tester.DEBUG_BUILD}: timed out, no diagnostics')
+            return
+        if not testRun.debugFailed():
+            return
 
-        return verdict
+        reports = findSanitizerReports(debug.stderr)
+        if len(reports) > 0:
+            print(f'{Tester.DEBUG_BUILD}:', colored(f'{reports[0]} (reports: {len(reports)})', 255, 70, 0))
+        else:
+            print(f'{Tester.DEBUG_BUILD}:', colored(f'exit code {debug.returnCode}', 255, 70, 0))
+        self.diffView.dumpHead(io.BytesIO(debug.stderr), Tester.DEBUG_REPORT_LINES)
+        print()
+
+    def __dumpSingleTestRun(self, testRun: TestRun) -> None:
+        self.__dumpSingleTestVerdict(testRun.verdict, testRun.execution, testRun.debug)
+        if testRun.debug is not None:
+            self.__dumpDebugRun(testRun)
+        if testRun.verdict == TestResult.OK:
+            return
 
-    def __dumpTestsVerdicts(self, verdictsCounter: dict[int: int]) -> None:
+        if testRun.mismatch is not None:
+            print(f'{Tester.MISMATCH}: {testRun.mismatch}')
+        self.__dumpSingleTestOutput(testRun)
+        testRun.outputFile.close()
+
+    @staticmethod
+    def __dumpSingleTestHeader(test: Test) -> None:
+        print('Test ', colored(test.name(), 255, 255, 50), ': ', sep='', end='', flush=True)
+
+    @staticmethod
+    def __dumpTestsVerdicts(verdictsCounter: dict[int: int], testsCount: int) -> None:
         oks      = verdictsCounter[TestResult.OK]
         was      = verdictsCounter[TestResult.WA]
         res      = verdictsCounter[TestResult.RE]
         unknowns = verdictsCounter[TestResult.UNKNOWN]
+        tls      = verdictsCounter[TestResult.TL]
+        mls      = verdictsCounter[TestResult.ML]
 
         print(Tester.SEPARATOR)
-        if verdictsCounter[TestResult.OK] == len(self.tests):
+        if verdictsCounter[TestResult.OK] == testsCount:
             print(colored('All tests passed!', 20, 255, 20))
         else:
             print(f'{Tester.OK}: {oks}  ',
                   f'{Tester.WA}: {was}  ',
                   f'{Tester.RE}: {res}  ',
+                  f'{Tester.TL}: {tls}  ',
+                  f'{Tester.ML}: {mls}  ',
                   f'{Tester.UNKNOWN}: {unknowns}')
 
-    def __runTests(self) -> None:
-        verdictsCounter = {TestResult.OK:      0,
-                           TestResult.WA:      0,
-                           TestResult.RE:      0,
-                           TestResult.UNKNOWN: 0}
+    def __runTests(self, tests: list[Test]) -> None:
+        verdictsCounter = {verdict: 0 for verdict in TestResult}
+
+        # Tests are executed on the pool, but reported strictly in the order of registration.
+        # The debug build runs next to the release one, its diagnostics are merged into the report of the test.
+        debugFailures = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = []
+            for test in tests:
+                futures.append(executor.submit(self.__executeSingleTest, test))
+                futures.append(None if self.debugExecutable is None else executor.submit(self.__executeDebugTest, test))
+
+            timings = dict()
+            for i, test in enumerate(tests):
+                if i != 0:
+                    print(Tester.SEPARATOR)
+                self.__dumpSingleTestHeader(test)
+                testRun = futures[2 * i].result()
+                if futures[2 * i + 1] is not None:
+                    testRun.debug = futures[2 * i + 1].result()
+                if self.tracker.isCancelled():
+                    executor.shutdown(cancel_futures=True)
+                    return
+                self.__dumpSingleTestRun(testRun)
+                verdictsCounter[testRun.verdict] += 1
+                debugFailures += testRun.debugFailed()
+                if testRun.verdict in [TestResult.OK, TestResult.UNKNOWN]:
+                    execution = testRun.execution
+                    timings[test.name()] = TestTiming(execution.cpuTime, execution.peakMemory if execution.memoryExact else None)
+
+        self.verdictsCounter = verdictsCounter
+        self.__dumpTestsVerdicts(verdictsCounter, len(tests))
+        if debugFailures > 0:
+            dumpError(f'Debug build failed on {debugFailures} tests.')
+        self.__updateBaseline(timings)
+
+    def __updateBaseline(self, timings: dict[str, TestTiming]) -> None:
+        if self.noBaseline or len(timings) == 0:
+            return
+
+        key = PerformanceBaseline.computeKey(self.__solutionPath(), self.compilationFlags)
+        if key is None:
+            return
+
+        flagsKey = PerformanceBaseline.computeFlagsKey(self.compilationFlags)
+        baseline = PerformanceBaseline(self.mainExecutable)
+        baseline.record(key, flagsKey, timings)
+        if self.acceptBaseline or baseline.acceptedKey(flagsKey) is None:
+            baseline.accept(key, flagsKey)
+            print(colored('Baseline is updated.', 120, 200, 235))
+        elif baseline.acceptedKey(flagsKey) != key:
+            regressions = baseline.findRegressions(flagsKey, timings, self.regression)
+            if len(regressions) > 0:
+                dumpError(f'Slower than the baseline on {len(regressions)} tests:')
+                for regression in regressions:
+                    print(f'{regression.testName}: {regression.baselineTime:.0f}ms -> {regression.currentTime:.0f}ms ' +
+                          f'(x{regression.ratio():.2f})')
+                print('Add -accept to make the current solution the new baseline.')
+
+        baseline.save()
+
+    def __benchmarkSingleTest(self, test: Test) -> BenchmarkResult:
+        testRun = self.__executeSingleTest(test)
+        if testRun.outputFile is not None:
+            testRun.outputFile.close()
+
+        result = BenchmarkResult(name=test.name(),
+                                 verdict=testRun.verdict.name,
+                                 cpuTimes=[],
+                                 wallTimes=[],
+                                 peakMemory=testRun.execution.peakMemory,
+                                 memoryExact=testRun.execution.memoryExact)
+
+        with open(os.devnull, 'wb') as devNull:
+            for run in range(self.warmupRuns + self.benchRuns):
+                with test.openInput() as inputFile:
+                    execution = runExecutable([f'./{self.mainExecutable}'], inputFile, self.timeLimit, devNull, self.tracker)
+                if run < self.warmupRuns:
+                    continue
+
+                result.cpuTimes.append(execution.cpuTime)
+                result.wallTimes.append(execution.wallTime)
+                result.addMemory(execution.peakMemory, execution.memoryExact)
+
+        return result
+
+    def __runBenchmark(self, tests: list[Test]) -> None:
+        previousAffinity = pinToCore(self.benchCore)
+        if previousAffinity is None:
+            dumpError('Pinning to a core is not supported on this platform.')
+
+        results = []
+        try:
+            for test in tests:
+                self.__dumpSingleTestHeader(test)
+                result = self.__benchmarkSingleTest(test)
+                if self.tracker.isCancelled():
+                    return
+                print(f'{result.verdict} ({formatBenchmarkResult(result)})')
+                results.append(result)
+        finally:
+            restoreAffinity(previousAffinity)
+
+        print(Tester.SEPARATOR)
+        dumpBenchmarkTable(results)
+        if self.benchExport is not None:
+            exportBenchmark(results, self.benchExport)
+
+        self.__updateBaseline({result.name: TestTiming(result.median(), result.peakMemory if result.memoryExact else None)
+                               for result in results if result.verdict in [TestResult.OK.name, TestResult.UNKNOWN.name]})
+
+    def __runProfile(self, recompile: bool, tests: list[Test]) -> bool:
+        '''
+        Runs the instrumented build on the tests one by one and prints the functions ranked by their self time.
+        '''
+
+        if recompile:
+            solutionPath = self.__solutionPath()
+            if not os.path.isfile(solutionPath):
+                dumpError(f'No solution file: {solutionPath}')
+                return False
+
+            result = self.profiler.compile(solutionPath)
+            if not result.success:
+                dumpError(f'\nDid not compile. ({result.compilationTime}ms)')
+                return False
+            print(colored('Compiled with instrumentation.', 20, 255, 20), self.__describeCompilation(result))
+            print()
+
+        if self.compileOnly:
+            return True
+
+        for test in tests:
+            self.__dumpSingleTestHeader(test)
+            execution, profile = self.profiler.profileTest(test, self.timeLimit, self.tracker)
+            if self.tracker.isCancelled():
+                return True
+
+            if execution.timedOut:
+                print(Tester.TL, end='')
+            elif execution.returnCode != 0:
+                print(Tester.RE, end='')
+            else:
+                print(colored('profiled', 20, 255, 20), end='')
+            print(f' ({execution.wallTime}ms, {len(profile)} functions)')
+
+        print(Tester.SEPARATOR)
+        self.profiler.dumpTable(self.profileTop)
+        self.profiler.save()
+        print(colored(f'Profile is saved to {self.profiler.profilePath}', 120, 200, 235))
+        return True
+
+    def __sourceFiles(self) -> set[str]:
+        if self.compilerPath is None:
+            return {os.path.normpath(self.mainExecutable)}
+
+        solutionPath = os.path.normpath(self.__solutionPath())
+        return {solutionPath} | collectLocalIncludes(solutionPath)
+
+    def __testFiles(self) -> set[str]:
+        testFiles = set()
+        for test in self.tests:
+            testFiles |= test.files()
+        return testFiles
+
+    def __isNewTestFile(self, fileName: str) -> bool:
+        return self.testsNames is None and isTestFileName(fileName)
+
+    def __affectedTests(self, changes: set[str], previousTests: list[Test]) -> list[Test]:
+        previousNames = {test.name() for test in previousTests}
+        return [test for test in self.tests if test.name() in previousNames or len(test.files() & changes) > 0]
+
+    def __watchCycle(self, recompile: bool, tests: list[Test]) -> None:
+        self.__runCycle(recompile, tests)
+        if not self.tracker.isCancelled():
+            print(colored('\nWaiting for changes...', 120, 200, 235))
+
+    def __watch(self) -> None:
+        '''
+        Reruns the cycle on every change: recompiles and reruns all tests if the solution or its local includes change,
+        otherwise reruns only the tests whose files changed. A running cycle is cancelled by newer changes.
+        '''
+
+        watcher = createWatcher()
+        recompile = True
+        tests = self.tests
+        try:
+            while True:
+                self.tracker = ProcessTracker()
+                worker = Thread(target=self.__watchCycle, args=(recompile, tests), daemon=True)
+                worker.start()
+
+                changes = watcher.waitForChanges(self.__sourceFiles() | self.__testFiles(), self.__isNewTestFile)
+                cancelled = worker.is_alive()
+                if cancelled:
+                    self.tracker.cancel()
+                    worker.join()
+                    print(colored('\nCancelled by newer changes.', 255, 165, 0))
+
+                if not self.compileOnly:
+                    self.__registerTests(self.testsNames)
+                recompile = (cancelled and recompile) or len(changes & self.__sourceFiles()) > 0
+                tests = self.tests if recompile else self.__affectedTests(changes, tests if cancelled else [])
 
-        for i, test in enumerate(self.tests):
-            if i != 0:
                 print(Tester.SEPARATOR)
-            status = self.__runSingleTest(test)
-            verdictsCounter[status] += 1
+                print(colored('Changed:', 255, 255, 50), ', '.join(sorted(changes)))
+        finally:
+            self.tracker.cancel()
+            watcher.close()
+
+def createBuilds(args: argparse.Namespace) -> list[tuple[Compiler, str]]:
+    '''
+    Compilers of the main and of the optional debug build with the suffixes of their executables.
+    '''
 
-        self.__dumpTestsVerdicts(verdictsCounter)
+    if args.compiler is None:
+        return []
+
+    cache = None if args.nocache else CompilationCache(args.cachesize)
+    precompiledHeaders = None if args.nopch else PrecompiledHeaders()
+    builds = [(Compiler(args.compiler, ['-' + flag for flag in args.flags], cache, precompiledHeaders), '')]
+    if args.debugcompiler is not None:
+        builds.append((Compiler(args.debugcompiler, ['-' + flag for flag in args.debugflags], cache, precompiledHeaders),
+                       Tester.DEBUG_SUFFIX))
+    return builds
+
+def runBatch(args: argparse.Namespace) -> None:
+    def createTester(target: str) -> Tester:
+        testerArgs = argparse.Namespace(**vars(args))
+        testerArgs.exec = target
+        return Tester(testerArgs, precompiled=True, testsDirectory=os.path.dirname(target) or '.')
+
+    if args.watch:
+        dumpError('Watch mode is not supported for several solutions.')
+        return
+    if args.profile:
+        dumpError('Profile mode is not supported for several solutions.')
+        return
+
+    targets = findTargets(args.exec, args.ext, list(loadSettings().get('problem_files', {})))
+    builder = BatchBuilder(targets, args.ext, createBuilds(args), max(1, args.jobs), args.cmplonly, createTester)
+    builder.run()
 
 def main(defaultArgs: dict[str: Any]={}) -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument('exec',
-                        action='store',
+                        nargs='+',
                         metavar='exec',
-                        help='Path to the executable file.')
+                        help='Path to the executable file. Several paths or a directory with problems ' +
+                             '(e.g. a contest created by setup_contest) are compiled concurrently and tested one by one.')
 
     parser.add_argument('-ext',
                         action='store',
@@ -235,8 +644,9 @@ def main(defaultArgs: dict[str: Any]={}) -> None:
                         dest='tests',
                         nargs='*',
                         metavar='test',
-                        help='List of tests to run on. ' +
-                             'By default it runs on tests which matches \"in[0-9]+\".')
+                        help='List of tests, directories with tests or test archives (zip, tar, tar.gz) to run on. ' +
+                             'By default it runs on tests in the current directory and in tests/ subdirectory: ' +
+                             '\"inN\" with answer \"outN\", \"N\" with answer \"N.a\" or \"N.in\" with answer \"N.out\" or \"N.ans\".')
 
     parser.add_argument('-compiler',
                         metavar='compiler',
@@ -251,6 +661,20 @@ def main(defaultArgs: dict[str: Any]={}) -> None:
                         default=defaultArgs.get('flags', []),
                         help='Compilation flags.')
 
+    parser.add_argument('-debugcompiler',
+                        action='store',
+                        metavar='compiler',
+                        default=defaultArgs.get('debugcompiler', None),
+                        help='Compiler of the debug build. If given, the debug build is compiled next to the main one ' +
+                             'and run on the tests for sanitizer diagnostics only.')
+
+    parser.add_argument('-debugflags',
+                        dest='debugflags',
+                        nargs='*',
+                        metavar='flags',
+                        default=defaultArgs.get('debugflags', []),
+                        help='Compilation flags of the debug build.')
+
     parser.add_argument('-cmplonly',
                         action='store_true',
                         default=defaultArgs.get('cmplonly', False),
@@ -261,23 +685,199 @@ def main(defaultArgs: dict[str: Any]={}) -> None:
                         default=defaultArgs.get('noerr', False),
                         help='Hide err output.')
 
+    parser.add_argument('-cmp',
+                        action='store',
+                        choices=[mode.value for mode in CompareMode],
+                        default=defaultArgs.get('cmp', CompareMode.LINES.value),
+                        help='How to compare the output with the answer: by lines (default), ' +
+                             'by whitespace-separated tokens or by tokens with floating point tolerance.')
+
+    parser.add_argument('-abseps',
+                        action='store',
+                        type=float,
+                        default=defaultArgs.get('abseps', OutputComparator.DEFAULT_EPS),
+                        help='Absolute error allowed by "-cmp float".')
+
+    parser.add_argument('-releps',
+                        action='store',
+                        type=float,
+                        default=defaultArgs.get('releps', OutputComparator.DEFAULT_EPS),
+                        help='Relative error allowed by "-cmp float".')
+
+    parser.add_argument('-context',
+                        action='store',
+                        type=int,
+                        metavar='LINES',
+                        default=defaultArgs.get('context', DiffView.CONTEXT_LINES),
+                        help='Number of matching lines shown around each mismatched line of the output.')
+
+    parser.add_argument('-mismatches',
+                        action='store',
+                        type=int,
+                        metavar='N',
+                        default=defaultArgs.get('mismatches', DiffView.MAX_MISMATCHES),
+                        help='Number of mismatched lines shown, the rest of the output is only counted.')
+
+    parser.add_argument('-width',
+                        action='store',
+                        type=int,
+                        metavar='CHARS',
+                        default=defaultArgs.get('width', DiffView.MAX_LINE_LENGTH),
+                        help='Maximum number of characters shown from each line, long lines are cut around the first difference.')
+
+    parser.add_argument('-inputlines',
+                        action='store',
+                        type=int,
+                        metavar='LINES',
+                        default=defaultArgs.get('inputlines', DiffView.HEAD_LINES),
+                        help='Number of lines of the test input shown for failed tests.')
+
+    parser.add_argument('-tl',
+                        action='store',
+                        type=float,
+                        metavar='seconds',
+                        default=defaultArgs.get('tl', None),
+                        help='Time limit in seconds. ' +
+                             f'By default it is taken from {LIMITS_FILE_NAME} created by setup_problem.')
+
+    parser.add_argument('-ml',
+                        action='store',
+                        type=float,
+                        metavar='MB',
+                        default=defaultArgs.get('ml', None),
+                        help='Memory limit in megabytes. ' +
+                             f'By default it is taken from {LIMITS_FILE_NAME} created by setup_problem.')
+
+    parser.add_argument('-bench',
+                        action='store',
+                        type=int,
+                        metavar='R',
+                        default=defaultArgs.get('bench', 0),
+                        help='Run each test R times one by one, pinned to a single core, and show cpu time statistics.')
+
+    parser.add_argument('-warmup',
+                        action='store',
+                        type=int,
+                        default=defaultArgs.get('warmup', 1),
+                        help='Number of warmup runs before measured runs in bench mode (1 by default).')
+
+    parser.add_argument('-core',
+                        action='store',
+                        type=int,
+                        default=defaultArgs.get('core', None),
+                        help='Core to pin to in bench mode (the last one by default).')
+
+    parser.add_argument('-export',
+                        action='store',
+                        metavar='path',
+                        default=defaultArgs.get('export', None),
+                        help='Save bench results as json (if the path ends with .json) or csv.')
+
+    parser.add_argument('-nobaseline',
+                        action='store_true',
+                        default=defaultArgs.get('nobaseline', False),
+                        help='Do not record timings into the baseline file and do not check for regressions.')
+
+    parser.add_argument('-accept',
+                        action='store_true',
+                        default=defaultArgs.get('accept', False),
+                        help='Accept timings of the current solution as the new baseline.')
+
+    parser.add_argument('-regression',
+                        action='store',
+                        type=float,
+                        metavar='ratio',
+                        default=defaultArgs.get('regression', 1.3),
+                        help='Tests which became this many times slower than the baseline are reported (1.3 by default).')
+
+    parser.add_argument('-profile',
+                        action='store_true',
+                        default=defaultArgs.get('profile', False),
+                        help='Compile an instrumented copy of the solution, run it on the tests and print ' +
+                             'the functions ranked by their self time.')
+
+    parser.add_argument('-top',
+                        action='store',
+                        type=int,
+                        metavar='N',
+                        default=defaultArgs.get('top', 20),
+                        help='Number of functions shown in the profile.')
+
+    parser.add_argument('-watch',
+                        action='store_true',
+                        default=defaultArgs.get('watch', False),
+                        help='Watch the solution, its local includes and the tests, recompile and rerun on every change.')
+
+    parser.add_argument('-nocache',
+                        action='store_true',
+                        default=defaultArgs.get('nocache', False),
+                        help='Always recompile, ignoring the compilation cache.')
+
+    parser.add_argument('-nopch',
+                        action='store_true',
+                        default=defaultArgs.get('nopch', False),
+                        help='Do not use precompiled headers.')
+
+    parser.add_argument('-cachesize',
+                        action='store',
+                        type=int,
+                        metavar='MB',
+                        default=defaultArgs.get('cachesize', CompilationCache.DEFAULT_MAX_SIZE_MB),
+                        help='Maximum size of the compilation cache in megabytes.')
+
+    parser.add_argument('-jobs',
+                        action='store',
+                        type=int,
+                        metavar='N',
+                        default=defaultArgs.get('jobs', os.cpu_count() or 1),
+                        help='Number of tests to run concurrently (number of cores by default).')
+
     args = parser.parse_args()
+    coreError = findCoreError(args.core)
+    if coreError is not None:
+        dumpError(coreError)
+        return
+
+    if len(args.exec) > 1 or os.path.isdir(args.exec[0]):
+        runProcess(lambda: runBatch(args))
+        return
+
+    args.exec = args.exec[0]
     tester = Tester(args)
     runProcess(tester.run)
 
+def getCacheSize() -> int:
+    cacheSettings = loadSettings().get('compilation_cache', {})
+    return cacheSettings.get('max_size_mb', CompilationCache.DEFAULT_MAX_SIZE_MB)
+
 def bld(command: str='debug') -> None:
     settings = loadSettings().get(command, {})
-    main({'compiler': settings.get('compiler', None),
-          'flags':    settings.get('flags', [])     })
+    main({'compiler':  settings.get('compiler', None),
+          'flags':     settings.get('flags', [])     ,
+          'cachesize': getCacheSize()                })
 
 def fbld() -> None:
     bld('release')
 
 def cmpl(command: str='debug') -> None:
     settings = loadSettings().get(command, {})
-    main({'compiler': settings.get('compiler', None),
-          'flags':    settings.get('flags', [])     ,
-          'cmplonly': True                          })
+    main({'compiler':  settings.get('compiler', None),
+          'flags':     settings.get('flags', [])     ,
+          'cachesize': getCacheSize()                ,
+          'cmplonly':  True                          })
 
 def fcmpl() -> None:
     cmpl('release')
+
+def dbld(cmplonly: bool=False) -> None:
+    debugSettings = loadSettings().get('debug', {})
+    releaseSettings = loadSettings().get('release', {})
+    main({'compiler':      releaseSettings.get('compiler', None),
+          'flags':         releaseSettings.get('flags', [])     ,
+          'debugcompiler': debugSettings.get('compiler', None)  ,
+          'debugflags':    debugSettings.get('flags', [])       ,
+          'cachesize':     getCacheSize()                       ,
+          'cmplonly':      cmplonly                             })
+
+def dcmpl() -> None:
+    dbld(True)
@@ -5,17 +5,7 @@ import requests
 from enum   import Enum
 from typing import Optional, Any
 
-def compareOutput(outputLines: list[str], correctOutputLines: list[str]) -> list[int]:
-    if correctOutputLines is None or outputLines is None:
-        return True
-
-    for i in range(0, max(len(outputLines), len(correctOutputLines))):
-        outputLine = outputLines[i] if i < len(outputLines) else ''
-        correctLine = correctOutputLines[i] if i < len(correctOutputLines) else ''
-        if outputLine.strip() != correctLine.strip():
-            return False
-
-    return True
+LIMITS_FILE_NAME = 'limits.json'
 
 def addEmptyLine(lines: list[str]) -> list[str]:
     clone = [line for line in lines]
@@ -23,24 +13,6 @@ def addEmptyLine(lines: list[str]) -> list[str]:
         clone.append('')
     return clone
 
-def coloredLinesPrint(lines: list[str], correctLines: list[str], r: int, g: int, b: int) -> None:
-    for i, line in enumerate(lines):
-        if correctLines is None:
-            print(line)
-            continue
-
-        lineParts = line.split(' ')
-        correctParts = (correctLines[i] if correctLines is not None and i < len(correctLines) else '').split(' ')
-        coloredParts = []
-        for j, part in enumerate(lineParts):
-            correctPart = correctParts[j] if j < len(correctParts) else ''
-            if part != correctPart:
-                coloredParts.append(colored(part, r, g, b))
-            else:
-                coloredParts.append(part)
-        
-        print(' '.join(coloredParts))
-
 class JudgeSystem(Enum):
     CODEFORCES     = 0
     ATCODER        = 1
@@ -78,6 +50,17 @@ def loadSettings() -> dict[str: Any]:
     
     return jsonData
 
+def loadLimits(directory: str) -> dict[str: Any]:
+    limitsPath = os.path.join(directory, LIMITS_FILE_NAME)
+    if not os.path.isfile(limitsPath):
+        return {}
+
+    try:
+        with open(limitsPath, 'r') as limitsFile:
+            return json.loads(limitsFile.read())
+    except ValueError:
+        return {}
+
 def runProcess(run) -> None:
     try:
         run()
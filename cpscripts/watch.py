@@ -0,0 +1,204 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import time
+
+from abc    import ABC, abstractmethod
+from typing import Callable, Optional
+
+INCLUDE_REGEX = re.compile(r'^\s*#\s*include\s*"([^"]+)"')
+
+def collectLocalIncludes(sourcePath: str) -> set[str]:
+    '''
+    Local headers (#include "...") of the source, recursively. Only existing files are returned.
+    '''
+
+    includes = set()
+    stack = [sourcePath]
+    while len(stack) > 0:
+        path = stack.pop()
+        try:
+            with open(path, 'r', errors='replace') as sourceFile:
+                lines = sourceFile.readlines()
+        except OSError:
+            continue
+
+        for line in lines:
+            include = INCLUDE_REGEX.match(line)
+            if include is None:
+                continue
+
+            includePath = os.path.normpath(os.path.join(os.path.dirname(path), include.group(1)))
+            if os.path.isfile(includePath) and includePath not in includes:
+                includes.add(includePath)
+                stack.append(includePath)
+    return includes
+
+class FileWatcher(ABC):
+    '''
+    Waits for changes of the watched files. Directories are watched as well,
+    so that files created in them and matched by the filter are reported too.
+
+    Variables:
+    debounce: float
+    '''
+
+    DEBOUNCE = 0.2
+
+    def __init__(self, debounce: float=DEBOUNCE):
+        self.debounce = debounce
+
+    def waitForChanges(self, files: set[str], directoryFilter: Callable[[str], bool]) -> set[str]:
+        '''
+        Blocks until something changes, then collects changes until there are none during the debounce time.
+        Returns normalized paths of the changed files.
+        '''
+
+        files = {os.path.normpath(path) for path in files}
+        changes = self.waitForEvents(files, directoryFilter, None)
+        while True:
+            moreChanges = self.waitForEvents(files, directoryFilter, self.debounce)
+            if len(moreChanges) == 0:
+                return changes
+            changes |= moreChanges
+
+    @abstractmethod
+    def waitForEvents(self, files: set[str], directoryFilter: Callable[[str], bool], timeout: Optional[float]) -> set[str]:
+        '''
+        Changed files reported during the timeout (or until the first change if there is no timeout).
+        '''
+
+    def close(self) -> None:
+        pass
+
+class PollingWatcher(FileWatcher):
+    '''
+    Variables:
+    interval: float
+    snapshot: dict[str, tuple] or None
+    '''
+
+    INTERVAL = 0.25
+
+    def __init__(self, debounce: float=FileWatcher.DEBOUNCE, interval: float=INTERVAL):
+        super().__init__(debounce)
+        self.interval = interval
+        self.snapshot = None
+
+    def waitForEvents(self, files: set[str], directoryFilter: Callable[[str], bool], timeout: Optional[float]) -> set[str]:
+        if self.snapshot is None:
+            self.snapshot = self.__takeSnapshot(files, directoryFilter)
+
+        startTime = time.time()
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.__takeSnapshot(files, directoryFilter)
+            changes = {path for path in set(snapshot) | set(self.snapshot) if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if len(changes) > 0 or (timeout is not None and time.time() - startTime >= timeout):
+                return changes
+
+# Private:
+
+    @staticmethod
+    def __takeSnapshot(files: set[str], directoryFilter: Callable[[str], bool]) -> dict[str, tuple]:
+        paths = set(files)
+        for directory in {os.path.dirname(path) for path in files}:
+            try:
+                names = os.listdir(directory or '.')
+            except OSError:
+                continue
+            paths |= {os.path.normpath(os.path.join(directory, name)) for name in names if directoryFilter(name)}
+
+        snapshot = dict()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        return snapshot
+
+class InotifyWatcher(FileWatcher):
+    '''
+    Linux inotify through libc, the parent directories of the files are watched
+    (editors often save files by replacing them, which would drop a watch on the file itself).
+
+    Variables:
+    libc:        ctypes.CDLL
+    descriptor:  int
+    directories: dict[int, str]
+    '''
+
+    IN_MODIFY      = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    EVENTS_MASK    = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER   = struct.Struct('iIII')
+
+    def __init__(self, debounce: float=FileWatcher.DEBOUNCE):
+        super().__init__(debounce)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.descriptor = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.descriptor < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = dict()
+
+    def waitForEvents(self, files: set[str], directoryFilter: Callable[[str], bool], timeout: Optional[float]) -> set[str]:
+        self.__watchDirectories({os.path.dirname(path) for path in files})
+
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            ready, _, _ = select.select([self.descriptor], [], [], remaining)
+            if len(ready) == 0:
+                return set()
+
+            changes = set()
+            for directory, name in self.__readEvents():
+                path = os.path.normpath(os.path.join(directory, name))
+                if path in files or directoryFilter(name):
+                    changes.add(path)
+            if len(changes) > 0:
+                return changes
+
+    def close(self) -> None:
+        os.close(self.descriptor)
+
+# Private:
+
+    def __watchDirectories(self, directories: set[str]) -> None:
+        for directory in directories:
+            if directory in self.directories.values():
+                continue
+
+            watchDescriptor = self.libc.inotify_add_watch(self.descriptor, (directory or '.').encode(), InotifyWatcher.EVENTS_MASK)
+            if watchDescriptor >= 0:
+                self.directories[watchDescriptor] = directory
+
+    def __readEvents(self) -> list[tuple[str, str]]:
+        data = os.read(self.descriptor, 1 << 16)
+        events = []
+        offset = 0
+        while offset + InotifyWatcher.EVENT_HEADER.size <= len(data):
+            watchDescriptor, _, _, nameLength = InotifyWatcher.EVENT_HEADER.unpack_from(data, offset)
+            offset += InotifyWatcher.EVENT_HEADER.size
+            name = data[offset:offset + nameLength].split(b'\0', 1)[0].decode(errors='replace')
+            offset += nameLength
+            if watchDescriptor in self.directories and len(name) > 0:
+                events.append((self.directories[watchDescriptor], name))
+        return events
+
+def createWatcher() -> FileWatcher:
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
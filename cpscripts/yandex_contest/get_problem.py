@@ -1,7 +1,17 @@
+import re
 from bs4 import BeautifulSoup
 
 from cpscripts.lib.problem import Problem
 
+def parseLimit(soup: BeautifulSoup, limitClass: str, limitTitle: str) -> float:
+    limitNode = soup.find(attrs={'class': limitClass})
+    if limitNode is None:
+        titleNode = soup.find(string=re.compile(limitTitle))
+        limitNode = None if titleNode is None else titleNode.find_parent('tr') or titleNode.parent
+
+    value = None if limitNode is None else re.search(r'[0-9]+(\.[0-9]+)?', limitNode.text)
+    return None if value is None else float(value.group(0))
+
 def parseProblemFromHtml(html: str, link: str=None) -> Problem:
     soup = BeautifulSoup(html, 'html.parser')
 
@@ -15,6 +25,9 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
             if len(titleNode.text) >= 4:
                 title = titleNode.text[3:]
 
+    timeLimit = parseLimit(soup, 'property-time-limit', 'Time limit|Ограничение времени')
+    memoryLimit = parseLimit(soup, 'property-memory-limit', 'Memory limit|Ограничение памяти')
+
     samplesNodes = soup.find_all(attrs={'class': 'sample-tests'})
     inputs = []
     outputs = []
@@ -25,4 +38,5 @@ def parseProblemFromHtml(html: str, link: str=None) -> Problem:
             inputs.append(testHolders[0].text)
             outputs.append(testHolders[1].text)
 
-    return Problem(title=title, index=index, link=link, inputs=inputs, outputs=outputs)
+    return Problem(title=title, index=index, link=link, inputs=inputs, outputs=outputs,
+                   timeLimit=timeLimit, memoryLimit=memoryLimit)
@@ -17,6 +17,7 @@ setup(
     url='https://github.com/MangoosteMA/Competitive-Programming-Scripts/',
     include_package_data=True,
     packages=packages,
+    package_data={'cpscripts': ['runtime/*.cpp']},
     long_description=readme,
     long_description_content_type='text/markdown',
     install_requires=[
@@ -34,6 +35,9 @@ setup(
             'fbld=cpscripts.test:fbld',
             'cmpl=cpscripts.test:cmpl',
             'fcmpl=cpscripts.test:fcmpl',
+            'dbld=cpscripts.test:dbld',
+            'dcmpl=cpscripts.test:dcmpl',
+            'autotune=cpscripts.autotune:main',
             'setup_problem=cpscripts.setup_problem:main',
             'setup_contest=cpscripts.setup_contest:main',
         ],